@@ -0,0 +1,233 @@
+"""文件拖拽管理器的命令行入口，不加载 Qt，适合在计划任务中整理下载目录
+
+用法示例：
+    python -m FileDragManager.cli ~/Downloads --categorize --jobs 4
+    python FileDragManager/cli.py ~/Downloads --dry-run --format jsonl
+
+未指定的选项取自 FileDragManager.json（与图形界面共用），移动结果写入同一份历史记录，
+因此可以在图形界面中查看和撤销。
+"""
+import os
+import sys
+import json
+import signal
+import logging
+import argparse
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# 两个程序共用的分类规则模块
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
+from transfer import TransferControl
+from pipeline import TransferPipeline, TransferSetupError
+from transfer_journal import TransferJournal
+from history_store import HistoryStore
+from history_index import HistoryIndex
+from scanner import scan_folder, parse_extensions
+from dedup import DEDUP_OFF, DEDUP_MODE_LABELS
+
+logger = logging.getLogger('FileManager')
+
+# 退出码
+EXIT_OK = 0
+EXIT_FAILED = 1      # 部分文件移动失败
+EXIT_USAGE = 2       # 参数错误或目标目录无法创建
+EXIT_CANCELLED = 130  # 被 Ctrl+C 取消
+
+
+def application_path():
+    """与图形界面相同的数据目录：设置、历史记录、传输日志都放在这里"""
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+def load_settings(settings_file):
+    try:
+        with open(settings_file, 'r', encoding='utf-8') as f:
+            settings = json.load(f)
+        if isinstance(settings, dict):
+            return settings
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        logger.warning(f"读取设置失败，使用默认设置: {str(e)}")
+    return {}
+
+
+def collect_files(sources, max_depth, extensions):
+    """把命令行给出的文件和文件夹展开为 (路径, 自定义名称) 列表，返回 (file_list, error_files)"""
+    file_list = []
+    error_files = []
+    for source in sources:
+        if os.path.isdir(source):
+            file_list.extend((path, None) for path, _ in scan_folder(source, max_depth, extensions))
+        elif os.path.isfile(source):
+            file_list.append((source, None))
+        else:
+            error_files.append((source, "文件或文件夹不存在"))
+    return file_list, error_files
+
+
+def save_history(data_dir, processed_files, batch):
+    """与图形界面的 save_history 相同：追加历史记录并更新搜索索引"""
+    history_entry = {
+        "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "files": processed_files,
+        "batch": batch
+    }
+    history_store = HistoryStore(os.path.join(data_dir, "history.jsonl"),
+                                 os.path.join(data_dir, "history.json"))
+    try:
+        history_store.append(history_entry)
+    except Exception as e:
+        logger.error(f"保存历史记录失败: {str(e)}")
+        return
+    try:
+        history_index = HistoryIndex(os.path.join(data_dir, "history.db"))
+        try:
+            # 索引为空说明图形界面还没导入过历史日志，留给它在后台完整导入
+            if not history_index.is_empty():
+                history_index.add_entry(history_entry)
+        finally:
+            history_index.close()
+    except Exception as e:
+        logger.warning(f"更新历史索引失败: {str(e)}")
+
+
+class ResultWriter:
+    """输出每个文件的处理结果：text 为便于阅读的一行一个文件，jsonl 为每行一个 JSON 对象"""
+
+    def __init__(self, fmt, stream=None):
+        self.fmt = fmt
+        self.stream = stream or sys.stdout
+
+    def write(self, status, **fields):
+        if self.fmt == "jsonl":
+            record = {"status": status}
+            record.update(fields)
+            self.stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+        elif status in ("moved", "planned"):
+            self.stream.write(f"{fields['src']} -> {fields['path']}\n")
+        elif status == "duplicate":
+            self.stream.write(f"{fields['src']} 与 {fields['original']} 重复（{fields['action']}）\n")
+        else:
+            self.stream.write(f"{fields['src']}: {status} {fields.get('error', '')}".rstrip() + '\n')
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description='按文件拖拽管理器的规则分类、重命名并移动文件（无界面）',
+        epilog='未指定的选项使用 FileDragManager.json 中的设置')
+    parser.add_argument('sources', nargs='+', help='要移动的文件或文件夹')
+    parser.add_argument('-t', '--target', help='目标目录，默认使用设置中的目标目录')
+    parser.add_argument('--categorize', action=argparse.BooleanOptionalAction, default=None,
+                        help='按分类移动到子目录')
+    parser.add_argument('--rename-images', action=argparse.BooleanOptionalAction, default=None,
+                        help='按命名格式自动重命名图片')
+    parser.add_argument('--pattern', help='图片命名格式，例如 "秒级时间戳+序号"')
+    parser.add_argument('--dedup', choices=sorted(DEDUP_MODE_LABELS), help='重复文件处理方式')
+    parser.add_argument('-j', '--jobs', type=int, help='并发移动的线程数')
+    parser.add_argument('--depth', type=int, default=1,
+                        help='扫描文件夹的层数，1 表示只扫描顶层，0 表示不限层数（默认 1）')
+    parser.add_argument('--ext', default='', help='只处理这些扩展名，如 .jpg,.png')
+    parser.add_argument('-n', '--dry-run', action='store_true', help='只输出移动计划，不移动文件')
+    parser.add_argument('--format', choices=('text', 'jsonl'), default='text', help='结果输出格式')
+    parser.add_argument('--no-history', action='store_true', help='不写入历史记录')
+    parser.add_argument('--settings', help='设置文件路径，默认使用程序目录下的 FileDragManager.json')
+    parser.add_argument('-v', '--verbose', action='count', default=0, help='在标准错误输出日志，-vv 输出调试日志')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(
+        stream=sys.stderr,
+        level=(logging.WARNING, logging.INFO, logging.DEBUG)[min(args.verbose, 2)],
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    if args.jobs is not None and args.jobs < 1:
+        print("--jobs 必须大于 0", file=sys.stderr)
+        return EXIT_USAGE
+
+    data_dir = application_path()
+    settings = load_settings(args.settings or os.path.join(data_dir, "FileDragManager.json"))
+    # 历史记录中保存绝对路径，图形界面撤销时与当前工作目录无关
+    target_dir = os.path.abspath(args.target or settings.get("target_dir") or os.path.join(data_dir, "output"))
+    categorize_files = args.categorize if args.categorize is not None else settings.get("categorize_files", False)
+    auto_rename_images = (args.rename_images if args.rename_images is not None
+                          else settings.get("auto_rename_images", True))
+    rename_pattern = args.pattern or settings.get("rename_pattern", "秒级时间戳+序号")
+    dedup_mode = args.dedup or settings.get("dedup_mode", DEDUP_OFF)
+    if dedup_mode not in DEDUP_MODE_LABELS:
+        dedup_mode = DEDUP_OFF
+    max_workers = args.jobs or settings.get("transfer_workers")
+
+    file_list, error_files = collect_files(
+        [os.path.abspath(source) for source in args.sources],
+        args.depth - 1 if args.depth > 0 else None,
+        parse_extensions(args.ext)
+    )
+
+    journal = None
+    if not args.dry_run and file_list:
+        journal = TransferJournal(os.path.join(data_dir, "transfer_journal.jsonl"))
+        interrupted = journal.interrupted_batches()
+        if interrupted:
+            logger.warning(f"传输日志中有 {len(interrupted)} 个中断的批次，请打开文件拖拽管理器继续完成或回滚")
+
+    # Ctrl+C 只请求取消：正在复制的文件删除半成品，未开始的文件保持原样
+    control = TransferControl()
+    previous_handler = signal.signal(signal.SIGINT, lambda signum, frame: control.cancel())
+    try:
+        pipeline = TransferPipeline(
+            file_list,
+            target_dir,
+            categorize_files,
+            auto_rename_images,
+            rename_pattern,
+            max_workers=max_workers,
+            dedup_mode=dedup_mode,
+            hash_cache_file=os.path.join(data_dir, "hash_cache.db"),
+            journal=journal,
+            control=control,
+            dry_run=args.dry_run
+        )
+        try:
+            move_errors, processed_files, duplicate_files, batch, cancelled_files = pipeline.run()
+        except TransferSetupError as e:
+            print(str(e), file=sys.stderr)
+            return EXIT_USAGE
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+
+    # 先保存历史记录再结束日志中的批次，与图形界面的顺序一致
+    if batch is not None:
+        if not args.no_history and processed_files:
+            save_history(data_dir, processed_files, batch)
+        journal.end(batch)
+    if journal is not None:
+        journal.close()
+
+    error_files.extend(move_errors)
+    writer = ResultWriter(args.format)
+    for info in processed_files:
+        writer.write("planned" if args.dry_run else "moved", **info)
+    for info in duplicate_files:
+        writer.write("duplicate", **info)
+    for src, error in error_files:
+        writer.write("error", src=src, error=error)
+    for src in cancelled_files:
+        writer.write("cancelled", src=src)
+    sys.stdout.flush()
+
+    print(f"{'计划移动' if args.dry_run else '已移动'} {len(processed_files)} 个文件，"
+          f"重复 {len(duplicate_files)} 个，失败 {len(error_files)} 个，取消 {len(cancelled_files)} 个",
+          file=sys.stderr)
+    if cancelled_files:
+        return EXIT_CANCELLED
+    return EXIT_FAILED if error_files else EXIT_OK
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,267 @@
+import os
+import sqlite3
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger('FileManager')
+
+# 部分哈希读取文件开头和结尾各 64 KB
+PARTIAL_BLOCK_SIZE = 64 * 1024
+FULL_HASH_CHUNK_SIZE = 1024 * 1024
+DEFAULT_HASH_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+
+# 重复文件处理方式
+DEDUP_OFF = "off"
+DEDUP_SKIP = "skip"
+DEDUP_HARDLINK = "hardlink"
+DEDUP_MODE_LABELS = {
+    DEDUP_OFF: "关闭",
+    DEDUP_SKIP: "跳过",
+    DEDUP_HARDLINK: "硬链接",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    partial TEXT,
+    full TEXT,
+    PRIMARY KEY (dev, ino, size, mtime_ns)
+);
+"""
+
+
+def file_key(st):
+    """哈希缓存键：文件内容变化时 size 或 mtime 必然变化，缓存随之失效"""
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def partial_hash(path, size):
+    """读取开头和结尾各 64 KB 计算 BLAKE2b，小文件等于完整哈希"""
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        if size <= 2 * PARTIAL_BLOCK_SIZE:
+            h.update(f.read())
+        else:
+            h.update(f.read(PARTIAL_BLOCK_SIZE))
+            f.seek(size - PARTIAL_BLOCK_SIZE)
+            h.update(f.read(PARTIAL_BLOCK_SIZE))
+    return h.hexdigest()
+
+
+def full_hash(path):
+    h = hashlib.blake2b(digest_size=32)
+    buffer = bytearray(FULL_HASH_CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            h.update(view[:n])
+    return h.hexdigest()
+
+
+class HashCache:
+    """按 (设备, inode, 大小, 修改时间) 缓存部分哈希和完整哈希的 SQLite 数据库"""
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT partial, full FROM hashes WHERE dev = ? AND ino = ? AND size = ? AND mtime_ns = ?",
+                key).fetchone()
+        return row if row else (None, None)
+
+    def put_many(self, rows):
+        """rows: [(key, partial, full)]，已有记录只补充缺少的字段"""
+        if not rows:
+            return
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO hashes (dev, ino, size, mtime_ns, partial, full) VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (dev, ino, size, mtime_ns) DO UPDATE SET "
+                    "partial = COALESCE(excluded.partial, partial), full = COALESCE(excluded.full, full)",
+                    [(*key, partial, full) for key, partial, full in rows])
+
+
+class _Candidate:
+    __slots__ = ("path", "key", "job", "partial", "full")
+
+    def __init__(self, path, key, job=None):
+        self.path = path
+        self.key = key
+        self.job = job  # 待移动的文件带有 job，目标目录里已有的文件为 None
+        self.partial = None
+        self.full = None
+
+    @property
+    def size(self):
+        return self.key[2]
+
+
+class DuplicateFinder:
+    """移动前的查重：大小 → 部分哈希 → 完整哈希 逐级筛选
+
+    只有大小相同的文件才计算部分哈希，部分哈希也相同的才读取全文，
+    绝大多数文件只需一次 stat。哈希在线程池中计算，结果写入 HashCache，
+    目标目录里的老文件下次查重时无需重新读取。
+    """
+
+    def __init__(self, cache=None, max_workers=DEFAULT_HASH_WORKERS):
+        self.cache = cache
+        self.max_workers = max_workers
+
+    def find(self, jobs, existing_dirs):
+        """返回 (duplicates, error_files)
+
+        duplicates 为 [(job, 原文件路径, 原文件是否已在目标目录)]：原文件可能是目标目录中
+        已有的文件，也可能是本批次中更早出现的同内容文件。
+        """
+        candidates, error_files = self._collect(jobs, existing_dirs)
+
+        # 第一级：按大小分组，只保留含有待移动文件的组
+        groups = self._group(candidates, lambda c: c.size)
+        # 第二级：部分哈希
+        self._compute(groups, "partial")
+        groups = self._regroup(groups, lambda c: c.partial)
+        # 第三级：完整哈希（小文件的部分哈希已覆盖全文）
+        self._compute([g for g in groups if g[0].size > 2 * PARTIAL_BLOCK_SIZE], "full")
+        groups = self._regroup(groups, lambda c: c.full if c.size > 2 * PARTIAL_BLOCK_SIZE else c.partial)
+
+        duplicates = []
+        for group in groups:
+            # 优先以目标目录里已有的文件为原件，否则以本批次中最早的文件为原件
+            existing = [c for c in group if c.job is None]
+            original = existing[0] if existing else min(group, key=lambda c: c.job["index"])
+            for candidate in group:
+                if candidate is not original and candidate.job is not None:
+                    duplicates.append((candidate.job, original.path, original.job is None))
+        duplicates.sort(key=lambda item: item[0]["index"])
+        return duplicates, error_files
+
+    def _collect(self, jobs, existing_dirs):
+        candidates = []
+        error_files = []
+        seen = set()
+        # 计划中的目标文件是 NameReserver 创建的空占位文件，不能当作已有文件
+        planned = {os.path.normcase(job["dest"]) for job in jobs}
+        for job in jobs:
+            try:
+                st = os.stat(job["src"])
+            except OSError as e:
+                error_files.append((job["src"], str(e)))
+                continue
+            # 空文件内容都相同，不参与查重
+            if st.st_size == 0:
+                continue
+            key = file_key(st)
+            seen.add(key[:2])
+            candidates.append(_Candidate(job["src"], key, job))
+
+        sizes = {c.size for c in candidates}
+        for directory in existing_dirs:
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        try:
+                            if not entry.is_file(follow_symlinks=False):
+                                continue
+                            if os.path.normcase(entry.path) in planned:
+                                continue
+                            st = entry.stat()
+                        except OSError:
+                            continue
+                        # 大小不同的文件不可能重复，连哈希缓存都不必查询
+                        if st.st_size not in sizes:
+                            continue
+                        key = file_key(st)
+                        if key[:2] in seen:
+                            continue
+                        seen.add(key[:2])
+                        candidates.append(_Candidate(entry.path, key))
+            except OSError:
+                continue
+        return candidates, error_files
+
+    @staticmethod
+    def _group(candidates, key_func):
+        groups = {}
+        for candidate in candidates:
+            groups.setdefault(key_func(candidate), []).append(candidate)
+        return [g for g in groups.values() if len(g) > 1 and any(c.job is not None for c in g)]
+
+    def _regroup(self, groups, key_func):
+        result = []
+        for group in groups:
+            result.extend(self._group([c for c in group if key_func(c) is not None], key_func))
+        return result
+
+    def _compute(self, groups, field):
+        pending = []
+        for group in groups:
+            for candidate in group:
+                if getattr(candidate, field) is not None:
+                    continue
+                if self.cache is not None:
+                    partial, full = self.cache.get(candidate.key)
+                    candidate.partial = candidate.partial or partial
+                    candidate.full = candidate.full or full
+                    if getattr(candidate, field) is not None:
+                        continue
+                pending.append(candidate)
+        if not pending:
+            return
+
+        def work(candidate):
+            try:
+                if field == "partial":
+                    candidate.partial = partial_hash(candidate.path, candidate.size)
+                else:
+                    candidate.full = full_hash(candidate.path)
+            except OSError as e:
+                logger.warning(f"计算哈希失败 {candidate.path}: {str(e)}")
+            return candidate
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="dedup") as pool:
+            done = list(pool.map(work, pending))
+        if self.cache is not None:
+            self.cache.put_many([(c.key, c.partial, c.full) for c in done
+                                 if getattr(c, field) is not None])
+
+
+def link_duplicate(job, original):
+    """硬链接模式：在计划的目标位置创建指向原件的硬链接，然后删除源文件
+
+    目标位置是 NameReserver 预留的占位文件，先链接到临时名再原子替换。
+    """
+    dest = job["dest"]
+    tmp = f"{dest}.{os.getpid()}.link"
+    os.link(original, tmp)
+    try:
+        os.replace(tmp, dest)
+    except OSError:
+        os.remove(tmp)
+        raise
+    try:
+        os.remove(job["src"])
+    except OSError:
+        os.remove(dest)
+        raise
@@ -2,20 +2,11 @@ import os
 import sys
 from PyQt6.QtWidgets import (
     QApplication, QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-    QCheckBox, QGroupBox, QComboBox, QListWidget, QListWidgetItem, QTabWidget, QWidget
+    QCheckBox, QGroupBox, QComboBox, QListWidget, QListWidgetItem, QTabWidget, QWidget, QProgressBar
 )
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QFont, QColor
 
-# 文件分类映射
-EN_CATEGORY_MAP = {
-    "图像": "images",
-    "视频": "videos",
-    "音频": "audios",
-    "HTML": "htmls",
-    "文档": "documents"
-}
-
 class ImageRenameDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -231,6 +222,110 @@ class CategoryDialog(QDialog):
     def get_categorize_option(self):
         return self.categorize_option.isChecked()
 
+class TransferProgressDialog(QDialog):
+    """文件移动进度：进度条加 暂停 / 继续 和 取消 按钮
+
+    取消只发出请求，对话框在传输线程真正停下、调用 finish() 后才关闭；
+    按 Esc 或关闭窗口等同于点击取消。
+    """
+
+    pause_toggled = pyqtSignal(bool)
+    cancel_requested = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("文件移动进度")
+        self.setMinimumWidth(460)
+        self._finished = False
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setSpacing(12)
+
+        self.label = QLabel("正在移动文件...")
+        self.label.setFont(QFont("Microsoft YaHei", 9))
+        self.label.setWordWrap(True)
+        layout.addWidget(self.label)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        layout.addWidget(self.progress_bar)
+
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+
+        self.pause_button = QPushButton("暂停")
+        self.pause_button.setCheckable(True)
+        self.pause_button.setStyleSheet("""
+            QPushButton {
+                background-color: #0d47a1;
+                color: white;
+                padding: 8px 16px;
+                border-radius: 4px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #1565c0;
+            }
+            QPushButton:checked {
+                background-color: #2e7d32;
+            }
+        """)
+        self.pause_button.toggled.connect(self.on_pause_toggled)
+        button_layout.addWidget(self.pause_button)
+
+        self.cancel_button = QPushButton("取消")
+        self.cancel_button.setStyleSheet("""
+            QPushButton {
+                background-color: #6c757d;
+                color: white;
+                padding: 8px 16px;
+                border-radius: 4px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #5a6268;
+            }
+        """)
+        self.cancel_button.clicked.connect(self.request_cancel)
+        button_layout.addWidget(self.cancel_button)
+
+        layout.addLayout(button_layout)
+        self.setLayout(layout)
+
+    def setValue(self, value):
+        self.progress_bar.setValue(value)
+
+    def setLabelText(self, text):
+        if not self.cancel_button.isEnabled():
+            return
+        self.label.setText(f"已暂停\n{text}" if self.pause_button.isChecked() else text)
+
+    def on_pause_toggled(self, paused):
+        self.pause_button.setText("继续" if paused else "暂停")
+        self.pause_toggled.emit(paused)
+
+    def request_cancel(self):
+        if not self.cancel_button.isEnabled():
+            return
+        self.cancel_button.setEnabled(False)
+        self.pause_button.setEnabled(False)
+        self.label.setText("正在取消，等待当前文件停止...")
+        self.cancel_requested.emit()
+
+    def finish(self):
+        """传输线程结束后调用，关闭对话框"""
+        self._finished = True
+        self.accept()
+
+    def reject(self):
+        # Esc / 关闭按钮：传输未结束时转为取消请求
+        if self._finished:
+            super().reject()
+        else:
+            self.request_cancel()
+
+
 class ErrorDialog(QDialog):
     def __init__(self, errors, parent=None):
         super().__init__(parent)
@@ -241,7 +336,14 @@ class ErrorDialog(QDialog):
         layout.setContentsMargins(15, 15, 15, 15)
         layout.setSpacing(10)
         
-        title_label = QLabel(f"成功处理 {len(errors['success'])} 个文件，失败 {len(errors['errors'])} 个文件")
+        duplicates = errors.get('duplicates', [])
+        title_text = f"成功处理 {len(errors['success'])} 个文件，失败 {len(errors['errors'])} 个文件"
+        if duplicates:
+            title_text += f"，重复 {len(duplicates)} 个文件"
+        cancelled = errors.get('cancelled', [])
+        if cancelled:
+            title_text += f"，取消 {len(cancelled)} 个文件（已保留在列表中）"
+        title_label = QLabel(title_text)
         title_label.setFont(QFont("Microsoft YaHei", 10, QFont.Weight.Bold))
         layout.addWidget(title_label)
         
@@ -272,6 +374,20 @@ class ErrorDialog(QDialog):
         
         error_layout.addWidget(error_list)
         tab_widget.addTab(error_tab, "错误文件")
+
+        # 重复文件标签页
+        if duplicates:
+            duplicate_tab = QWidget()
+            duplicate_layout = QVBoxLayout(duplicate_tab)
+
+            duplicate_list = QListWidget()
+            for info in duplicates:
+                item = QListWidgetItem(f"[{info['action']}] {info['name']} = {info['original']}")
+                item.setToolTip(info['src'])
+                duplicate_list.addItem(item)
+
+            duplicate_layout.addWidget(duplicate_list)
+            tab_widget.addTab(duplicate_tab, "重复文件")
         
         layout.addWidget(tab_widget, 1)
         
@@ -0,0 +1,225 @@
+import os
+from array import array
+from itertools import compress
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+from transfer import format_bytes
+from file_rules import get_classifier
+
+# 分类以单字节编码存放，即共享分类规则中的分类序号，最后一项表示未分类
+CATEGORY_LABELS = get_classifier().categories + ["其他"]
+OTHER_CATEGORY = len(CATEGORY_LABELS) - 1
+# 删除的行合并后超过这么多个连续区间时，不再逐段删除，而是一次重建所有列并重置模型
+MAX_REMOVE_RANGES = 16
+
+
+class FileQueueStore:
+    """待处理文件队列的列式存储
+
+    路径、大小、分类、自定义名称各占一列：大小用 array('q')，分类用 bytearray，
+    十万级文件也只有几列紧凑数组，不为每个文件创建对象。
+    """
+
+    def __init__(self):
+        self.paths = []
+        self.sizes = array('q')
+        self.categories = bytearray()
+        self.custom_names = []
+
+    def __len__(self):
+        return len(self.paths)
+
+    def append_many(self, items):
+        """items 为 (路径, 大小) 序列，大小为 None 时现场获取"""
+        sized = []
+        for path, size in items:
+            if size is None:
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    size = 0
+            sized.append((path, size))
+        # 没有扩展名等需要读取文件头的文件在线程池中批量识别
+        codes = get_classifier().classify_many(sized)
+        for (path, size), code in zip(sized, codes):
+            self.paths.append(path)
+            self.sizes.append(size)
+            self.categories.append(OTHER_CATEGORY if code is None else code)
+            self.custom_names.append(None)
+
+    def delete_range(self, first, last):
+        """删除 [first, last] 闭区间内的行"""
+        end = last + 1
+        del self.paths[first:end]
+        del self.sizes[first:end]
+        del self.categories[first:end]
+        del self.custom_names[first:end]
+
+    def delete_rows(self, rows):
+        """一次删除任意行：按保留掩码在一遍中重建所有列"""
+        keep = bytearray([1]) * len(self.paths)
+        for row in rows:
+            keep[row] = 0
+        self.paths = list(compress(self.paths, keep))
+        self.sizes = array('q', compress(self.sizes, keep))
+        self.categories = bytearray(compress(self.categories, keep))
+        self.custom_names = list(compress(self.custom_names, keep))
+
+    def clear(self):
+        self.paths = []
+        self.sizes = array('q')
+        self.categories = bytearray()
+        self.custom_names = []
+
+    def reorder(self, order):
+        """按 order（新位置 -> 旧行号）重排所有列"""
+        self.paths = [self.paths[i] for i in order]
+        self.sizes = array('q', (self.sizes[i] for i in order))
+        self.categories = bytearray(self.categories[i] for i in order)
+        self.custom_names = [self.custom_names[i] for i in order]
+
+    def total_size(self):
+        return sum(self.sizes)
+
+    def to_file_list(self):
+        """转换为 FileTransferThread 需要的 (路径, 自定义名称) 列表"""
+        return list(zip(self.paths, self.custom_names))
+
+
+def contiguous_ranges(rows):
+    """把行号集合合并为 (first, last) 连续区间，按从后到前的顺序返回，便于依次删除"""
+    ranges = []
+    for row in sorted(set(rows), reverse=True):
+        if ranges and ranges[-1][0] == row + 1:
+            ranges[-1][0] = row
+        else:
+            ranges.append([row, row])
+    return [(first, last) for first, last in ranges]
+
+
+class FileQueueModel(QAbstractTableModel):
+    """待处理文件队列的表格模型，数据按需格式化，不创建列表项"""
+
+    COLUMNS = ("文件名", "大小", "分类", "自定义名称", "路径")
+    NAME, SIZE, CATEGORY, CUSTOM_NAME, PATH = range(5)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.store = FileQueueStore()
+
+    def __len__(self):
+        return len(self.store)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.store)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+        store = self.store
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            if column == self.NAME:
+                return os.path.basename(store.paths[row])
+            if column == self.SIZE:
+                return format_bytes(store.sizes[row])
+            if column == self.CATEGORY:
+                return CATEGORY_LABELS[store.categories[row]]
+            if column == self.CUSTOM_NAME:
+                return store.custom_names[row] or ""
+            if column == self.PATH:
+                return store.paths[row]
+        elif role == Qt.ItemDataRole.ToolTipRole:
+            return store.paths[row]
+        elif role == Qt.ItemDataRole.TextAlignmentRole and column == self.SIZE:
+            return int(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid() and index.column() == self.CUSTOM_NAME:
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not index.isValid() or index.column() != self.CUSTOM_NAME or role != Qt.ItemDataRole.EditRole:
+            return False
+        value = str(value).strip()
+        self.store.custom_names[index.row()] = value or None
+        self.dataChanged.emit(index, index)
+        return True
+
+    # ---- 批量操作 ----
+
+    def append_files(self, items):
+        """追加 (路径, 大小) 列表，整批只触发一次行插入"""
+        items = list(items)
+        if not items:
+            return
+        first = len(self.store)
+        self.beginInsertRows(QModelIndex(), first, first + len(items) - 1)
+        self.store.append_many(items)
+        self.endInsertRows()
+
+    def remove_rows(self, rows):
+        """批量删除行：排序后合并为连续区间，从后往前逐段删除
+
+        每段删除都要移动后面所有行，分散的选择（例如取消传输后只保留部分文件）
+        区间很多时改为一遍重建所有列，只发出一次模型重置。
+        """
+        ranges = contiguous_ranges(rows)
+        if len(ranges) > MAX_REMOVE_RANGES:
+            self.beginResetModel()
+            self.store.delete_rows(rows)
+            self.endResetModel()
+            return
+        for first, last in ranges:
+            self.beginRemoveRows(QModelIndex(), first, last)
+            self.store.delete_range(first, last)
+            self.endRemoveRows()
+
+    def retain_paths(self, paths):
+        """只保留给定路径的行，例如取消传输后尚未移动的文件，自定义名称随之保留"""
+        keep = set(paths)
+        self.remove_rows([row for row, path in enumerate(self.store.paths) if path not in keep])
+
+    def clear(self):
+        self.beginResetModel()
+        self.store.clear()
+        self.endResetModel()
+
+    def to_file_list(self):
+        return self.store.to_file_list()
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        store = self.store
+        keys = {
+            self.NAME: lambda i: os.path.basename(store.paths[i]).lower(),
+            self.SIZE: store.sizes.__getitem__,
+            self.CATEGORY: store.categories.__getitem__,
+            self.CUSTOM_NAME: lambda i: store.custom_names[i] or "",
+            self.PATH: lambda i: store.paths[i].lower(),
+        }
+        if column not in keys:
+            return
+        self.layoutAboutToBeChanged.emit()
+        order_rows = sorted(range(len(store)), key=keys[column],
+                            reverse=order == Qt.SortOrder.DescendingOrder)
+        store.reorder(order_rows)
+
+        # 更新持久索引，保持选中状态
+        new_rows = [0] * len(order_rows)
+        for new_row, old_row in enumerate(order_rows):
+            new_rows[old_row] = new_row
+        old_indexes = self.persistentIndexList()
+        new_indexes = [self.index(new_rows[i.row()], i.column()) for i in old_indexes]
+        self.changePersistentIndexList(old_indexes, new_indexes)
+        self.layoutChanged.emit()
@@ -1,134 +1,329 @@
-import os
-import json
-from datetime import datetime
-from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QListWidget, QListWidgetItem
-)
-from PyQt6.QtCore import Qt, QSize
-from PyQt6.QtGui import QFont
-from PyQt6.QtWidgets import QApplication
-
-class HistoryItemWidget(QWidget):
-    def __init__(self, file_info, parent=None):
+from PyQt6.QtWidgets import QApplication, QStyledItemDelegate, QStyle, QToolTip
+from PyQt6.QtCore import Qt, QSize, QRect, QEvent, QAbstractListModel, QModelIndex, pyqtSignal
+from PyQt6.QtGui import QFont, QColor, QFontMetrics, QPainter
+
+
+def build_markdown(file_info):
+    """根据文件类型生成Markdown格式"""
+    name = file_info['name']
+    path = file_info['path']
+    if file_info['category'] == "images":
+        return f"![{name}]({path})"
+    return f"[{name}]({path})"
+
+
+def build_html(file_info):
+    """根据文件类型生成HTML标签"""
+    name = file_info['name']
+    path = file_info['path']
+    if file_info['category'] == "images":
+        return f'<img src="{path}" alt="{name}" width="300">'
+    elif file_info['category'] == "videos":
+        return f'<video src="{path}" controls width="500"></video>'
+    elif file_info['category'] == "audios":
+        return f'<audio src="{path}" controls>Audio</audio>'
+    return f'<a href="{path}" target="_blank">{name}</a>'
+
+
+class HistoryListModel(QAbstractListModel):
+    """历史记录列表模型
+
+    每条历史记录展开为一行时间标题加若干文件行，只保存轻量的元组，不创建任何控件。
+    数据通过 fetcher 分页加载：视图滚动到底部时 Qt 会调用 canFetchMore/fetchMore。
+    """
+
+    FILE_INFO_ROLE = Qt.ItemDataRole.UserRole
+    ROW_KIND_ROLE = Qt.ItemDataRole.UserRole + 1
+    # 标题行对应的历史记录，可撤销的批次才有值
+    UNDO_ENTRY_ROLE = Qt.ItemDataRole.UserRole + 2
+
+    HEADER = "header"
+    FILE = "file"
+
+    def __init__(self, parent=None):
         super().__init__(parent)
-        self.file_info = file_info
-        
-        layout = QVBoxLayout()  # 改为垂直布局
-        layout.setContentsMargins(5, 5, 5, 5)
-        layout.setSpacing(5)
-        
-        # 文件名标签 - 允许换行
-        self.file_label = QLabel(f"{file_info['name']} → {file_info['folder']}")
-        self.file_label.setStyleSheet("color: #e0e0e0;")
-        self.file_label.setWordWrap(True)  # 启用自动换行
-        layout.addWidget(self.file_label, 1)
-        
-        # 按钮区域
-        button_layout = QHBoxLayout()
-        button_layout.setSpacing(3)
-        
-        # 复制Markdown按钮
-        self.copy_md_button = QPushButton("MD")
-        self.copy_md_button.setFixedSize(30, 25)
-        self.copy_md_button.setStyleSheet("""
-            QPushButton {
-                background-color: #0d47a1;
-                color: white;
-                border-radius: 3px;
-                font-size: 10px;
-            }
-            QPushButton:hover {
-                background-color: #1565c0;
-            }
-        """)
-        self.copy_md_button.setToolTip("复制Markdown格式")
-        self.copy_md_button.clicked.connect(self.copy_markdown)
-        button_layout.addWidget(self.copy_md_button)
-        
-        # 复制HTML按钮
-        self.copy_html_button = QPushButton("HTML")
-        self.copy_html_button.setFixedSize(35, 25)
-        self.copy_html_button.setStyleSheet("""
-            QPushButton {
-                background-color: #2e7d32;
-                color: white;
-                border-radius: 3px;
-                font-size: 10px;
-            }
-            QPushButton:hover {
-                background-color: #3e8e40;
-            }
-        """)
-        self.copy_html_button.setToolTip("复制HTML标签")
-        self.copy_html_button.clicked.connect(self.copy_html)
-        button_layout.addWidget(self.copy_html_button)
-        
-        # 复制路径按钮
-        self.copy_path_button = QPushButton("路径")
-        self.copy_path_button.setFixedSize(35, 25)
-        self.copy_path_button.setStyleSheet("""
-            QPushButton {
-                background-color: #6c757d;
-                color: white;
-                border-radius: 3px;
-                font-size: 10px;
-            }
-            QPushButton:hover {
-                background-color: #5a6268;
-            }
-        """)
-        self.copy_path_button.setToolTip("复制文件绝对路径")
-        self.copy_path_button.clicked.connect(self.copy_path)
-        button_layout.addWidget(self.copy_path_button)
-        
-        button_layout.addStretch()  # 添加伸缩使按钮右对齐
-        layout.addLayout(button_layout)
-        self.setLayout(layout)
-    
-    def copy_markdown(self):
-        """根据文件类型生成并复制Markdown格式"""
-        name = self.file_info['name']
-        path = self.file_info['path']
-        
-        if self.file_info['category'] == "images":
-            content = f"![{name}]({path})"
-        elif self.file_info['category'] == "videos":
-            content = f"[{name}]({path})"
-        elif self.file_info['category'] == "audios":
-            content = f"[{name}]({path})"
-        elif self.file_info['category'] == "htmls":
-            content = f"[{name}]({path})"
-        elif self.file_info['category'] == "documents":
-            content = f"[{name}]({path})"
-        else:
-            content = f"[{name}]({path})"
-        
-        clipboard = QApplication.clipboard()
-        clipboard.setText(content)
-        
-    def copy_html(self):
-        """根据文件类型生成并复制HTML标签"""
-        name = self.file_info['name']
-        path = self.file_info['path']
-        
-        if self.file_info['category'] == "images":
-            content = f'<img src="{path}" alt="{name}" width="300">'
-        elif self.file_info['category'] == "videos":
-            content = f'<video src="{path}" controls width="500"></video>'
-        elif self.file_info['category'] == "audios":
-            content = f'<audio src="{path}" controls>Audio</audio>'
-        elif self.file_info['category'] == "htmls":
-            content = f'<a href="{path}" target="_blank">{name}</a>'
-        elif self.file_info['category'] == "documents":
-            content = f'<a href="{path}" target="_blank">{name}</a>'
+        self._rows = []  # (HEADER, entry) 或 (FILE, file_info)
+        self._undone = set()  # 已被撤销的批次号
+        self._fetcher = None
+        self._token = None
+        self._exhausted = True
+
+    def set_source(self, fetcher):
+        """切换数据源并清空列表
+
+        fetcher(token) -> (entries, next_token)，entries 按时间从新到旧排列，
+        首次调用 token 为 None，next_token 为 None 表示没有更多数据。
+        """
+        self.beginResetModel()
+        self._rows = []
+        self._undone = set()
+        self._fetcher = fetcher
+        self._token = None
+        self._exhausted = fetcher is None
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        kind, value = self._rows[index.row()]
+        if role == self.ROW_KIND_ROLE:
+            return kind
+        if role == Qt.ItemDataRole.DisplayRole:
+            if kind == self.HEADER:
+                return f"{value['time']}  撤销" if value.get("undo_of") else value["time"]
+            return f"{value['name']} → {value['folder']}"
+        if role == self.UNDO_ENTRY_ROLE and kind == self.HEADER:
+            return value if self.can_undo(value) else None
+        if role == self.FILE_INFO_ROLE and kind == self.FILE:
+            return value
+        if role == Qt.ItemDataRole.ToolTipRole and kind == self.FILE:
+            return value['path']
+        return None
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent):
+        if parent.isValid() or self._exhausted:
+            return
+        entries, self._token = self._fetcher(self._token)
+        if self._token is None:
+            self._exhausted = True
+        rows = self._flatten(entries, self._last_header())
+        if rows:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+            self._rows.extend(rows)
+            self.endInsertRows()
+
+    def prepend_entry(self, entry):
+        """新的传输记录插入到顶部，不重建已有的行"""
+        rows = self._flatten([entry])
+        if rows:
+            self.beginInsertRows(QModelIndex(), 0, len(rows) - 1)
+            self._rows[0:0] = rows
+            self.endInsertRows()
+
+    def can_undo(self, entry):
+        """带批次号、记录了源路径且尚未被撤销的传输记录可以撤销"""
+        batch = entry.get("batch")
+        return (batch is not None and not entry.get("undo_of") and batch not in self._undone
+                and any(file_info.get("src") for file_info in entry["files"]))
+
+    def mark_undone(self, batch):
+        """批次被撤销后隐藏其撤销按钮"""
+        self._undone.add(batch)
+        for row, (kind, value) in enumerate(self._rows):
+            if kind == self.HEADER and value.get("batch") == batch:
+                index = self.index(row)
+                self.dataChanged.emit(index, index)
+
+    def _last_header(self):
+        for kind, value in reversed(self._rows):
+            if kind == self.HEADER:
+                return value
+        return None
+
+    @staticmethod
+    def _header_key(entry):
+        # 有批次号的记录各自一个标题；搜索结果没有批次号，同一时间的合并为一个标题
+        return entry.get("batch") or entry["time"]
+
+    def _flatten(self, entries, last_header=None):
+        rows = []
+        last_key = None if last_header is None else self._header_key(last_header)
+        for entry in entries:
+            # 撤销记录比原记录新，按从新到旧读取时总是先出现
+            if entry.get("undo_of"):
+                self._undone.add(entry["undo_of"])
+            # 分页边界可能把同一时间的记录拆成两段，此时不再重复标题
+            key = self._header_key(entry)
+            if key != last_key:
+                rows.append((self.HEADER, entry))
+                last_key = key
+            for file_info in entry["files"]:
+                rows.append((self.FILE, file_info))
+        return rows
+
+
+class HistoryItemDelegate(QStyledItemDelegate):
+    """绘制历史记录行，并在委托里对 MD / HTML / 路径 三个按钮区域做点击检测
+
+    可撤销批次的标题行右侧绘制"撤销此批次"按钮，点击时发出 undo_requested(历史记录)。
+    """
+
+    undo_requested = pyqtSignal(object)
+
+    # (键, 文本, 宽度, 背景色, 悬停色, 提示)
+    BUTTONS = (
+        ("md", "MD", 30, "#0d47a1", "#1565c0", "复制Markdown格式"),
+        ("html", "HTML", 35, "#2e7d32", "#3e8e40", "复制HTML标签"),
+        ("path", "路径", 35, "#6c757d", "#5a6268", "复制文件绝对路径"),
+    )
+    MARGIN = 5
+    BUTTON_HEIGHT = 25
+    BUTTON_SPACING = 3
+    HEADER_HEIGHT = 28
+    UNDO_BUTTON = ("撤销此批次", 72, "#b71c1c", "#d32f2f")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._hover = None  # (行号, 按钮键)
+        self.button_font = QFont()
+        self.button_font.setPixelSize(10)
+
+    # ---- 布局 ----
+
+    def _text_rect(self, option, text):
+        width = self._view_width(option) - 2 * self.MARGIN
+        metrics = QFontMetrics(option.font)
+        bounds = metrics.boundingRect(QRect(0, 0, max(width, 10), 0), Qt.TextFlag.TextWordWrap, text)
+        return QRect(option.rect.left() + self.MARGIN, option.rect.top() + self.MARGIN, width, bounds.height())
+
+    def _button_rects(self, option, text):
+        text_rect = self._text_rect(option, text)
+        x = option.rect.left() + self.MARGIN
+        y = text_rect.bottom() + 1 + self.MARGIN
+        rects = []
+        for key, label, width, color, hover_color, tooltip in self.BUTTONS:
+            rects.append((key, QRect(x, y, width, self.BUTTON_HEIGHT)))
+            x += width + self.BUTTON_SPACING
+        return rects
+
+    @staticmethod
+    def _view_width(option):
+        widget = option.widget
+        if widget is not None and hasattr(widget, 'viewport'):
+            return widget.viewport().width()
+        return option.rect.width()
+
+    def _hit_test(self, option, index, pos):
+        text = index.data(Qt.ItemDataRole.DisplayRole)
+        for key, rect in self._button_rects(option, text):
+            if rect.contains(pos):
+                return key
+        return None
+
+    def _undo_rect(self, option):
+        width = self.UNDO_BUTTON[1]
+        height = self.HEADER_HEIGHT - 2 * 3
+        return QRect(option.rect.right() - self.MARGIN - width + 1, option.rect.top() + 3, width, height)
+
+    def sizeHint(self, option, index):
+        width = self._view_width(option)
+        if index.data(HistoryListModel.ROW_KIND_ROLE) == HistoryListModel.HEADER:
+            return QSize(width, self.HEADER_HEIGHT)
+        text_rect = self._text_rect(option, index.data(Qt.ItemDataRole.DisplayRole))
+        return QSize(width, text_rect.height() + self.BUTTON_HEIGHT + 3 * self.MARGIN)
+
+    # ---- 绘制 ----
+
+    def paint(self, painter, option, index):
+        painter.save()
+        kind = index.data(HistoryListModel.ROW_KIND_ROLE)
+        text = index.data(Qt.ItemDataRole.DisplayRole)
+
+        if kind == HistoryListModel.HEADER:
+            painter.fillRect(option.rect, QColor("#1e1e1e"))
+            font = QFont(option.font)
+            font.setBold(True)
+            painter.setFont(font)
+            painter.setPen(QColor("#bb86fc"))
+            painter.drawText(option.rect.adjusted(self.MARGIN, 0, -self.MARGIN, 0),
+                             Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft, text)
+            if index.data(HistoryListModel.UNDO_ENTRY_ROLE) is not None:
+                label, _, color, hover_color = self.UNDO_BUTTON
+                hovered = (self._hover == (index.row(), "undo")
+                           and option.state & QStyle.StateFlag.State_MouseOver)
+                painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+                painter.setPen(Qt.PenStyle.NoPen)
+                painter.setBrush(QColor(hover_color if hovered else color))
+                rect = self._undo_rect(option)
+                painter.drawRoundedRect(rect, 3, 3)
+                painter.setFont(self.button_font)
+                painter.setPen(QColor("white"))
+                painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, label)
+            painter.restore()
+            return
+
+        if option.state & QStyle.StateFlag.State_Selected:
+            painter.fillRect(option.rect, QColor("#0d47a1"))
+
+        painter.setFont(option.font)
+        painter.setPen(QColor("#e0e0e0"))
+        painter.drawText(self._text_rect(option, text), Qt.TextFlag.TextWordWrap, text)
+
+        hovered = self._hover[1] if (self._hover and self._hover[0] == index.row()
+                                     and option.state & QStyle.StateFlag.State_MouseOver) else None
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setFont(self.button_font)
+        for (key, rect), button in zip(self._button_rects(option, text), self.BUTTONS):
+            _, label, _, color, hover_color, _ = button
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(QColor(hover_color if key == hovered else color))
+            painter.drawRoundedRect(rect, 3, 3)
+            painter.setPen(QColor("white"))
+            painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, label)
+        painter.restore()
+
+    # ---- 交互 ----
+
+    def editorEvent(self, event, model, option, index):
+        if index.data(HistoryListModel.ROW_KIND_ROLE) == HistoryListModel.HEADER:
+            return self._header_event(event, option, index)
+        event_type = event.type()
+        if event_type == QEvent.Type.MouseMove:
+            hover = (index.row(), self._hit_test(option, index, event.position().toPoint()))
+            if hover != self._hover:
+                self._hover = hover
+                if option.widget is not None:
+                    option.widget.viewport().update()
+            return False
+        if event_type == QEvent.Type.MouseButtonRelease and event.button() == Qt.MouseButton.LeftButton:
+            key = self._hit_test(option, index, event.position().toPoint())
+            if key:
+                self.copy_to_clipboard(key, index.data(HistoryListModel.FILE_INFO_ROLE))
+                return True
+        return False
+
+    def _header_event(self, event, option, index):
+        entry = index.data(HistoryListModel.UNDO_ENTRY_ROLE)
+        if entry is None:
+            return False
+        event_type = event.type()
+        on_button = self._undo_rect(option).contains(event.position().toPoint()) \
+            if event_type in (QEvent.Type.MouseMove, QEvent.Type.MouseButtonRelease) else False
+        if event_type == QEvent.Type.MouseMove:
+            hover = (index.row(), "undo" if on_button else None)
+            if hover != self._hover:
+                self._hover = hover
+                if option.widget is not None:
+                    option.widget.viewport().update()
+            return False
+        if event_type == QEvent.Type.MouseButtonRelease and event.button() == Qt.MouseButton.LeftButton and on_button:
+            self.undo_requested.emit(entry)
+            return True
+        return False
+
+    def helpEvent(self, event, view, option, index):
+        if event.type() == QEvent.Type.ToolTip and index.data(HistoryListModel.ROW_KIND_ROLE) == HistoryListModel.FILE:
+            key = self._hit_test(option, index, event.pos())
+            for button in self.BUTTONS:
+                if button[0] == key:
+                    QToolTip.showText(event.globalPos(), button[5], view)
+                    return True
+        return super().helpEvent(event, view, option, index)
+
+    @staticmethod
+    def copy_to_clipboard(key, file_info):
+        if key == "md":
+            content = build_markdown(file_info)
+        elif key == "html":
+            content = build_html(file_info)
         else:
-            content = f'<a href="{path}" target="_blank">{name}</a>'
-        
-        clipboard = QApplication.clipboard()
-        clipboard.setText(content)
-        
-    def copy_path(self):
-        """复制文件绝对路径"""
-        path = self.file_info['path']
-        clipboard = QApplication.clipboard()
-        clipboard.setText(path)
\ No newline at end of file
+            # 复制文件绝对路径
+            content = file_info['path']
+        QApplication.clipboard().setText(content)
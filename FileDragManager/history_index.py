@@ -0,0 +1,256 @@
+import os
+import sys
+import json
+import sqlite3
+import logging
+import argparse
+import threading
+
+from history_store import HistoryStore
+
+logger = logging.getLogger('FileManager')
+
+# 搜索结果的默认条数上限
+DEFAULT_SEARCH_LIMIT = 200
+# trigram 无法索引少于 3 个字符的查询，只能逐行 LIKE 扫描；这类查询只扫描最近的这么多条文件记录，
+# 没有匹配时也不必扫完整个表
+SHORT_QUERY_SCAN_LIMIT = 10000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    time TEXT NOT NULL,
+    name TEXT NOT NULL,
+    category TEXT,
+    folder TEXT,
+    path TEXT NOT NULL,
+    relative_path TEXT,
+    UNIQUE (time, path)
+);
+CREATE INDEX IF NOT EXISTS files_time ON files(time);
+"""
+
+# 外部内容表 + 触发器，FTS 索引与 files 表自动保持同步
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5(
+    name, folder, relative_path,
+    content='files', content_rowid='id', tokenize='{tokenizer}'
+);
+CREATE TRIGGER IF NOT EXISTS files_ai AFTER INSERT ON files BEGIN
+    INSERT INTO files_fts(rowid, name, folder, relative_path)
+    VALUES (new.id, new.name, new.folder, new.relative_path);
+END;
+CREATE TRIGGER IF NOT EXISTS files_ad AFTER DELETE ON files BEGIN
+    INSERT INTO files_fts(files_fts, rowid, name, folder, relative_path)
+    VALUES ('delete', old.id, old.name, old.folder, old.relative_path);
+END;
+"""
+
+
+class HistoryIndex:
+    """历史记录的 SQLite 索引，支持对文件名、目录和相对路径做全文搜索
+
+    优先使用 trigram 分词（支持中文和任意子串），SQLite 版本过旧时退回 unicode61 前缀匹配，
+    没有 FTS5 时退回 LIKE 查询。连接在线程间共享，由锁串行化。
+    """
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self.fts_mode = self._create_fts()
+        self._conn.commit()
+
+    def _create_fts(self):
+        existing = self._conn.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'files_fts'").fetchone()
+        if existing:
+            return 'trigram' if 'trigram' in existing[0] else 'unicode61'
+        for tokenizer in ('trigram', 'unicode61'):
+            try:
+                self._conn.executescript(_FTS_SCHEMA.format(tokenizer=tokenizer))
+                return tokenizer
+            except sqlite3.OperationalError:
+                continue
+        logger.warning("SQLite 不支持 FTS5，历史搜索将使用 LIKE 查询")
+        return None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def is_empty(self):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM files LIMIT 1").fetchone() is None
+
+    # ---- 写入 ----
+
+    def add_entry(self, entry):
+        self.add_entries([entry])
+
+    def add_entries(self, entries):
+        """写入若干条历史记录（{"time": ..., "files": [...]}），重复的记录会被忽略"""
+        rows = []
+        for entry in entries:
+            time_str = entry.get("time", "")
+            for file_info in entry.get("files", []):
+                rows.append((
+                    time_str,
+                    file_info.get("name", ""),
+                    file_info.get("category"),
+                    file_info.get("folder"),
+                    file_info.get("path", ""),
+                    file_info.get("relative_path")
+                ))
+        if not rows:
+            return 0
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.executemany(
+                    "INSERT OR IGNORE INTO files (time, name, category, folder, path, relative_path) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", rows)
+        return cursor.rowcount
+
+    def import_entries(self, entries, batch_size=500):
+        """分批导入一个记录迭代器，返回新增的文件条数"""
+        total = 0
+        batch = []
+        for entry in entries:
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                total += self.add_entries(batch)
+                batch = []
+        if batch:
+            total += self.add_entries(batch)
+        return total
+
+    def import_history_file(self, path):
+        """导入旧版 history.json（JSON 数组）或 history.jsonl（JSON Lines）
+
+        JSON Lines 中无法解析的行（例如崩溃时写了一半的最后一行）跳过并记录日志。
+        """
+        skipped = 0
+
+        def parse_lines(f):
+            nonlocal skipped
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = HistoryStore._parse_line(line)
+                if entry is None:
+                    skipped += 1
+                    continue
+                yield entry
+
+        # 按字节读取：被截断在多字节字符中间的行交给 _parse_line 跳过，而不是在解码时中断导入
+        with open(path, 'rb') as f:
+            head = f.read(1)
+            f.seek(0)
+            if head == b'[':
+                entries = json.load(f)
+            else:
+                entries = parse_lines(f)
+            count = self.import_entries(entry for entry in entries if isinstance(entry, dict))
+        if skipped:
+            logger.warning(f"{path} 中有 {skipped} 行无法解析，已跳过")
+        logger.info(f"从 {path} 导入了 {count} 条历史文件记录")
+        return count
+
+    # ---- 查询 ----
+
+    def search(self, query, limit=DEFAULT_SEARCH_LIMIT, offset=0):
+        """按关键字搜索，返回按时间从新到旧排列的记录分组 [{"time": ..., "files": [...]}]"""
+        return self._group_rows(self.search_rows(query, limit, offset))
+
+    def search_page(self, query, token, limit=DEFAULT_SEARCH_LIMIT):
+        """分页搜索，返回 (entries, next_token)，token 为已读取的行数，用于历史面板的无限滚动"""
+        offset = token or 0
+        rows = self.search_rows(query, limit, offset)
+        next_token = offset + len(rows) if len(rows) == limit else None
+        return self._group_rows(rows), next_token
+
+    def is_scan_limited(self, query):
+        """查询是否只能 LIKE 扫描最近 SHORT_QUERY_SCAN_LIMIT 条记录（界面据此提示用户）"""
+        return self.fts_mode == 'trigram' and not any(len(term) >= 3 for term in query.split())
+
+    def search_rows(self, query, limit=DEFAULT_SEARCH_LIMIT, offset=0):
+        query = query.strip()
+        if not query:
+            return []
+        sql, params = self._build_query(query, limit, offset)
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _like_conditions(terms):
+        """每个词都要出现在文件名、目录或相对路径之一中，返回 (条件列表, 参数)"""
+        conditions = []
+        params = []
+        for term in terms:
+            pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            conditions.append("(f.name LIKE ? ESCAPE '\\' OR f.folder LIKE ? ESCAPE '\\' "
+                              "OR f.relative_path LIKE ? ESCAPE '\\')")
+            params.extend((pattern, pattern, pattern))
+        return conditions, params
+
+    def _build_query(self, query, limit, offset=0):
+        columns = "f.time, f.name, f.category, f.folder, f.path, f.relative_path"
+        terms = query.split()
+        order = "ORDER BY f.time DESC, f.id LIMIT ? OFFSET ?"
+        if self.fts_mode == 'unicode61':
+            match = ' AND '.join('"' + term.replace('"', '""') + '"*' for term in terms)
+            return (f"SELECT {columns} FROM files_fts JOIN files f ON f.id = files_fts.rowid "
+                    f"WHERE files_fts MATCH ? {order}", (match, limit, offset))
+        # trigram 无法匹配少于 3 个字符的词：只把 3 个字符以上的词交给 MATCH，
+        # 较短的词在全文索引选出的行上用 LIKE 过滤
+        long_terms = [term for term in terms if len(term) >= 3] if self.fts_mode == 'trigram' else []
+        conditions, params = self._like_conditions([term for term in terms if term not in long_terms])
+        if long_terms:
+            match = ' AND '.join('"' + term.replace('"', '""') + '"' for term in long_terms)
+            where = ' AND '.join(["files_fts MATCH ?"] + conditions)
+            return (f"SELECT {columns} FROM files_fts JOIN files f ON f.id = files_fts.rowid "
+                    f"WHERE {where} {order}", (match, *params, limit, offset))
+        # 全部是短词（只扫描最近的记录），或者没有 FTS5
+        source = "files"
+        if self.fts_mode == 'trigram':
+            source = "(SELECT * FROM files ORDER BY time DESC LIMIT ?)"
+            params.insert(0, SHORT_QUERY_SCAN_LIMIT)
+        return (f"SELECT {columns} FROM {source} f WHERE {' AND '.join(conditions)} {order}",
+                (*params, limit, offset))
+
+    @staticmethod
+    def _group_rows(rows):
+        entries = []
+        for time_str, name, category, folder, path, relative_path in rows:
+            if not entries or entries[-1]["time"] != time_str:
+                entries.append({"time": time_str, "files": []})
+            entries[-1]["files"].append({
+                "name": name,
+                "category": category,
+                "folder": folder,
+                "path": path,
+                "relative_path": relative_path
+            })
+        return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description='把历史记录文件导入 SQLite 搜索索引')
+    parser.add_argument('db_file', help='索引数据库路径，例如 history.db')
+    parser.add_argument('history_files', nargs='+', help='history.json 或 history.jsonl 文件')
+    args = parser.parse_args()
+
+    index = HistoryIndex(args.db_file)
+    for path in args.history_files:
+        if not os.path.exists(path):
+            print(f"文件不存在: {path}", file=sys.stderr)
+            continue
+        print(f"{path}: 导入 {index.import_history_file(path)} 条")
+    index.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+import os
+import json
+import logging
+import threading
+
+logger = logging.getLogger('FileManager')
+
+# 日志文件超过该大小时触发后台压缩和轮转
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+# 压缩后主文件保留的最近记录不超过 max_bytes 的这一比例，更早的记录转存到归档文件；
+# 按字节而不是按条数保留，压缩后总能留出足够的空间，不会每次追加都重新压缩
+DEFAULT_KEEP_RATIO = 0.5
+DEFAULT_MAX_ARCHIVES = 5
+
+_READ_BLOCK_SIZE = 64 * 1024
+
+
+class HistoryStore:
+    """追加写入的历史记录存储（JSON Lines）
+
+    每次传输只追加一行并 fsync，启动时从文件末尾倒序读取需要的几条记录，
+    不再整体解析和重写 history.json。文件过大时在后台线程中压缩：
+    去掉损坏的行，把较早的记录轮转到 history.jsonl.1、.2 … 归档文件。
+    """
+
+    def __init__(self, journal_file, legacy_file=None, max_bytes=DEFAULT_MAX_BYTES,
+                 keep_bytes=None, max_archives=DEFAULT_MAX_ARCHIVES):
+        self.journal_file = journal_file
+        self.legacy_file = legacy_file
+        self.max_bytes = max_bytes
+        self.keep_bytes = int(max_bytes * DEFAULT_KEEP_RATIO) if keep_bytes is None else keep_bytes
+        self.max_archives = max_archives
+        self._lock = threading.Lock()
+        self._compact_thread = None
+        # 每次压缩替换文件后递增，旧的分页位置随之失效
+        self.generation = 0
+
+        if legacy_file:
+            self.migrate_legacy()
+
+    # ---- 写入 ----
+
+    def append(self, entry):
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with self._lock:
+            with open(self.journal_file, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+        self.maybe_compact()
+
+    # ---- 读取 ----
+
+    def read_tail(self, count):
+        """返回最近 count 条记录，按时间从旧到新排列"""
+        entries, _ = self.read_page(None, count)
+        entries.reverse()
+        return entries
+
+    def read_page(self, token, count):
+        """倒序分页读取，返回 (entries, next_token)
+
+        entries 按时间从新到旧排列；token 为 None 表示从文件末尾开始，
+        next_token 为 None 表示已经读到文件开头（或文件在分页期间被压缩过）。
+        """
+        with self._lock:
+            if token is not None and token[0] != self.generation:
+                return [], None
+            try:
+                with open(self.journal_file, 'rb') as f:
+                    end = f.seek(0, os.SEEK_END) if token is None else token[1]
+                    lines, start = self._read_lines_backward(f, end, count)
+            except FileNotFoundError:
+                return [], None
+            generation = self.generation
+        entries = [entry for entry in (self._parse_line(line) for line in reversed(lines)) if entry is not None]
+        return entries, ((generation, start) if start > 0 else None)
+
+    def iter_entries(self, include_archives=False):
+        """按时间顺序遍历全部记录，include_archives 时先遍历归档文件"""
+        files = []
+        if include_archives:
+            for i in range(self.max_archives, 0, -1):
+                files.append(self._archive_path(i))
+        files.append(self.journal_file)
+        for path in files:
+            try:
+                with open(path, 'rb') as f:
+                    for line in f:
+                        entry = self._parse_line(line)
+                        if entry is not None:
+                            yield entry
+            except FileNotFoundError:
+                continue
+
+    @staticmethod
+    def _read_lines_backward(f, end, count):
+        """从 end 位置向前按块读取最多 count 行，返回 (按文件顺序排列的行, 第一行的起始位置)"""
+        data = b''
+        pos = end
+        while pos > 0 and data.count(b'\n') <= count:
+            size = min(_READ_BLOCK_SIZE, pos)
+            pos -= size
+            f.seek(pos)
+            data = f.read(size) + data
+
+        # data 对应文件的 [pos, end) 区间，从尾部逐行切出
+        lines = []
+        cut = len(data)
+        while cut > 0 and len(lines) < count:
+            newline = data.rfind(b'\n', 0, cut - 1)
+            if newline == -1:
+                if pos > 0:
+                    # 块的开头是被截断的半行，留给下一页
+                    break
+                line, cut = data[:cut], 0
+            else:
+                line, cut = data[newline + 1:cut], newline + 1
+            if line.strip():
+                lines.append(line)
+        lines.reverse()
+        return lines, pos + cut
+
+    @staticmethod
+    def _parse_line(line):
+        try:
+            entry = json.loads(line)
+        except (ValueError, UnicodeDecodeError):
+            # 崩溃时写了一半的行直接跳过
+            return None
+        return entry if isinstance(entry, dict) else None
+
+    # ---- 迁移 ----
+
+    def migrate_legacy(self):
+        """把旧版 history.json 一次性转换为 JSON Lines，转换后旧文件改名保留"""
+        if not self.legacy_file or not os.path.exists(self.legacy_file):
+            return
+        if os.path.exists(self.journal_file):
+            return
+        try:
+            with open(self.legacy_file, 'r', encoding='utf-8') as f:
+                history = json.load(f)
+        except Exception as e:
+            logger.error(f"读取旧历史记录失败: {str(e)}")
+            return
+        if not isinstance(history, list):
+            return
+
+        tmp_file = self.journal_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            for entry in history:
+                if isinstance(entry, dict):
+                    f.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.journal_file)
+        os.replace(self.legacy_file, self.legacy_file + '.migrated')
+        logger.info(f"已迁移 {len(history)} 条历史记录到 {self.journal_file}")
+
+    # ---- 压缩与轮转 ----
+
+    def maybe_compact(self):
+        try:
+            size = os.path.getsize(self.journal_file)
+        except OSError:
+            return
+        if size > self.max_bytes:
+            self.compact_async()
+
+    def compact_async(self):
+        """在后台线程中压缩日志，已有压缩任务运行时直接返回"""
+        if self._compact_thread and self._compact_thread.is_alive():
+            return
+        self._compact_thread = threading.Thread(target=self.compact, name="history-compact", daemon=True)
+        self._compact_thread.start()
+
+    def compact(self):
+        try:
+            self._compact()
+        except Exception as e:
+            logger.error(f"压缩历史记录失败: {str(e)}")
+
+    def _compact(self):
+        # 第一阶段不加锁：读取当前文件快照并写出新文件，期间的追加写入不受影响
+        with open(self.journal_file, 'rb') as f:
+            snapshot = f.read()
+        snapshot_end = len(snapshot)
+        valid_lines = [line for line in snapshot.split(b'\n')
+                       if line.strip() and self._parse_line(line) is not None]
+        # 从最新的记录向前累加，保留不超过 keep_bytes 的部分
+        kept_bytes = 0
+        split = len(valid_lines)
+        while split > 0 and kept_bytes + len(valid_lines[split - 1]) + 1 <= self.keep_bytes:
+            split -= 1
+            kept_bytes += len(valid_lines[split]) + 1
+        archived = valid_lines[:split]
+        # 只去掉了很少的内容时不轮转，避免用几条记录的归档挤掉真正的旧归档
+        if sum(len(line) + 1 for line in archived) < self.keep_bytes // 2:
+            archived = []
+        kept = valid_lines[len(archived):]
+
+        tmp_file = self.journal_file + '.compact'
+        with open(tmp_file, 'wb') as f:
+            for line in kept:
+                f.write(line + b'\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+        if archived:
+            self._rotate_archives()
+            with open(self._archive_path(1), 'wb') as f:
+                for line in archived:
+                    f.write(line + b'\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+        # 第二阶段加锁：补上快照之后新追加的内容，再原子替换
+        with self._lock:
+            with open(self.journal_file, 'rb') as f:
+                f.seek(snapshot_end)
+                appended = f.read()
+            if appended:
+                with open(tmp_file, 'ab') as f:
+                    f.write(appended)
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_file, self.journal_file)
+            self.generation += 1
+
+        logger.info(f"历史记录压缩完成: 保留 {len(kept)} 条，归档 {len(archived)} 条")
+
+    def _archive_path(self, index):
+        return f"{self.journal_file}.{index}"
+
+    def _rotate_archives(self):
+        oldest = self._archive_path(self.max_archives)
+        if os.path.exists(oldest):
+            os.remove(oldest)
+        for i in range(self.max_archives - 1, 0, -1):
+            src = self._archive_path(i)
+            if os.path.exists(src):
+                os.replace(src, self._archive_path(i + 1))
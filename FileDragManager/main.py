@@ -1,14 +1,16 @@
 import os
 import sys
 import json
+import threading
 from datetime import datetime
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout, QLabel,
-    QPushButton, QFileDialog, QListWidget, QListWidgetItem, QProgressDialog, QStatusBar,
+    QPushButton, QFileDialog, QProgressDialog, QStatusBar,
     QDockWidget, QFrame, QToolBar, QMenu, QMessageBox, QInputDialog, QLineEdit,
-    QScrollArea, QGroupBox, QCheckBox, QFormLayout, QComboBox, QSpinBox, QTabWidget
+    QScrollArea, QGroupBox, QCheckBox, QFormLayout, QComboBox, QSpinBox, QTabWidget, QListView,
+    QTableView, QHeaderView, QAbstractItemView
 )
-from PyQt6.QtCore import Qt, QSize
+from PyQt6.QtCore import Qt, QSize, QTimer
 from PyQt6.QtGui import QIcon, QFont, QColor, QAction, QPalette, QGuiApplication, QPixmap
 from PyQt6.QtWidgets import QStyle
 
@@ -17,9 +19,29 @@ import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from dialogs import ImageRenameDialog, CategoryDialog, ErrorDialog
-from utils import FileTransferThread
-from history import HistoryItemWidget
+# 两个程序共用的分类规则模块
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
+from dialogs import ImageRenameDialog, CategoryDialog, ErrorDialog, TransferProgressDialog
+from utils import FileTransferThread, BatchMoveThread, FolderScanThread
+from transfer import format_bytes, format_eta, job_record, plan_restore
+from transfer_journal import TransferJournal, JOB_MOVED, JOB_PENDING, JOB_MISSING, JOB_CONFLICT
+from naming import NameReserver
+from file_rules import get_classifier
+from file_queue import FileQueueModel
+from dedup import DEDUP_OFF, DEDUP_MODE_LABELS
+from history import HistoryListModel, HistoryItemDelegate
+from history_store import HistoryStore
+from history_index import HistoryIndex, SHORT_QUERY_SCAN_LIMIT
+from scanner import parse_extensions
+from log_setup import setup_logging
+
+# 历史记录面板每次滚动加载的记录条数
+HISTORY_PAGE_SIZE = 20
+# 搜索结果每次加载的文件条数
+HISTORY_SEARCH_PAGE_SIZE = 200
+# 输入停顿多久后再查询（毫秒）；少于 3 个字符的查询不走全文索引，等待更久，避免逐键扫描
+HISTORY_SEARCH_DELAY_MS = 150
+HISTORY_SHORT_SEARCH_DELAY_MS = 500
 
 class FileManagerApp(QMainWindow):
     def __init__(self):
@@ -36,7 +58,11 @@ class FileManagerApp(QMainWindow):
         
         # 初始化变量
         self.default_dir = os.path.join(application_path, "output")
-        self.history_file = os.path.join(application_path, "history.json")
+        self.history_file = os.path.join(application_path, "history.jsonl")
+        self.legacy_history_file = os.path.join(application_path, "history.json")
+        self.history_index_file = os.path.join(application_path, "history.db")
+        self.hash_cache_file = os.path.join(application_path, "hash_cache.db")
+        self.journal_file = os.path.join(application_path, "transfer_journal.jsonl")
         self.settings_file = os.path.join(application_path, "FileDragManager.json")
         self.temp_dir = os.path.join(application_path, "temp")
         
@@ -48,13 +74,23 @@ class FileManagerApp(QMainWindow):
         self.settings = self.load_settings()
         self.target_dir = self.settings.get("target_dir", self.default_dir)
         
-        self.files = []  # 存储文件路径和自定义名称的元组列表
-        self.history = self.load_history()
+        self.file_queue = FileQueueModel(self)  # 待处理文件队列（路径、大小、分类、自定义名称）
+        self.history_store = HistoryStore(self.history_file, self.legacy_history_file)
+        self.history_index = self.open_history_index()
+        # 移动操作的预写日志，崩溃或休眠后启动时据此继续或回滚未完成的批次
+        self.journal = TransferJournal(self.journal_file)
+        self.batch_thread = None
+        self.scan_thread = None
         self.categorize_files = self.settings.get("categorize_files", False)  # 从设置中加载分类选项，默认关闭
         
         # 从设置中加载图片重命名设置
         self.auto_rename_images = self.settings.get("auto_rename_images", True)
         self.rename_pattern = self.settings.get("rename_pattern", "秒级时间戳+序号")
+
+        # 重复文件处理方式：关闭 / 跳过 / 硬链接
+        self.dedup_mode = self.settings.get("dedup_mode", DEDUP_OFF)
+        if self.dedup_mode not in DEDUP_MODE_LABELS:
+            self.dedup_mode = DEDUP_OFF
         
         # 创建UI后再应用主题
         self.init_ui()
@@ -65,6 +101,9 @@ class FileManagerApp(QMainWindow):
         # 设置窗口图标
         self.setWindowIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_FileDialogContentsView))
 
+        # 窗口显示后再检查上次是否有中断的移动
+        QTimer.singleShot(0, self.recover_interrupted_transfers)
+
     def init_ui(self):
         # 创建主部件和布局
         main_widget = QWidget()
@@ -187,6 +226,16 @@ class FileManagerApp(QMainWindow):
         self.image_rename_button.setStyleSheet(self.get_image_rename_button_style())
         self.image_rename_button.clicked.connect(self.show_image_rename_dialog)
         settings_layout.addWidget(self.image_rename_button)
+
+        # 重复文件处理按钮，点击弹出模式菜单
+        self.dedup_button = QPushButton(self.get_dedup_button_text())
+        self.dedup_button.setStyleSheet(self.get_dedup_button_style())
+        dedup_menu = QMenu(self.dedup_button)
+        for mode, label in DEDUP_MODE_LABELS.items():
+            dedup_menu.addAction(label, lambda mode=mode: self.set_dedup_mode(mode))
+        self.dedup_button.setMenu(dedup_menu)
+        self.dedup_button.setToolTip("移动前按内容查找与目标目录中已有文件重复的文件")
+        settings_layout.addWidget(self.dedup_button)
         
         # 清空列表按钮
         clear_button = QPushButton("清空列表")
@@ -316,9 +365,52 @@ class FileManagerApp(QMainWindow):
         """)
         refresh_button.clicked.connect(self.refresh_folder)
         
+        # 停止扫描按钮
+        self.stop_scan_button = QPushButton("停止")
+        self.stop_scan_button.setStyleSheet("""
+            QPushButton {
+                background-color: #dc3545;
+                color: white;
+                padding: 8px 15px;
+                border-radius: 4px;
+            }
+            QPushButton:hover {
+                background-color: #bd2130;
+            }
+            QPushButton:disabled {
+                background-color: #424242;
+            }
+        """)
+        self.stop_scan_button.setEnabled(False)
+        self.stop_scan_button.clicked.connect(self.cancel_folder_scan)
+        
+        # 扫描层数（不限 / 1 = 只扫描所选文件夹）
+        self.scan_depth_spin = QSpinBox()
+        self.scan_depth_spin.setRange(0, 99)
+        self.scan_depth_spin.setSpecialValueText("不限层数")
+        self.scan_depth_spin.setSuffix(" 层")
+        self.scan_depth_spin.setToolTip("扫描的目录层数，1 表示只扫描所选文件夹")
+        self.scan_depth_spin.setStyleSheet("""
+            QSpinBox {
+                background-color: #121212;
+                color: #e0e0e0;
+                padding: 6px;
+                border: 1px solid #424242;
+                border-radius: 4px;
+            }
+        """)
+        
+        # 扩展名过滤
+        self.scan_ext_edit = QLineEdit()
+        self.scan_ext_edit.setPlaceholderText("扩展名过滤，如 .jpg,.png")
+        self.scan_ext_edit.setStyleSheet(self.folder_path_edit.styleSheet())
+        
         folder_input_layout.addWidget(self.folder_path_edit, 1)
+        folder_input_layout.addWidget(self.scan_depth_spin)
+        folder_input_layout.addWidget(self.scan_ext_edit)
         folder_input_layout.addWidget(browse_folder_button)
         folder_input_layout.addWidget(refresh_button)
+        folder_input_layout.addWidget(self.stop_scan_button)
         
         file_layout.addWidget(folder_input_group)
         
@@ -398,24 +490,49 @@ class FileManagerApp(QMainWindow):
         file_list_label.setStyleSheet("color: #ffffff;")
         file_layout.addWidget(file_list_label)
         
-        # 文件列表控件
-        self.file_list_widget = QListWidget()
-        self.file_list_widget.setStyleSheet("""
-            QListWidget {
+        # 文件列表控件：表格视图只绘制可见行，数据来自 file_queue 模型
+        self.file_table = QTableView()
+        self.file_table.setModel(self.file_queue)
+        self.file_table.setStyleSheet("""
+            QTableView {
                 background-color: #121212;
                 border: 1px solid #424242;
                 border-radius: 5px;
                 color: #e0e0e0;
+                gridline-color: #2a2a2a;
             }
-            QListWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #0d47a1;
             }
+            QHeaderView::section {
+                background-color: #1e1e1e;
+                color: #e0e0e0;
+                border: none;
+                padding: 4px;
+            }
         """)
-        self.file_list_widget.setDragDropMode(QListWidget.DragDropMode.InternalMove)
-        self.file_list_widget.setSelectionMode(QListWidget.SelectionMode.ExtendedSelection)
-        self.file_list_widget.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
-        self.file_list_widget.customContextMenuRequested.connect(self.show_context_menu)
-        file_layout.addWidget(self.file_list_widget, 2)
+        self.file_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.file_table.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.file_table.setEditTriggers(QAbstractItemView.EditTrigger.DoubleClicked |
+                                        QAbstractItemView.EditTrigger.EditKeyPressed)
+        self.file_table.setSortingEnabled(True)
+        self.file_table.setWordWrap(False)
+        self.file_table.setShowGrid(False)
+        # 固定行高，十万行也无需逐行计算尺寸
+        vertical_header = self.file_table.verticalHeader()
+        vertical_header.setVisible(False)
+        vertical_header.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        vertical_header.setDefaultSectionSize(24)
+        horizontal_header = self.file_table.horizontalHeader()
+        horizontal_header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        horizontal_header.setStretchLastSection(True)
+        self.file_table.setColumnWidth(FileQueueModel.NAME, 220)
+        self.file_table.setColumnWidth(FileQueueModel.SIZE, 80)
+        self.file_table.setColumnWidth(FileQueueModel.CATEGORY, 60)
+        self.file_table.setColumnWidth(FileQueueModel.CUSTOM_NAME, 120)
+        self.file_table.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.file_table.customContextMenuRequested.connect(self.show_context_menu)
+        file_layout.addWidget(self.file_table, 2)
         
         main_layout.addWidget(file_group, 1)
         
@@ -488,7 +605,9 @@ class FileManagerApp(QMainWindow):
                     "auto_rename_images": self.auto_rename_images,
                     "rename_pattern": self.rename_pattern,
                     "history_visible": self.settings.get('history_visible', True),
-                    "categorize_files": self.categorize_files
+                    "categorize_files": self.categorize_files,
+                    "transfer_workers": self.settings.get("transfer_workers"),
+                    "dedup_mode": self.dedup_mode
                 }
                 json.dump(settings, f, indent=2)
         except Exception as e:
@@ -508,7 +627,9 @@ class FileManagerApp(QMainWindow):
     
     # 关闭事件 - 保存设置
     def closeEvent(self, event):
+        self.cancel_folder_scan()
         self.save_settings()
+        self.journal.close()
         event.accept()
     
     def show_image_rename_dialog(self):
@@ -594,6 +715,42 @@ class FileManagerApp(QMainWindow):
                 }
             """
     
+    def set_dedup_mode(self, mode):
+        self.dedup_mode = mode
+        self.save_settings()
+        self.dedup_button.setText(self.get_dedup_button_text())
+        self.dedup_button.setStyleSheet(self.get_dedup_button_style())
+        self.update_status_bar()
+
+    def get_dedup_button_text(self):
+        return f"重复文件: {DEDUP_MODE_LABELS[self.dedup_mode]}"
+
+    def get_dedup_button_style(self):
+        if self.dedup_mode != DEDUP_OFF:
+            return """
+                QPushButton {
+                    background-color: #ff9800;
+                    color: white;
+                    padding: 8px 15px;
+                    border-radius: 4px;
+                }
+                QPushButton:hover {
+                    background-color: #f57c00;
+                }
+            """
+        else:
+            return """
+                QPushButton {
+                    background-color: #424242;
+                    color: white;
+                    padding: 8px 15px;
+                    border-radius: 4px;
+                }
+                QPushButton:hover {
+                    background-color: #525252;
+                }
+            """
+
     def show_about(self):
         QMessageBox.information(
             self, "关于文件拖拽管理器",
@@ -646,18 +803,44 @@ class FileManagerApp(QMainWindow):
         history_title.setStyleSheet("color: #ffffff;")
         history_layout.addWidget(history_title)
         
-        # 历史记录列表
-        self.history_list = QListWidget()
+        # 历史记录搜索框
+        self.history_search_edit = QLineEdit()
+        self.history_search_edit.setPlaceholderText("搜索历史文件名、目录...")
+        self.history_search_edit.setClearButtonEnabled(True)
+        self.history_search_edit.setStyleSheet("""
+            QLineEdit {
+                background-color: #121212;
+                color: #e0e0e0;
+                padding: 6px;
+                border: 1px solid #424242;
+                border-radius: 4px;
+            }
+        """)
+        history_layout.addWidget(self.history_search_edit)
+        
+        # 输入停顿后再查询，避免每个按键都访问数据库
+        self.history_search_timer = QTimer(self)
+        self.history_search_timer.setSingleShot(True)
+        self.history_search_timer.timeout.connect(self.search_history)
+        self.history_search_edit.textChanged.connect(self.schedule_history_search)
+        
+        # 历史记录列表：模型/委托绘制，滚动到底部时按页加载
+        self.history_model = HistoryListModel(self)
+        self.history_list = QListView()
+        self.history_list.setModel(self.history_model)
+        history_delegate = HistoryItemDelegate(self.history_list)
+        history_delegate.undo_requested.connect(self.undo_history_batch)
+        self.history_list.setItemDelegate(history_delegate)
+        self.history_list.setMouseTracking(True)
+        self.history_list.setResizeMode(QListView.ResizeMode.Adjust)
+        self.history_list.setVerticalScrollMode(QListView.ScrollMode.ScrollPerPixel)
         self.history_list.setStyleSheet("""
-            QListWidget {
+            QListView {
                 background-color: #121212;
                 border: 1px solid #424242;
                 border-radius: 5px;
                 color: #e0e0e0;
             }
-            QListWidget::item:selected {
-                background-color: #0d47a1;
-            }
         """)
         history_layout.addWidget(self.history_list)
         
@@ -673,60 +856,80 @@ class FileManagerApp(QMainWindow):
         # 加载历史记录
         self.load_history_to_list()
 
-    def load_history(self):
+    def open_history_index(self):
         try:
-            if os.path.exists(self.history_file):
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-        except:
-            pass
-        return []
+            history_index = HistoryIndex(self.history_index_file)
+        except Exception as e:
+            print(f"打开历史索引失败: {str(e)}")
+            return None
+        # 首次使用时在后台把已有的历史日志（含归档）导入索引
+        if history_index.is_empty():
+            threading.Thread(
+                target=history_index.import_entries,
+                args=(self.history_store.iter_entries(include_archives=True),),
+                name="history-index-import",
+                daemon=True
+            ).start()
+        return history_index
 
-    def save_history(self, processed_files):
+    def save_history(self, processed_files, **extra):
+        """保存一条历史记录；extra 为 batch（传输批次号）或 undo_of（被撤销的批次号）"""
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         history_entry = {
             "time": now,
             "files": processed_files
         }
-        # 确保self.history是列表类型
-        if not isinstance(self.history, list):
-            self.history = []
-        self.history.append(history_entry)
+        history_entry.update(extra)
         try:
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.history, f, indent=2)
+            # 追加一条记录并 fsync，文件过大时在后台压缩
+            self.history_store.append(history_entry)
         except Exception as e:
             print(f"保存历史记录失败: {str(e)}")
-        
-        # 更新历史记录显示
-        self.load_history_to_list()
+        if self.history_index:
+            try:
+                self.history_index.add_entry(history_entry)
+            except Exception as e:
+                print(f"更新历史索引失败: {str(e)}")
+        
+        # 更新历史记录显示：正在搜索时重新查询，否则只把新记录插入到顶部
+        if self.history_search_edit.text().strip():
+            self.search_history()
+        else:
+            self.history_model.prepend_entry(history_entry)
+
+    def schedule_history_search(self, text):
+        query = text.strip()
+        # 全部关键词都少于 3 个字符时只能逐行扫描，等用户停下来再搜索
+        short = bool(query) and all(len(term) < 3 for term in query.split())
+        self.history_search_timer.start(HISTORY_SHORT_SEARCH_DELAY_MS if short else HISTORY_SEARCH_DELAY_MS)
+
+    def search_history(self):
+        query = self.history_search_edit.text().strip()
+        if not query or not self.history_index:
+            self.load_history_to_list()
+            return
+        if self.history_index.is_scan_limited(query):
+            self.status_bar.showMessage(f"关键词都少于 3 个字符时只搜索最近的 {SHORT_QUERY_SCAN_LIMIT} 条文件记录", 3000)
+
+        def fetch_page(token):
+            try:
+                return self.history_index.search_page(query, token, HISTORY_SEARCH_PAGE_SIZE)
+            except Exception as e:
+                self.status_bar.showMessage(f"搜索历史记录失败: {str(e)}", 3000)
+                return [], None
+
+        self.history_model.set_source(fetch_page)
 
     def load_history_to_list(self):
-        self.history_list.clear()
-        
-        # 只显示最近的50条记录，并反转顺序使其从新到旧
-        recent_history = self.history[-50:] if isinstance(self.history, list) and self.history else []
-        recent_history.reverse()  # 反转列表顺序
-        
-        for entry in recent_history:
-            time_str = entry["time"]
-            time_label = QLabel(f"<b>{time_str}</b>")
-            time_label.setStyleSheet("color: #bb86fc; background-color: #1e1e1e; padding: 5px;")
-            
-            time_item = QListWidgetItem()
-            time_item.setSizeHint(time_label.sizeHint())
-            self.history_list.addItem(time_item)
-            self.history_list.setItemWidget(time_item, time_label)
-            
-            for file_info in entry["files"]:
-                # 创建自定义列表项
-                item_widget = HistoryItemWidget(file_info)
-                
-                # 创建列表项并设置自定义widget
-                item = QListWidgetItem()
-                item.setSizeHint(item_widget.sizeHint())
-                self.history_list.addItem(item)
-                self.history_list.setItemWidget(item, item_widget)
+        # 从日志末尾倒序分页读取，顺序为从新到旧
+        def fetch_page(token):
+            try:
+                return self.history_store.read_page(token, HISTORY_PAGE_SIZE)
+            except Exception as e:
+                print(f"加载历史记录失败: {str(e)}")
+                return [], None
+
+        self.history_model.set_source(fetch_page)
 
     def select_target_dir(self):
         dir_path = QFileDialog.getExistingDirectory(self, "选择目标目录", self.target_dir)
@@ -750,73 +953,108 @@ class FileManagerApp(QMainWindow):
             QMessageBox.warning(self, "警告", "请先选择有效的文件夹路径")
 
     def clear_file_list(self):
-        self.files = []
-        self.file_list_widget.clear()
+        self.file_queue.clear()
         self.execute_button.setEnabled(False)
         self.update_status_bar()
         
     def load_files_from_folder(self, folder_path):
-        try:
-            # 清空当前文件列表
-            self.clear_file_list()
-            
-            # 遍历文件夹
-            file_count = 0
-            for root, dirs, files in os.walk(folder_path):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    # 检查文件是否存在
-                    if os.path.exists(file_path):
-                        # 添加文件到列表 (路径, 自定义名称)
-                        self.files.append((file_path, None))
-                        file_count += 1
-                        # 创建文件列表项并添加到UI
-                        file_name = os.path.basename(file_path)
-                        item = QListWidgetItem(file_name)
-                        self.file_list_widget.addItem(item)
-                        # 强制更新UI
-                        self.file_list_widget.update()
-                        QApplication.processEvents()
-            
-            self.update_status_bar()
-            # 启用执行按钮
-            if self.files:
-                self.execute_button.setEnabled(True)
-        except Exception as e:
-            self.statusBar().showMessage(f"加载文件夹失败: {str(e)}")
+        # 停止上一次尚未完成的扫描
+        self.cancel_folder_scan()
+        
+        # 清空当前文件列表
+        self.clear_file_list()
+        
+        if not os.path.isdir(folder_path):
+            self.statusBar().showMessage(f"加载文件夹失败: {folder_path} 不是有效的文件夹")
             # 创建错误信息字典
             error_info = {
                 'success': [],
-                'errors': [(folder_path, str(e))]
+                'errors': [(folder_path, "不是有效的文件夹")]
             }
             ErrorDialog(error_info, self).exec()
+            return
+        
+        # 在后台线程中遍历文件夹，结果按批次追加到列表
+        depth = self.scan_depth_spin.value()
+        self.scan_thread = FolderScanThread(
+            folder_path,
+            max_depth=depth - 1 if depth > 0 else None,
+            extensions=parse_extensions(self.scan_ext_edit.text())
+        )
+        self.scan_thread.batch_found.connect(self.add_scanned_files)
+        self.scan_thread.progress_updated.connect(
+            lambda count: self.status_bar.showMessage(f"正在扫描: 已找到 {count} 个文件")
+        )
+        self.scan_thread.scan_finished.connect(self.handle_scan_finished)
+        self.stop_scan_button.setEnabled(True)
+        self.scan_thread.start()
+
+    def cancel_folder_scan(self):
+        if self.scan_thread is not None and self.scan_thread.isRunning():
+            self.scan_thread.cancel()
+            self.scan_thread.wait()
+
+    def add_scanned_files(self, items):
+        # 忽略已被取消的旧扫描线程发来的批次
+        if self.sender() is not self.scan_thread:
+            return
+        # 添加文件到队列 (路径, 大小)
+        self.file_queue.append_files(items)
+        self.execute_button.setEnabled(True)
+
+    def handle_scan_finished(self, count, cancelled):
+        if self.sender() is not self.scan_thread:
+            return
+        self.stop_scan_button.setEnabled(False)
+        self.update_status_bar()
+        if cancelled:
+            self.status_bar.showMessage(f"扫描已取消，已加载 {len(self.file_queue)} 个文件", 3000)
 
     def execute_transfer(self):
-        if not self.files:
+        if not len(self.file_queue):
             return
         
-        # 创建进度对话框
-        progress_dialog = QProgressDialog("正在移动文件...", "取消", 0, 100, self)
-        progress_dialog.setWindowTitle("文件移动进度")
+        # 创建进度对话框：暂停 / 继续 / 取消 通过 TransferControl 传给传输引擎
+        progress_dialog = TransferProgressDialog(self)
         progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
-        progress_dialog.setAutoClose(True)
-        progress_dialog.setAutoReset(True)
         
         # 创建文件传输线程
         transfer_thread = FileTransferThread(
-            self.files,
+            self.file_queue.to_file_list(),
             self.target_dir,
             self.categorize_files,
             self.auto_rename_images,
-            self.rename_pattern
+            self.rename_pattern,
+            max_workers=self.settings.get("transfer_workers"),
+            dedup_mode=self.dedup_mode,
+            hash_cache_file=self.hash_cache_file,
+            journal=self.journal
         )
         
-        # 连接信号和槽
-        transfer_thread.progress_updated.connect(progress_dialog.setValue)  # 传递百分比
-        transfer_thread.progress_updated.connect(
-            lambda percent, text: progress_dialog.setLabelText(text)  # 只传递文本
-        )
+        # 连接信号和槽：文件级信号只更新当前文件名，进度条按字节推进
+        progress_state = {"text": "正在移动文件..."}
+
+        def on_file_progress(percent, text):
+            progress_state["text"] = text
+
+        def on_bytes_progress(bytes_done, bytes_total, speed, eta):
+            if bytes_total > 0:
+                progress_dialog.setValue(min(100, int(bytes_done * 100 / bytes_total)))
+            progress_dialog.setLabelText(
+                f"{progress_state['text']}\n"
+                f"{format_bytes(bytes_done)} / {format_bytes(bytes_total)}"
+                f"  |  {format_bytes(speed)}/s  |  剩余 {format_eta(eta)}"
+            )
+
+        transfer_thread.progress_updated.connect(on_file_progress)
+        transfer_thread.bytes_progress.connect(on_bytes_progress)
+        progress_dialog.pause_toggled.connect(
+            lambda paused: transfer_thread.control.pause() if paused else transfer_thread.control.resume())
+        progress_dialog.cancel_requested.connect(transfer_thread.control.cancel)
+        # 先关闭进度对话框，再处理结果
+        transfer_thread.transfer_complete.connect(progress_dialog.finish)
         transfer_thread.transfer_complete.connect(self.handle_transfer_complete)
+        transfer_thread.error_occurred.connect(progress_dialog.finish)
         transfer_thread.error_occurred.connect(self.handle_transfer_error)
         
         # 启动线程
@@ -826,21 +1064,203 @@ class FileManagerApp(QMainWindow):
         progress_dialog.exec()
 
     def handle_transfer_complete(self, result):
-        error_files, processed_files = result
+        error_files, processed_files, duplicate_files, batch, cancelled_files = result
         errors = {
             "success": processed_files,
-            "errors": error_files
+            "errors": error_files,
+            "duplicates": duplicate_files,
+            "cancelled": cancelled_files
         }
-        
+
+        # 先保存历史记录再结束日志中的批次，两步之间崩溃时启动会补写历史记录
+        if batch is not None:
+            self.save_history(processed_files, batch=batch)
+            self.end_journal_batch(batch)
+        else:
+            self.save_history(processed_files)
+
         # 显示错误对话框
         error_dialog = ErrorDialog(errors, self)
         error_dialog.exec()
         
-        # 保存历史记录
-        self.save_history(processed_files)
-        
-        # 清空文件列表
-        self.clear_file_list()
+        # 清空文件列表；取消时保留尚未移动的文件，方便稍后继续
+        if cancelled_files:
+            self.file_queue.retain_paths(cancelled_files)
+            self.update_status_bar()
+        else:
+            self.clear_file_list()
+
+    def end_journal_batch(self, batch, status="committed"):
+        try:
+            self.journal.end(batch, status)
+        except OSError as e:
+            self.status_bar.showMessage(f"写入传输日志失败: {str(e)}", 3000)
+
+    # ---- 撤销与中断恢复 ----
+
+    def start_batch_move(self, jobs, batch, reserver, title, on_complete):
+        """在后台执行已写入日志的移动计划并显示进度"""
+        # 进度对话框关闭时上一个线程可能还在发出完成信号后退出
+        if self.batch_thread is not None:
+            self.batch_thread.wait()
+        progress_dialog = QProgressDialog(f"{title}...", None, 0, 100, self)
+        progress_dialog.setWindowTitle(title)
+        progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        progress_dialog.setAutoClose(True)
+        progress_dialog.setAutoReset(True)
+
+        self.batch_thread = BatchMoveThread(jobs, self.journal, batch, reserver,
+                                            max_workers=self.settings.get("transfer_workers"))
+        self.batch_thread.progress_updated.connect(
+            lambda percent, text: (progress_dialog.setValue(percent), progress_dialog.setLabelText(text)))
+        self.batch_thread.batch_complete.connect(
+            lambda batch_id, result: (progress_dialog.setValue(100), on_complete(batch_id, result)))
+        self.batch_thread.start()
+        progress_dialog.exec()
+
+    def undo_history_batch(self, entry):
+        files = [info for info in entry["files"] if info.get("src")]
+        reply = QMessageBox.question(
+            self, "撤销此批次",
+            f"将 {entry['time']} 移动的 {len(files)} 个文件移回原位置？\n原位置已有同名文件时会自动追加序号。")
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        reserver = NameReserver()
+        jobs, error_files = plan_restore(
+            [(info["path"], info["src"], info.get("category", "其他")) for info in files], reserver)
+        if not jobs:
+            ErrorDialog({"success": [], "errors": error_files}, self).exec()
+            return
+        undo_of = entry["batch"]
+        batch = self.journal.begin(jobs, kind="undo", reserved=True, undo_of=undo_of)
+
+        def on_complete(batch_id, result):
+            move_errors, processed_files = result
+            self.save_history(processed_files, undo_of=undo_of)
+            self.end_journal_batch(batch_id)
+            self.history_model.mark_undone(undo_of)
+            ErrorDialog({"success": processed_files, "errors": error_files + move_errors}, self).exec()
+
+        self.start_batch_move(jobs, batch, reserver, "正在撤销", on_complete)
+
+    def recover_interrupted_transfers(self):
+        try:
+            batches = self.journal.interrupted_batches()
+        except OSError as e:
+            self.status_bar.showMessage(f"读取传输日志失败: {str(e)}", 3000)
+            return
+        for interrupted in batches:
+            states = interrupted.classify_jobs()
+            moved, pending, missing = states[JOB_MOVED], states[JOB_PENDING], states[JOB_MISSING]
+            conflicts = states[JOB_CONFLICT]
+            action = {"undo": "撤销", "rollback": "回滚"}.get(interrupted.kind, "移动")
+            box = QMessageBox(self)
+            box.setWindowTitle("发现未完成的操作")
+            box.setIcon(QMessageBox.Icon.Warning)
+            box.setText(f"{interrupted.time} 开始的{action}操作没有完成。\n"
+                        f"已完成 {len(moved)} 个，未完成 {len(pending)} 个，找不到 {len(missing)} 个文件。"
+                        + (f"\n另有 {len(conflicts)} 个文件的目标位置已被其他文件占用，将保留在原位置。"
+                           if conflicts else ""))
+            resume_button = box.addButton("继续完成", QMessageBox.ButtonRole.AcceptRole)
+            rollback_button = box.addButton("回滚", QMessageBox.ButtonRole.DestructiveRole)
+            box.addButton("稍后处理", QMessageBox.ButtonRole.RejectRole)
+            box.exec()
+            clicked = box.clickedButton()
+            if clicked in (resume_button, rollback_button) and not self.journal.adopt(interrupted.batch):
+                # 询问期间另一个窗口已经接手了这个批次
+                self.status_bar.showMessage("该操作已由其他窗口接手处理", 3000)
+                continue
+            if clicked is resume_button:
+                self.resume_interrupted(interrupted, moved, pending, conflicts)
+            elif clicked is rollback_button:
+                self.rollback_interrupted(interrupted, moved, pending, conflicts)
+
+    def finish_interrupted(self, interrupted, files):
+        """中断的批次完成后补写历史记录并结束批次；回滚不产生历史记录"""
+        if interrupted.kind == "rollback":
+            pass
+        elif interrupted.kind == "undo":
+            undo_of = interrupted.extra.get("undo_of")
+            self.save_history(files, undo_of=undo_of)
+            if undo_of:
+                self.history_model.mark_undone(undo_of)
+        else:
+            self.save_history(files, batch=interrupted.batch)
+        self.end_journal_batch(interrupted.batch)
+
+    def resume_interrupted(self, interrupted, moved, pending, conflicts):
+        done_files = [job_record(job) for job in moved]
+        skipped = list(conflicts)
+        error_files = [(job["src"], f"目标位置已有其他文件，未移动: {job['dest']}") for job in conflicts]
+        # 目标位置上没有本批次的占位文件时重新预留，期间被其他进程占用的同样算作冲突
+        reserver = NameReserver()
+        jobs = []
+        for job in pending:
+            try:
+                if os.path.lexists(job["dest"]):
+                    # 询问期间目标位置可能被其他进程占用，覆盖前再确认一次
+                    if interrupted.owns_dest(job):
+                        jobs.append(job)
+                        continue
+                elif reserver.try_reserve(job["dest_dir"], job["name"]):
+                    jobs.append(job)
+                    continue
+                error_files.append((job["src"], f"目标位置已有其他文件，未移动: {job['dest']}"))
+            except OSError as e:
+                error_files.append((job["src"], str(e)))
+            skipped.append(job)
+        self.journal.skip(interrupted.batch, skipped)
+        self.journal.reserved(interrupted.batch, jobs)
+        if not jobs:
+            self.finish_interrupted(interrupted, done_files)
+            if error_files:
+                ErrorDialog({"success": done_files, "errors": error_files}, self).exec()
+            return
+
+        def on_complete(batch_id, result):
+            move_errors, processed_files = result
+            self.finish_interrupted(interrupted, done_files + processed_files)
+            ErrorDialog({"success": done_files + processed_files, "errors": error_files + move_errors},
+                        self).exec()
+
+        self.start_batch_move(jobs, interrupted.batch, reserver, "正在继续未完成的操作", on_complete)
+
+    def rollback_interrupted(self, interrupted, moved, pending, conflicts):
+        # 只删除本批次的占位文件或半成品；冲突的任务源文件仍在原位置，目标位置上的其他文件保持不动
+        conflict_errors = [(job["dest"], "目标位置的文件不是本次操作创建的，未删除") for job in conflicts]
+        for job in pending:
+            try:
+                if not os.path.exists(job["dest"]) or os.path.samefile(job["src"], job["dest"]):
+                    continue
+                if interrupted.owns_dest(job):
+                    os.remove(job["dest"])
+                else:
+                    conflict_errors.append((job["dest"], "目标位置的文件不是本次操作创建的，未删除"))
+            except OSError as e:
+                self.status_bar.showMessage(f"清理未完成的文件失败: {str(e)}", 3000)
+        if not moved:
+            self.end_journal_batch(interrupted.batch, "rolled_back")
+            if conflict_errors:
+                ErrorDialog({"success": [], "errors": conflict_errors}, self).exec()
+            return
+        reserver = NameReserver()
+        jobs, error_files = plan_restore(
+            [(job["dest"], job["src"], job["category"]) for job in moved], reserver)
+        error_files = conflict_errors + error_files
+        if not jobs:
+            self.end_journal_batch(interrupted.batch, "rolled_back")
+            ErrorDialog({"success": [], "errors": error_files}, self).exec()
+            return
+        # 回滚本身也是一个批次：先记录回滚计划，再结束原批次
+        batch = self.journal.begin(jobs, kind="rollback", reserved=True, undo_of=interrupted.batch)
+        self.end_journal_batch(interrupted.batch, "rolled_back")
+
+        def on_complete(batch_id, result):
+            move_errors, processed_files = result
+            self.end_journal_batch(batch_id)
+            ErrorDialog({"success": processed_files, "errors": error_files + move_errors}, self).exec()
+
+        self.start_batch_move(jobs, batch, reserver, "正在回滚", on_complete)
 
     def handle_transfer_error(self, title, message):
         QMessageBox.critical(self, title, message)
@@ -856,16 +1276,14 @@ class FileManagerApp(QMainWindow):
         remove_action = QAction("移除选中文件", self)
         remove_action.triggered.connect(self.remove_selected_files)
         menu.addAction(remove_action)
-        menu.exec(self.file_list_widget.mapToGlobal(pos))
+        menu.exec(self.file_table.viewport().mapToGlobal(pos))
 
     def remove_selected_files(self):
-        selected_items = self.file_list_widget.selectedItems()
-        for item in selected_items:
-            index = self.file_list_widget.row(item)
-            del self.files[index]
-            self.file_list_widget.takeItem(index)
+        # 一次性取出所有选中行，由模型合并为连续区间批量删除
+        rows = [index.row() for index in self.file_table.selectionModel().selectedRows()]
+        self.file_queue.remove_rows(rows)
         
-        if not self.files:
+        if not len(self.file_queue):
             self.execute_button.setEnabled(False)
         self.update_status_bar()
 
@@ -876,26 +1294,25 @@ class FileManagerApp(QMainWindow):
             event.ignore()
 
     def dropEvent(self, event):
+        dropped = []
         for url in event.mimeData().urls():
             file_path = url.toLocalFile()
-            if os.path.isfile(file_path):
-                _, ext = os.path.splitext(file_path)
-                ext = ext.lower()
-                is_supported = False
-                # 这里我们假设FILE_CATEGORIES在utils模块中定义
-                from .utils import FILE_CATEGORIES
-                for exts in FILE_CATEGORIES.values():
-                    if ext in exts:
-                        is_supported = True
-                        break
-                if is_supported:
-                    self.files.append((file_path, None))
-                    item = QListWidgetItem(os.path.basename(file_path))
-                    self.file_list_widget.addItem(item)
-                    self.execute_button.setEnabled(True)
-                    self.update_status_bar()
-                else:
-                    QMessageBox.warning(self, "不支持的文件类型", f"文件 {os.path.basename(file_path)} 不支持。")
+            try:
+                if os.path.isfile(file_path):
+                    dropped.append((file_path, os.path.getsize(file_path)))
+            except OSError:
+                continue
+        # 扩展名无法识别的文件按文件头内容分类，大量拖入时在线程池中批量读取
+        accepted = []
+        for item, code in zip(dropped, get_classifier().classify_many(dropped)):
+            if code is not None:
+                accepted.append(item)
+            else:
+                QMessageBox.warning(self, "不支持的文件类型", f"文件 {os.path.basename(item[0])} 不支持。")
+        if accepted:
+            self.file_queue.append_files(accepted)
+            self.execute_button.setEnabled(True)
+            self.update_status_bar()
         event.acceptProposedAction()
 
     def paste_screenshot(self):
@@ -906,9 +1323,7 @@ class FileManagerApp(QMainWindow):
             file_name = f"{timestamp}.png"
             file_path = os.path.join(self.temp_dir, file_name)
             pixmap.save(file_path)
-            self.files.append((file_path, None))
-            item = QListWidgetItem(file_name)
-            self.file_list_widget.addItem(item)
+            self.file_queue.append_files([(file_path, None)])
             self.execute_button.setEnabled(True)
             self.update_status_bar()
             self.screenshot_preview.setPixmap(pixmap.scaled(self.screenshot_preview.size(), Qt.AspectRatioMode.KeepAspectRatio))
@@ -945,6 +1360,12 @@ class FileManagerApp(QMainWindow):
 
 
 def main():
+    # 日志经队列由后台线程写入程序目录下的轮转文件，不再随工作目录变化
+    if getattr(sys, 'frozen', False):
+        log_dir = os.path.dirname(sys.executable)
+    else:
+        log_dir = os.path.dirname(os.path.abspath(__file__))
+    setup_logging(os.path.join(log_dir, "file_manager.log"))
     app = QApplication(sys.argv)
     window = FileManagerApp()
     window.show()
@@ -0,0 +1,235 @@
+import os
+import sys
+import time
+import errno
+import shutil
+import logging
+import threading
+
+logger = logging.getLogger('FileManager')
+
+# 跨设备复制的单次内核调用大小
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+# 需要响应取消 / 暂停时，按实测速度调整分块大小，使每块耗时约为该值（秒）
+CHECKPOINT_INTERVAL = 0.05
+MIN_CHUNK_SIZE = 256 * 1024
+
+_HAS_COPY_FILE_RANGE = hasattr(os, 'copy_file_range')
+_HAS_SENDFILE = hasattr(os, 'sendfile') and os.name == 'posix'
+# 取消时超过该大小的不完整目标文件改名后在后台删除
+BACKGROUND_DISCARD_SIZE = 64 * 1024 * 1024
+
+
+def _posix_fallocate(fd, size):
+    os.posix_fallocate(fd, 0, size)
+
+
+def _load_fallocate():
+    """返回只做原生预分配的 fallocate(fd, size)，没有时返回 None（不做预分配）
+
+    Linux 上取 libc 的 fallocate(2)，不用 posix_fallocate：glibc 的 posix_fallocate 在
+    不支持预分配的文件系统上会逐块写零来模拟。其他平台的 posix_fallocate 没有这种模拟。
+    """
+    if not sys.platform.startswith('linux'):
+        return _posix_fallocate if hasattr(os, 'posix_fallocate') else None
+    try:
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        func = getattr(libc, 'fallocate64', None) or libc.fallocate
+    except (ImportError, OSError, AttributeError):
+        return None
+    func.argtypes = (ctypes.c_int, ctypes.c_int, ctypes.c_int64, ctypes.c_int64)
+    func.restype = ctypes.c_int
+
+    def fallocate(fd, size):
+        if func(fd, 0, 0, size) != 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    return fallocate
+
+
+_fallocate = _load_fallocate()
+
+
+class MoveVerificationError(OSError):
+    """复制后校验失败，源文件保持不动"""
+
+
+def is_same_device(src_stat, dest_dir):
+    try:
+        return src_stat.st_dev == os.stat(dest_dir).st_dev
+    except OSError:
+        return False
+
+
+def _preallocate(fd, size):
+    """预分配目标空间，减少碎片并尽早发现磁盘空间不足
+
+    不支持预分配的文件系统（FAT、部分网络盘）返回 EOPNOTSUPP 等错误，此时跳过，
+    不会像 glibc 的模拟那样先把整个文件写一遍零，期间也无法取消。
+    """
+    if _fallocate is None or size <= 0:
+        return
+    try:
+        _fallocate(fd, size)
+    except OSError as e:
+        if e.errno == errno.ENOSPC:
+            raise
+        logger.debug(f"目标文件系统不支持预分配({e})，跳过")
+
+
+def _copy_range(in_fd, out_fd, offset, count):
+    return os.copy_file_range(in_fd, out_fd, count, offset, offset)
+
+
+def _copy_sendfile(in_fd, out_fd, offset, count):
+    os.lseek(out_fd, offset, os.SEEK_SET)
+    return os.sendfile(out_fd, in_fd, offset, count)
+
+
+def _copy_read_write(in_fd, out_fd, offset, count):
+    data = os.pread(in_fd, count, offset) if hasattr(os, 'pread') else _read_at(in_fd, count, offset)
+    if not data:
+        return 0
+    view = memoryview(data)
+    written = 0
+    os.lseek(out_fd, offset, os.SEEK_SET)
+    while written < len(view):
+        written += os.write(out_fd, view[written:])
+    return written
+
+
+def _read_at(fd, count, offset):
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, count)
+
+
+def _copy_methods():
+    methods = []
+    if _HAS_COPY_FILE_RANGE:
+        methods.append(_copy_range)
+    if _HAS_SENDFILE:
+        methods.append(_copy_sendfile)
+    methods.append(_copy_read_write)
+    return methods
+
+
+def copy_file_data(src, dest, size, progress=None, chunk_size=COPY_CHUNK_SIZE, checkpoint=None):
+    """把 src 的数据复制到 dest，优先使用内核态复制，返回复制的字节数
+
+    copy_file_range / sendfile 不可用（旧内核、跨文件系统类型、Windows）时逐级回退到读写循环。
+    progress(n) 在每个分块完成后调用。checkpoint() 在每个分块之前调用，可阻塞（暂停）或抛出异常（取消）；
+    给出 checkpoint 时分块大小随实测速度调整，慢速磁盘上也能在约 CHECKPOINT_INTERVAL 内响应。
+    """
+    methods = _copy_methods()
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+    in_fd = os.open(src, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        out_fd = os.open(dest, flags, 0o666)
+        try:
+            _preallocate(out_fd, size)
+            copied = 0
+            step = chunk_size if checkpoint is None else min(chunk_size, MIN_CHUNK_SIZE * 4)
+            while copied < size:
+                if checkpoint is not None:
+                    checkpoint()
+                started = time.monotonic()
+                try:
+                    n = methods[0](in_fd, out_fd, copied, min(step, size - copied))
+                except OSError as e:
+                    if len(methods) > 1 and e.errno in (errno.EXDEV, errno.ENOSYS, errno.EINVAL,
+                                                        errno.EOPNOTSUPP, errno.EBADF, errno.ENOTSUP):
+                        logger.debug(f"{methods[0].__name__} 不可用({e})，回退到下一种复制方式")
+                        methods.pop(0)
+                        continue
+                    raise
+                if n == 0:
+                    break
+                copied += n
+                if progress:
+                    progress(n)
+                if checkpoint is not None:
+                    elapsed = time.monotonic() - started
+                    if elapsed > 0:
+                        step = max(MIN_CHUNK_SIZE, min(chunk_size, int(n / elapsed * CHECKPOINT_INTERVAL)))
+            # 源文件在复制过程中变短时，去掉预分配留下的尾部
+            os.ftruncate(out_fd, copied)
+            os.fsync(out_fd)
+        finally:
+            os.close(out_fd)
+    finally:
+        os.close(in_fd)
+    return copied
+
+
+def move_file(src, dest, progress=None, checkpoint=None):
+    """移动单个文件
+
+    源和目标在同一设备上时直接 os.replace（原子操作，会替换 NameReserver 预留的占位文件）；
+    否则用内核态复制数据，预分配目标空间，fsync 后校验大小和源文件未被修改，再删除源文件。
+    复制过程中 checkpoint 抛出异常（取消）时删除不完整的目标文件，源文件保持不动。
+    """
+    src_stat = os.lstat(src)
+    if not os.path.isfile(src) or os.path.islink(src):
+        # 目录、符号链接等特殊情况交给 shutil 处理
+        shutil.move(src, dest)
+        if progress:
+            progress(src_stat.st_size)
+        return
+
+    dest_dir = os.path.dirname(os.path.abspath(dest))
+    if is_same_device(src_stat, dest_dir):
+        try:
+            os.replace(src, dest)
+            if progress:
+                progress(src_stat.st_size)
+            return
+        except OSError as e:
+            # 同一 st_dev 仍可能跨挂载点（如 bind mount），此时回退到复制
+            if e.errno != errno.EXDEV:
+                raise
+
+    try:
+        copied = copy_file_data(src, dest, src_stat.st_size, progress, checkpoint=checkpoint)
+        after_stat = os.stat(src)
+        dest_size = os.stat(dest).st_size
+        if (copied != src_stat.st_size or dest_size != src_stat.st_size
+                or after_stat.st_mtime_ns != src_stat.st_mtime_ns):
+            raise MoveVerificationError(
+                errno.EIO,
+                f"复制校验失败: 源 {src_stat.st_size} 字节, 目标 {dest_size} 字节",
+                src
+            )
+        shutil.copystat(src, dest)
+    except BaseException:
+        _discard(dest, src_stat.st_size)
+        raise
+
+    os.unlink(src)
+
+
+def _discard(path, size):
+    """删除不完整的目标文件
+
+    删除上 GB 的文件时内核要释放其全部页缓存和数据块，实测 1 GB 约 300 ms，取消传输不必等它：
+    大文件先改名让出文件名（调用方可以立即重用），再在后台线程中删除。
+    """
+    if size >= BACKGROUND_DISCARD_SIZE:
+        directory, name = os.path.split(path)
+        discarded = os.path.join(directory, f".{name}.{os.getpid()}.{threading.get_ident()}.discard")
+        try:
+            os.replace(path, discarded)
+        except OSError:
+            pass
+        else:
+            threading.Thread(target=_unlink_quietly, args=(discarded,), name="discard-partial-copy").start()
+            return
+    _unlink_quietly(path)
+
+
+def _unlink_quietly(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
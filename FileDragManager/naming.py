@@ -0,0 +1,91 @@
+import os
+import logging
+
+logger = logging.getLogger('FileManager')
+
+# 同名文件追加序号的上限，超过后放弃
+MAX_NAME_ATTEMPTS = 10000
+
+
+def numbered_names(stem, ext):
+    """依次产出 name.ext、name_1.ext、name_2.ext …"""
+    yield stem + ext
+    for i in range(1, MAX_NAME_ATTEMPTS):
+        yield f"{stem}_{i}{ext}"
+
+
+class NameReserver:
+    """为目标目录预留不会冲突的文件名
+
+    每个目录只用一次 os.scandir 建立已用文件名集合，之后的冲突检查都是集合查找，
+    不必对每个候选名 stat。选中的名称用 O_CREAT | O_EXCL 创建一个空占位文件，
+    即使另一个进程（或同一秒内的另一次运行）同时写入同一目录也不会互相覆盖；
+    移动时用 os.replace 原子地替换占位文件，失败的任务调用 release() 删除占位文件。
+    dry_run 时只在内存中记录选中的名称，不创建占位文件（用于预览移动计划）。
+    """
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self._used = {}  # 目录 -> 已用文件名集合（按 normcase 比较）
+        self._placeholders = set()
+
+    def _names(self, directory):
+        key = os.path.normcase(os.path.abspath(directory))
+        names = self._used.get(key)
+        if names is None:
+            names = set()
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        names.add(os.path.normcase(entry.name))
+            except FileNotFoundError:
+                pass
+            self._used[key] = names
+        return names
+
+    def is_used(self, directory, name):
+        """directory 中是否已有（或已预留）该文件名"""
+        return os.path.normcase(name) in self._names(directory)
+
+    def try_reserve(self, directory, name):
+        """尝试预留 directory/name，成功返回 True"""
+        names = self._names(directory)
+        key = os.path.normcase(name)
+        if key in names:
+            return False
+        if self.dry_run:
+            names.add(key)
+            return True
+        path = os.path.join(directory, name)
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+        except FileExistsError:
+            # 建立集合之后被其他进程创建
+            names.add(key)
+            return False
+        os.close(fd)
+        names.add(key)
+        self._placeholders.add(path)
+        return True
+
+    def reserve(self, directory, candidates):
+        """按顺序尝试候选文件名，返回第一个预留成功的名称"""
+        for name in candidates:
+            if self.try_reserve(directory, name):
+                return name
+        raise FileExistsError(f"无法在 {directory} 中找到可用的文件名")
+
+    def release(self, path):
+        """任务未执行或失败时删除占位文件；文件已被写入内容时不做处理"""
+        if path not in self._placeholders:
+            return
+        self._placeholders.discard(path)
+        try:
+            if os.path.getsize(path) == 0:
+                os.remove(path)
+        except OSError as e:
+            logger.debug(f"删除占位文件失败 {path}: {str(e)}")
+
+    def commit(self, path):
+        """任务成功后调用，占位文件已被真实文件替换"""
+        self._placeholders.discard(path)
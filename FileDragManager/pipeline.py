@@ -0,0 +1,209 @@
+import os
+import logging
+
+from transfer import TransferEngine, job_record, plan_transfers
+from file_rules import get_classifier
+from naming import NameReserver, numbered_names
+from dedup import DuplicateFinder, HashCache, DEDUP_OFF, DEDUP_HARDLINK, link_duplicate
+
+logger = logging.getLogger('FileManager')
+
+
+class TransferSetupError(Exception):
+    """目标目录或分类目录无法创建，传输没有开始"""
+
+
+class TransferPipeline:
+    """一次传输的完整流程：创建目录 → 生成计划 → 写入传输日志 → 预留目标文件名 → 查重 → 并发移动
+
+    不依赖 Qt，图形界面的 FileTransferThread 和命令行 cli.py 共用同一套流程。
+    dry_run 时只生成计划和查重结果，不创建目录、占位文件，也不移动文件。
+    """
+
+    def __init__(self, file_list, target_dir, categorize_files, auto_rename_images, rename_pattern,
+                 max_workers=None, dedup_mode=DEDUP_OFF, hash_cache_file=None, journal=None,
+                 control=None, dry_run=False):
+        self.file_list = file_list
+        self.target_dir = target_dir
+        self.categorize_files = categorize_files
+        self.auto_rename_images = auto_rename_images
+        self.rename_pattern = rename_pattern
+        self.max_workers = max_workers
+        self.dedup_mode = dedup_mode
+        self.hash_cache_file = hash_cache_file
+        self.journal = journal
+        self.control = control
+        self.dry_run = dry_run
+        self.reserver = NameReserver(dry_run=dry_run)
+
+    def prepare_dirs(self):
+        """确保目标目录（以及启用分类时的各分类目录）存在"""
+        try:
+            os.makedirs(self.target_dir, exist_ok=True)
+        except OSError as e:
+            raise TransferSetupError(f"无法创建目标目录: {str(e)}")
+        if self.categorize_files:
+            for category in get_classifier().folders:
+                try:
+                    os.makedirs(os.path.join(self.target_dir, category), exist_ok=True)
+                except OSError as e:
+                    raise TransferSetupError(f"无法创建分类目录: {str(e)}")
+
+    def run(self, on_progress=None, on_bytes_progress=None):
+        """执行传输，返回 (error_files, processed_files, duplicate_files, batch, cancelled_files)
+
+        on_progress(percent, text) 在文件完成时调用（可能来自工作线程），
+        on_bytes_progress 的参数见 TransferProgress。batch 为传输日志中的批次号，
+        需要调用方保存历史记录后再结束；dry_run 时 processed_files 为计划中的文件。
+        """
+        if not self.dry_run:
+            self.prepare_dirs()
+
+        # 先串行生成移动计划（保证图片序号确定），此时只在内存中选定目标文件名
+        jobs, error_files = plan_transfers(
+            self.file_list,
+            self.target_dir,
+            self.categorize_files,
+            self.auto_rename_images,
+            self.rename_pattern,
+            NameReserver(dry_run=True)
+        )
+
+        # 创建占位文件之前把全部计划写入传输日志：之后无论在查重还是移动时崩溃，
+        # 日志里都有这些目标路径，回滚时可以清理占位文件；批次在历史记录保存后由调用方结束
+        batch = None
+        if not self.dry_run:
+            if self.journal is not None and jobs:
+                try:
+                    batch = self.journal.begin(jobs)
+                except OSError as e:
+                    logger.warning(f"写入传输日志失败，本次移动不可恢复: {str(e)}")
+            jobs, reserve_errors = self.reserve_destinations(jobs, batch)
+            error_files.extend(reserve_errors)
+
+        duplicate_files = []
+        if self.dedup_mode != DEDUP_OFF and jobs:
+            remaining, duplicate_files, dedup_errors = self.remove_duplicates(jobs, on_progress)
+            error_files.extend(dedup_errors)
+            if batch is not None:
+                kept = {job["index"] for job in remaining}
+                self.journal.skip(batch, [job for job in jobs if job["index"] not in kept])
+            jobs = remaining
+
+        if self.dry_run:
+            return error_files, [job_record(job) for job in jobs], duplicate_files, None, []
+
+        total = max(1, len(self.file_list))
+
+        def on_job_finished(done, job, error):
+            if error is None and batch is not None:
+                self.journal.mark_done(batch, job)
+            if on_progress:
+                on_progress(int(done / total * 100), f"已处理: {job['name']}")
+
+        engine = TransferEngine(max_workers=self.max_workers)
+        move_errors, processed_files, cancelled_jobs = engine.run(
+            jobs, on_job_finished, on_bytes_progress, self.control)
+        error_files.extend(move_errors)
+
+        # 成功的任务占位文件已被替换，失败的任务删除占位文件
+        moved = {info["path"] for info in processed_files}
+        for job in jobs:
+            if job["dest"] in moved:
+                self.reserver.commit(job["dest"])
+            else:
+                self.reserver.release(job["dest"])
+
+        cancelled_files = [job["src"] for job in cancelled_jobs]
+        return error_files, processed_files, duplicate_files, batch, cancelled_files
+
+    def reserve_destinations(self, jobs, batch=None):
+        """为计划中的目标文件名创建占位文件，返回 (jobs, error_files)
+
+        计划生成之后目标位置被其他进程占用时改用 name_1、name_2 …，
+        新位置先写入日志再创建占位文件，日志中始终记录着可能存在的占位文件；
+        全部预留完成后再写入预留记录，区分占位文件和其他进程创建的同名文件。
+        """
+        reserved = []
+        error_files = []
+        skipped = []
+        for job in jobs:
+            try:
+                if not self.reserver.try_reserve(job["dest_dir"], job["name"]):
+                    job = self._replan(job, batch)
+                reserved.append(job)
+            except OSError as e:
+                logger.error(f"预留目标文件名失败 {job['src']}: {str(e)}")
+                error_files.append((job["src"], str(e)))
+                skipped.append(job)
+        if batch is not None:
+            self.journal.skip(batch, skipped)
+            # 移动开始前记下哪些占位文件确实是本批次创建的，恢复时只处理这些目标文件
+            self.journal.reserved(batch, reserved)
+        return reserved, error_files
+
+    def _replan(self, job, batch):
+        stem, ext = os.path.splitext(job["name"])
+        for name in numbered_names(stem, ext):
+            if self.reserver.is_used(job["dest_dir"], name):
+                continue
+            job = dict(job, name=name, dest=os.path.join(job["dest_dir"], name))
+            if batch is not None:
+                self.journal.replan(batch, [job])
+            if self.reserver.try_reserve(job["dest_dir"], name):
+                return job
+        raise FileExistsError(f"无法在 {job['dest_dir']} 中找到可用的文件名")
+
+    def remove_duplicates(self, jobs, on_progress=None):
+        """查重并从计划中去掉重复文件，返回 (剩余任务, 重复文件列表, 错误列表)"""
+        if on_progress:
+            on_progress(0, "正在检查重复文件...")
+        cache = None
+        if self.hash_cache_file:
+            try:
+                cache = HashCache(self.hash_cache_file)
+            except Exception as e:
+                logger.warning(f"无法打开哈希缓存: {str(e)}")
+        try:
+            finder = DuplicateFinder(cache)
+            existing_dirs = sorted({job["dest_dir"] for job in jobs})
+            duplicates, error_files = finder.find(jobs, existing_dirs)
+        finally:
+            if cache is not None:
+                cache.close()
+
+        skipped = {job["index"] for job, _, _ in duplicates}
+        failed = {src for src, _ in error_files}
+        duplicate_files = []
+        for job, original, in_target in duplicates:
+            action = "跳过"
+            # 只有目标目录里已有的原件才能硬链接；批次内的原件尚未移动，直接跳过
+            if self.dedup_mode == DEDUP_HARDLINK and in_target:
+                if self.dry_run:
+                    action = "硬链接"
+                else:
+                    try:
+                        link_duplicate(job, original)
+                        action = "硬链接"
+                    except OSError as e:
+                        logger.warning(f"创建硬链接失败，改为跳过 {job['src']}: {str(e)}")
+            if action == "硬链接":
+                self.reserver.commit(job["dest"])
+            else:
+                self.reserver.release(job["dest"])
+            duplicate_files.append({
+                "name": os.path.basename(job["src"]),
+                "src": job["src"],
+                "original": original,
+                "action": action
+            })
+        logger.info(f"查重完成: {len(duplicate_files)} 个重复文件")
+        remaining = []
+        for job in jobs:
+            if job["index"] in skipped:
+                continue
+            if job["src"] in failed:
+                self.reserver.release(job["dest"])
+                continue
+            remaining.append(job)
+        return remaining, duplicate_files, error_files
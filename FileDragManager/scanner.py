@@ -0,0 +1,50 @@
+import os
+import logging
+
+logger = logging.getLogger('FileManager')
+
+# 每批发送给界面的文件数（见 utils.FolderScanThread）
+SCAN_BATCH_SIZE = 500
+
+
+def parse_extensions(text):
+    """把 ".jpg, png;.GIF" 这样的输入解析为小写扩展名集合，空输入返回 None 表示不过滤"""
+    exts = set()
+    for part in text.replace(';', ',').replace(' ', ',').split(','):
+        part = part.strip().lower()
+        if part:
+            exts.add(part if part.startswith('.') else '.' + part)
+    return exts or None
+
+
+def scan_folder(folder_path, max_depth=None, extensions=None, should_stop=None):
+    """用 os.scandir 遍历目录，逐个产出 (文件路径, 文件大小)
+
+    max_depth 为 None 表示不限深度，0 表示只扫描顶层；extensions 为扩展名集合，
+    在遍历时直接过滤；should_stop() 返回 True 时立即停止。
+    """
+    stack = [(folder_path, 0)]
+    while stack:
+        if should_stop and should_stop():
+            return
+        current, depth = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                subdirs = []
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if max_depth is None or depth < max_depth:
+                                subdirs.append(entry.path)
+                        elif entry.is_file():
+                            if extensions is None or os.path.splitext(entry.name)[1].lower() in extensions:
+                                yield entry.path, entry.stat().st_size
+                    except OSError as e:
+                        logger.debug(f"跳过无法访问的条目 {entry.path}: {str(e)}")
+        except OSError as e:
+            logger.warning(f"无法读取目录 {current}: {str(e)}")
+            continue
+        # 逆序压栈，使子目录按名称顺序出栈
+        for path in reversed(sorted(subdirs)):
+            stack.append((path, depth + 1))
+
@@ -0,0 +1,125 @@
+import io
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from unittest import mock
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'shared'))
+
+import cli
+from pipeline import TransferPipeline
+from transfer import TransferControl
+from transfer_journal import TransferJournal
+
+
+class CliTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix='cli_')
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+        self.src = os.path.join(self.folder, 'src')
+        self.target = os.path.join(self.folder, 'target')
+        # 传输日志、哈希缓存和历史记录默认写在程序目录，测试时改到临时目录
+        self.data_dir = os.path.join(self.folder, 'data')
+        os.makedirs(self.src)
+        os.makedirs(self.data_dir)
+        patcher = mock.patch.object(cli, 'application_path', return_value=self.data_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.settings = os.path.join(self.folder, 'settings.json')
+        with open(self.settings, 'w', encoding='utf-8') as f:
+            json.dump({"target_dir": self.target, "categorize_files": False, "auto_rename_images": False}, f)
+        for i in range(3):
+            self.write(os.path.join(self.src, f"doc_{i}.txt"), f"content {i}".encode())
+
+    def write(self, path, data):
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    def tree(self):
+        """源目录和目标目录下的全部路径（数据目录中的哈希缓存不算在内）"""
+        return sorted(os.path.relpath(os.path.join(root, name), self.folder)
+                      for top in (self.src, self.target)
+                      for root, dirs, files in os.walk(top) for name in dirs + files)
+
+    def run_cli(self, *args):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            code = cli.main(['--settings', self.settings, '--format', 'jsonl', *args])
+        records = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        return code, records
+
+    def test_dry_run_leaves_tree_untouched(self):
+        before = self.tree()
+        code, records = self.run_cli(self.src, '--dry-run', '--dedup', 'skip')
+        self.assertEqual(code, cli.EXIT_OK)
+        self.assertEqual([r["status"] for r in records], ["planned"] * 3)
+        self.assertEqual(self.tree(), before)
+        self.assertFalse(os.path.exists(self.target))
+        self.assertFalse(os.path.exists(os.path.join(self.data_dir, "transfer_journal.jsonl")))
+        self.assertFalse(os.path.exists(os.path.join(self.data_dir, "history.jsonl")))
+
+    def test_moves_files_and_writes_jsonl(self):
+        code, records = self.run_cli(self.src)
+        self.assertEqual(code, cli.EXIT_OK)
+        self.assertEqual(sorted(os.path.basename(r["path"]) for r in records if r["status"] == "moved"),
+                         ["doc_0.txt", "doc_1.txt", "doc_2.txt"])
+        self.assertEqual(os.listdir(self.src), [])
+        with open(os.path.join(self.target, "doc_1.txt"), 'rb') as f:
+            self.assertEqual(f.read(), b"content 1")
+        # 写入了历史记录，批次结束后传输日志被清空
+        with open(os.path.join(self.data_dir, "history.jsonl"), 'r', encoding='utf-8') as f:
+            (entry,) = [json.loads(line) for line in f]
+        self.assertEqual(len(entry["files"]), 3)
+        self.assertEqual(os.path.getsize(os.path.join(self.data_dir, "transfer_journal.jsonl")), 0)
+
+    def test_name_taken_before_reservation_is_replanned(self):
+        original_reserve = TransferPipeline.reserve_destinations
+
+        def reserve_destinations(pipeline, jobs, batch=None):
+            # 计划生成之后、预留之前另一个进程写入了同名文件
+            self.write(os.path.join(self.target, "doc_0.txt"), b'other')
+            return original_reserve(pipeline, jobs, batch)
+
+        with mock.patch.object(TransferPipeline, 'reserve_destinations', reserve_destinations), \
+                mock.patch.object(TransferJournal, 'replan', autospec=True,
+                                  side_effect=TransferJournal.replan) as replan:
+            code, records = self.run_cli(self.src)
+        self.assertEqual(code, cli.EXIT_OK)
+        (journal, batch, jobs), _ = replan.call_args
+        self.assertEqual([job["name"] for job in jobs], ["doc_0_1.txt"])
+        moved = {os.path.basename(r["src"]): os.path.basename(r["path"]) for r in records}
+        self.assertEqual(moved["doc_0.txt"], "doc_0_1.txt")
+        with open(os.path.join(self.target, "doc_0.txt"), 'rb') as f:
+            self.assertEqual(f.read(), b'other')
+
+    def test_exit_codes(self):
+        # 相当于开始前就按下了 Ctrl+C：文件全部保持原样
+        control = TransferControl()
+        control.cancel()
+        with mock.patch.object(cli, 'TransferControl', return_value=control):
+            code, records = self.run_cli(self.src)
+        self.assertEqual(code, cli.EXIT_CANCELLED)
+        self.assertEqual([r["status"] for r in records], ["cancelled"] * 3)
+        self.assertEqual(len(os.listdir(self.src)), 3)
+        self.assertEqual(os.listdir(self.target), [])
+
+        code, records = self.run_cli(self.src, os.path.join(self.folder, 'missing'))
+        self.assertEqual(code, cli.EXIT_FAILED)
+        self.assertEqual([r["status"] for r in records].count("error"), 1)
+
+        code, _ = self.run_cli(self.src, '--jobs', '0')
+        self.assertEqual(code, cli.EXIT_USAGE)
+        # 目标路径是一个文件，无法创建目标目录
+        blocked = os.path.join(self.folder, 'blocked')
+        self.write(blocked, b'')
+        code, _ = self.run_cli(self.src, '--target', blocked)
+        self.assertEqual(code, cli.EXIT_USAGE)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'shared'))
+
+import dedup
+from dedup import (DuplicateFinder, HashCache, PARTIAL_BLOCK_SIZE, DEDUP_HARDLINK, DEDUP_SKIP,
+                   file_key, link_duplicate)
+from pipeline import TransferPipeline
+
+# 比部分哈希读取的范围（开头和结尾各 64 KB）更大，才会进入完整哈希这一级
+BIG = 3 * PARTIAL_BLOCK_SIZE
+
+
+def big_data(middle=b'm'):
+    return b'a' * PARTIAL_BLOCK_SIZE + middle * PARTIAL_BLOCK_SIZE + b'z' * PARTIAL_BLOCK_SIZE
+
+
+class DuplicateFinderTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix='dedup_')
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+        self.src = os.path.join(self.folder, 'src')
+        self.target = os.path.join(self.folder, 'target')
+        os.makedirs(self.src)
+        os.makedirs(self.target)
+        self.jobs = []
+
+    def write(self, path, data):
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def add_job(self, name, data):
+        src = self.write(os.path.join(self.src, name), data)
+        job = {"index": len(self.jobs), "src": src, "size": len(data), "name": name,
+               "dest": os.path.join(self.target, name), "dest_dir": self.target, "category": "其他"}
+        self.jobs.append(job)
+        return job
+
+    def find(self, cache=None):
+        duplicates, error_files = DuplicateFinder(cache, max_workers=2).find(self.jobs, [self.target])
+        self.assertEqual(error_files, [])
+        return [(job["name"], os.path.basename(original), in_target) for job, original, in_target in duplicates]
+
+    def test_size_partial_full_levels(self):
+        self.add_job("a.bin", big_data())
+        self.add_job("b.bin", big_data())
+        # 大小、开头和结尾都相同，只有中间不同：部分哈希相同，完整哈希区分开
+        self.add_job("c.bin", big_data(middle=b'x'))
+        self.add_job("d.bin", b'unique size')
+        with mock.patch.object(dedup, 'partial_hash', wraps=dedup.partial_hash) as partial, \
+                mock.patch.object(dedup, 'full_hash', wraps=dedup.full_hash) as full:
+            self.assertEqual(self.find(), [("b.bin", "a.bin", False)])
+        # 大小唯一的文件不读取内容
+        self.assertEqual(sorted(os.path.basename(c.args[0]) for c in partial.call_args_list),
+                         ["a.bin", "b.bin", "c.bin"])
+        self.assertEqual(sorted(os.path.basename(c.args[0]) for c in full.call_args_list),
+                         ["a.bin", "b.bin", "c.bin"])
+
+    def test_small_files_skip_full_hash(self):
+        self.add_job("a.txt", b'same')
+        self.add_job("b.txt", b'same')
+        self.add_job("c.txt", b'diff')
+        self.add_job("empty1.txt", b'')
+        self.add_job("empty2.txt", b'')
+        with mock.patch.object(dedup, 'full_hash') as full:
+            self.assertEqual(self.find(), [("b.txt", "a.txt", False)])
+        full.assert_not_called()
+
+    def test_duplicates_within_batch_keep_earliest(self):
+        for name in ("first.bin", "second.bin", "third.bin"):
+            self.add_job(name, big_data())
+        self.assertEqual(self.find(), [("second.bin", "first.bin", False), ("third.bin", "first.bin", False)])
+
+    def test_existing_target_file_is_preferred_original(self):
+        self.write(os.path.join(self.target, "old.bin"), big_data())
+        self.add_job("new.bin", big_data())
+        self.add_job("copy.bin", big_data())
+        # 计划中的目标位置是空的占位文件，不能当作已有文件
+        self.write(self.jobs[0]["dest"], b'')
+        self.assertEqual(self.find(), [("new.bin", "old.bin", True), ("copy.bin", "old.bin", True)])
+
+    def test_cache_is_reused_until_mtime_changes(self):
+        existing = self.write(os.path.join(self.target, "old.bin"), big_data())
+        self.add_job("new.bin", big_data())
+        cache = HashCache(os.path.join(self.folder, 'hash_cache.db'))
+        self.addCleanup(cache.close)
+        self.assertEqual(self.find(cache), [("new.bin", "old.bin", True)])
+        self.assertIsNotNone(cache.get(file_key(os.stat(existing)))[1])
+
+        with mock.patch.object(dedup, 'partial_hash') as partial, mock.patch.object(dedup, 'full_hash') as full:
+            self.assertEqual(self.find(cache), [("new.bin", "old.bin", True)])
+        partial.assert_not_called()
+        full.assert_not_called()
+
+        # 修改时间变化后缓存键不同，重新计算
+        st = os.stat(existing)
+        os.utime(existing, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+        self.assertEqual(cache.get(file_key(os.stat(existing))), (None, None))
+        with mock.patch.object(dedup, 'full_hash', wraps=dedup.full_hash) as full:
+            self.assertEqual(self.find(cache), [("new.bin", "old.bin", True)])
+        self.assertEqual([c.args[0] for c in full.call_args_list], [existing])
+
+
+class HardlinkTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix='dedup_link_')
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+        self.target = os.path.join(self.folder, 'target')
+        os.makedirs(self.target)
+        self.original = os.path.join(self.target, "old.bin")
+        with open(self.original, 'wb') as f:
+            f.write(big_data())
+        self.src = os.path.join(self.folder, 'src', "new.bin")
+        os.makedirs(os.path.dirname(self.src))
+        with open(self.src, 'wb') as f:
+            f.write(big_data())
+
+    def run_pipeline(self, mode):
+        pipeline = TransferPipeline([(self.src, None)], self.target, False, False, "{date}_{num}",
+                                    dedup_mode=mode)
+        error_files, processed_files, duplicate_files, _, _ = pipeline.run()
+        self.assertEqual(error_files, [])
+        self.assertEqual(processed_files, [])
+        return duplicate_files
+
+    def test_hardlink_replaces_placeholder(self):
+        (duplicate,) = self.run_pipeline(DEDUP_HARDLINK)
+        self.assertEqual(duplicate["action"], "硬链接")
+        self.assertFalse(os.path.exists(self.src))
+        self.assertTrue(os.path.samefile(os.path.join(self.target, "new.bin"), self.original))
+
+    def test_failed_link_falls_back_to_skip(self):
+        with mock.patch.object(dedup.os, 'link', side_effect=OSError("links not supported")):
+            (duplicate,) = self.run_pipeline(DEDUP_HARDLINK)
+        self.assertEqual(duplicate["action"], "跳过")
+        # 源文件保持不动，占位文件被删除
+        self.assertTrue(os.path.exists(self.src))
+        self.assertEqual(os.listdir(self.target), ["old.bin"])
+
+    def test_skip_mode_leaves_source(self):
+        (duplicate,) = self.run_pipeline(DEDUP_SKIP)
+        self.assertEqual(duplicate["action"], "跳过")
+        self.assertTrue(os.path.exists(self.src))
+        self.assertEqual(os.listdir(self.target), ["old.bin"])
+
+    def test_link_is_removed_when_source_cannot_be_deleted(self):
+        dest = os.path.join(self.target, "new.bin")
+        open(dest, 'wb').close()
+        job = {"src": self.src, "dest": dest}
+        with mock.patch.object(dedup.os, 'remove', side_effect=[PermissionError("in use"), None]) as remove:
+            with self.assertRaises(PermissionError):
+                link_duplicate(job, self.original)
+        self.assertEqual(remove.call_args_list[-1].args, (dest,))
+        self.assertTrue(os.path.exists(self.src))
+
+
+if __name__ == '__main__':
+    unittest.main()
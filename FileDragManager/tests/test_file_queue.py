@@ -0,0 +1,52 @@
+import os
+import sys
+import random
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'shared'))
+
+try:
+    from file_queue import FileQueueStore, contiguous_ranges
+except ImportError:
+    # file_queue 与表格模型在同一模块中，需要 PyQt6
+    FileQueueStore = None
+
+
+@unittest.skipIf(FileQueueStore is None, "需要 PyQt6")
+class FileQueueStoreTest(unittest.TestCase):
+    def make_store(self, count):
+        store = FileQueueStore()
+        store.append_many((f"/downloads/file_{i}.txt", i) for i in range(count))
+        for i in range(0, count, 3):
+            store.custom_names[i] = f"name_{i}"
+        return store
+
+    def test_contiguous_ranges(self):
+        self.assertEqual(contiguous_ranges([5, 1, 2, 3, 7, 6, 2]), [(5, 7), (1, 3)])
+        self.assertEqual(contiguous_ranges([]), [])
+
+    def test_delete_rows_matches_range_deletes(self):
+        rng = random.Random(8)
+        for _ in range(50):
+            rows = rng.sample(range(200), rng.randint(0, 200))
+            by_mask = self.make_store(200)
+            by_mask.delete_rows(rows)
+            by_range = self.make_store(200)
+            for first, last in contiguous_ranges(rows):
+                by_range.delete_range(first, last)
+            self.assertEqual(by_mask.paths, by_range.paths)
+            self.assertEqual(by_mask.sizes, by_range.sizes)
+            self.assertEqual(by_mask.categories, by_range.categories)
+            self.assertEqual(by_mask.custom_names, by_range.custom_names)
+
+    def test_to_file_list_keeps_custom_names(self):
+        store = self.make_store(4)
+        store.delete_rows([1])
+        self.assertEqual(store.to_file_list(), [("/downloads/file_0.txt", "name_0"),
+                                                ("/downloads/file_2.txt", None),
+                                                ("/downloads/file_3.txt", "name_3")])
+
+
+if __name__ == '__main__':
+    unittest.main()
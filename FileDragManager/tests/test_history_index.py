@@ -0,0 +1,100 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import history_index
+from history_index import HistoryIndex
+
+
+def make_entry(i, name):
+    return {"time": f"2024-01-01 00:{i // 60:02d}:{i % 60:02d}",
+            "files": [{"name": name, "category": "documents", "folder": "/target/documents",
+                       "path": f"/target/documents/{name}", "relative_path": None}]}
+
+
+class HistoryIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix='history_index_')
+        self.index = HistoryIndex(os.path.join(self.folder, 'history.db'))
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+        self.addCleanup(self.index.close)
+
+    def names(self, query, limit=100):
+        return [f["name"] for e in self.index.search(query, limit) for f in e["files"]]
+
+    def test_search_newest_first(self):
+        self.index.add_entries([make_entry(i, f"report_{i}.pdf") for i in range(5)])
+        self.assertEqual(self.names("report"), [f"report_{i}.pdf" for i in reversed(range(5))])
+        self.assertEqual(self.names("report_3"), ["report_3.pdf"])
+        self.assertEqual(self.names("  "), [])
+
+    def test_duplicates_are_ignored(self):
+        self.assertEqual(self.index.add_entries([make_entry(1, "a.txt")]), 1)
+        self.assertEqual(self.index.add_entries([make_entry(1, "a.txt")]), 0)
+
+    def test_search_page(self):
+        self.index.add_entries([make_entry(i, f"doc_{i}.txt") for i in range(5)])
+        entries, token = self.index.search_page("doc", None, 2)
+        self.assertEqual(token, 2)
+        entries, token = self.index.search_page("doc", 4, 2)
+        self.assertEqual([e["files"][0]["name"] for e in entries], ["doc_0.txt"])
+        self.assertIsNone(token)
+
+    def test_short_query_only_scans_recent_rows(self):
+        if self.index.fts_mode != 'trigram':
+            self.skipTest("SQLite 不支持 trigram 分词")
+        self.index.add_entries([make_entry(0, "qz_old.txt")]
+                               + [make_entry(i, f"n_{i}.txt") for i in range(1, 6)])
+        self.assertTrue(self.index.is_scan_limited("qz"))
+        self.assertFalse(self.index.is_scan_limited("qz_"))
+        self.assertEqual(self.names("qz"), ["qz_old.txt"])
+        with mock.patch.object(history_index, 'SHORT_QUERY_SCAN_LIMIT', 5):
+            # 最早的一条不在最近 5 条之内，短查询找不到，3 个字符以上仍走全文索引
+            self.assertEqual(self.names("qz"), [])
+            self.assertEqual(self.names("qz_"), ["qz_old.txt"])
+
+    def test_terms_shorter_than_three_characters(self):
+        self.index.add_entries([make_entry(0, "截图 2024-05.png"), make_entry(1, "截屏 2024-06.png"),
+                                make_entry(2, "ab xcd.txt"), make_entry(3, "ab.txt")])
+        # 长词走全文索引（trigram 时），短词在结果上用 LIKE 过滤；每个词都要匹配
+        self.assertEqual(self.names("截图 2024"), ["截图 2024-05.png"])
+        self.assertEqual(self.names("2024 png"), ["截屏 2024-06.png", "截图 2024-05.png"])
+        self.assertEqual(self.names("ab xcd"), ["ab xcd.txt"])
+
+    def test_short_terms_only(self):
+        self.index.add_entries([make_entry(0, "ab xcd.txt"), make_entry(1, "ab.txt"), make_entry(2, "截图.png")])
+        self.assertEqual(self.names("ab cd"), ["ab xcd.txt"])
+        self.assertEqual(self.names("截图"), ["截图.png"])
+        self.assertEqual(self.names("ab zz"), [])
+        if self.index.fts_mode == 'trigram':
+            self.assertTrue(self.index.is_scan_limited("ab cd"))
+            self.assertFalse(self.index.is_scan_limited("ab xcd"))
+
+    def test_like_fallback_splits_terms(self):
+        self.index.add_entries([make_entry(0, "ab xcd.txt"), make_entry(1, "ab.txt")])
+        with mock.patch.object(self.index, 'fts_mode', None):
+            self.assertEqual(self.names("ab cd"), ["ab xcd.txt"])
+            self.assertEqual(self.names("xcd ab"), ["ab xcd.txt"])
+            self.assertEqual(self.names("a_"), [])
+
+    def test_import_skips_truncated_lines(self):
+        path = os.path.join(self.folder, 'history.jsonl')
+        with open(path, 'wb') as f:
+            for i in range(3):
+                f.write(json.dumps(make_entry(i, f"f{i}.txt"), ensure_ascii=False).encode('utf-8') + b'\n')
+            f.write(b'not json\n')
+            # 崩溃时写了一半的最后一行，截断在多字节字符中间
+            line = json.dumps(make_entry(3, "截图.png"), ensure_ascii=False).encode('utf-8')
+            f.write(line[:line.rindex("图".encode('utf-8')) + 1])
+        self.assertEqual(self.index.import_history_file(path), 3)
+        self.assertEqual(self.names("txt"), ["f2.txt", "f1.txt", "f0.txt"])
+
+
+if __name__ == '__main__':
+    unittest.main()
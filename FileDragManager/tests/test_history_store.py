@@ -0,0 +1,93 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from history_store import HistoryStore
+
+
+def make_entry(i):
+    return {"timestamp": f"2026-10-18 12:00:{i % 60:02d}", "target_dir": "D:/收藏",
+            "files": [f"C:/Downloads/file_{i}_{n}.jpg" for n in range(5)]}
+
+
+class HistoryStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix='history_store_')
+        self.journal = os.path.join(self.folder, 'history.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def append_all(self, store, entries):
+        for entry in entries:
+            store.append(entry)
+            if store._compact_thread is not None:
+                store._compact_thread.join()
+
+    def line_count(self, path):
+        with open(path, 'rb') as f:
+            return sum(1 for line in f if line.strip())
+
+    def test_read_tail_and_pages(self):
+        store = HistoryStore(self.journal)
+        entries = [make_entry(i) for i in range(250)]
+        self.append_all(store, entries)
+        self.assertEqual(store.read_tail(3), entries[-3:])
+
+        seen = []
+        token = None
+        while True:
+            page, token = store.read_page(token, 40)
+            seen.extend(page)
+            if token is None:
+                break
+        self.assertEqual(seen, entries[::-1])
+
+    def test_corrupt_lines_are_skipped(self):
+        store = HistoryStore(self.journal)
+        store.append(make_entry(1))
+        with open(self.journal, 'a', encoding='utf-8') as f:
+            f.write('{"timestamp": "半行\n')
+        store.append(make_entry(2))
+        self.assertEqual(list(store.iter_entries()), [make_entry(1), make_entry(2)])
+
+    def test_compaction_keeps_byte_budget(self):
+        store = HistoryStore(self.journal, max_bytes=200_000, max_archives=5)
+        entries = [make_entry(i) for i in range(3000)]
+        self.append_all(store, entries)
+
+        self.assertLessEqual(os.path.getsize(self.journal), store.max_bytes)
+        archives = [store._archive_path(i) for i in range(1, 6) if os.path.exists(store._archive_path(i))]
+        # 每次轮转都归档了大量记录，没有只含几条记录的归档
+        for path in archives:
+            self.assertGreater(self.line_count(path), 100)
+        # 压缩次数与追加次数无关，只与写入的总字节数有关
+        self.assertLess(store.generation, 20)
+        history = list(store.iter_entries(include_archives=True))
+        self.assertEqual(history, entries[-len(history):])
+
+    def test_compact_without_meaningful_trim_does_not_rotate(self):
+        store = HistoryStore(self.journal, max_bytes=200_000)
+        self.append_all(store, [make_entry(i) for i in range(10)])
+        store.compact()
+        self.assertFalse(os.path.exists(store._archive_path(1)))
+        self.assertEqual(self.line_count(self.journal), 10)
+
+    def test_migrate_legacy(self):
+        legacy = os.path.join(self.folder, 'history.json')
+        entries = [make_entry(i) for i in range(3)]
+        with open(legacy, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False)
+        store = HistoryStore(self.journal, legacy)
+        self.assertEqual(list(store.iter_entries()), entries)
+        self.assertFalse(os.path.exists(legacy))
+        self.assertTrue(os.path.exists(legacy + '.migrated'))
+
+
+if __name__ == '__main__':
+    unittest.main()
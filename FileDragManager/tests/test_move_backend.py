@@ -0,0 +1,96 @@
+import os
+import sys
+import errno
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import move_backend
+from move_backend import copy_file_data, move_file
+
+
+class Cancelled(Exception):
+    pass
+
+
+def failing_fallocate(code):
+    def fallocate(fd, size):
+        raise OSError(code, os.strerror(code))
+    return fallocate
+
+
+class MoveBackendTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix='move_backend_')
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+        self.src = os.path.join(self.folder, 'src.bin')
+        self.dest = os.path.join(self.folder, 'dest.bin')
+        self.data = os.urandom(3 * 1024 * 1024 + 17)
+        with open(self.src, 'wb') as f:
+            f.write(self.data)
+
+    def read_dest(self):
+        with open(self.dest, 'rb') as f:
+            return f.read()
+
+    def test_copy_file_data(self):
+        chunks = []
+        copied = copy_file_data(self.src, self.dest, len(self.data), chunks.append, chunk_size=1024 * 1024)
+        self.assertEqual(copied, len(self.data))
+        self.assertEqual(sum(chunks), len(self.data))
+        self.assertEqual(self.read_dest(), self.data)
+
+    def test_unsupported_preallocation_is_skipped(self):
+        for code in (errno.EOPNOTSUPP, errno.EINVAL):
+            with mock.patch.object(move_backend, '_fallocate', failing_fallocate(code)):
+                copy_file_data(self.src, self.dest, len(self.data))
+            self.assertEqual(self.read_dest(), self.data)
+
+    def test_no_space_is_reported(self):
+        with mock.patch.object(move_backend, '_fallocate', failing_fallocate(errno.ENOSPC)):
+            with self.assertRaises(OSError) as cm:
+                copy_file_data(self.src, self.dest, len(self.data))
+        self.assertEqual(cm.exception.errno, errno.ENOSPC)
+
+    def cancel_cross_device_move(self, discard_size):
+        calls = []
+
+        def checkpoint():
+            calls.append(1)
+            if len(calls) > 1:
+                raise Cancelled()
+
+        with mock.patch.object(move_backend, 'is_same_device', return_value=False), \
+                mock.patch.object(move_backend, 'BACKGROUND_DISCARD_SIZE', discard_size):
+            with self.assertRaises(Cancelled):
+                move_file(self.src, self.dest, checkpoint=checkpoint)
+
+    def test_cancel_removes_partial_copy(self):
+        self.cancel_cross_device_move(discard_size=len(self.data) + 1)
+        self.assertFalse(os.path.exists(self.dest))
+        with open(self.src, 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_cancel_discards_large_copy_in_background(self):
+        with mock.patch.object(move_backend.threading, 'Thread') as thread:
+            self.cancel_cross_device_move(discard_size=1)
+        # 文件名立即让出，改名后的文件交给后台线程删除
+        self.assertFalse(os.path.exists(self.dest))
+        (discarded,) = thread.call_args.kwargs['args']
+        self.assertTrue(os.path.exists(discarded))
+        thread.return_value.start.assert_called_once_with()
+        move_backend._unlink_quietly(discarded)
+        self.assertEqual(os.listdir(self.folder), ['src.bin'])
+
+    def test_cross_device_move(self):
+        with mock.patch.object(move_backend, 'is_same_device', return_value=False):
+            move_file(self.src, self.dest)
+        self.assertFalse(os.path.exists(self.src))
+        self.assertEqual(self.read_dest(), self.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import naming
+from naming import NameReserver, numbered_names
+
+
+class NameReserverTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix='naming_')
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+
+    def touch(self, name, data=b''):
+        with open(os.path.join(self.folder, name), 'wb') as f:
+            f.write(data)
+
+    def test_numbered_names(self):
+        with mock.patch.object(naming, 'MAX_NAME_ATTEMPTS', 3):
+            self.assertEqual(list(numbered_names("a", ".txt")), ["a.txt", "a_1.txt", "a_2.txt"])
+
+    def test_reserve_skips_existing_names_and_creates_placeholder(self):
+        self.touch("doc.txt", b'x')
+        reserver = NameReserver()
+        self.assertEqual(reserver.reserve(self.folder, numbered_names("doc", ".txt")), "doc_1.txt")
+        self.assertEqual(os.path.getsize(os.path.join(self.folder, "doc_1.txt")), 0)
+        # 同一次运行中再次预留时不会选中已预留的名称
+        self.assertEqual(reserver.reserve(self.folder, numbered_names("doc", ".txt")), "doc_2.txt")
+        self.assertTrue(reserver.is_used(self.folder, "doc_2.txt"))
+
+    def test_name_taken_by_another_process_after_scan(self):
+        reserver = NameReserver()
+        self.assertFalse(reserver.is_used(self.folder, "a.txt"))
+        # 集合建立之后其他进程创建了同名文件，O_EXCL 失败后换下一个名称
+        self.touch("a.txt", b'other')
+        self.assertFalse(reserver.try_reserve(self.folder, "a.txt"))
+        self.assertEqual(reserver.reserve(self.folder, numbered_names("a", ".txt")), "a_1.txt")
+        with open(os.path.join(self.folder, "a.txt"), 'rb') as f:
+            self.assertEqual(f.read(), b'other')
+
+    def test_two_reservers_never_share_a_name(self):
+        first, second = NameReserver(), NameReserver()
+        # 两者都在任何预留之前扫描目录，各自的集合都是空的
+        first.is_used(self.folder, "x")
+        second.is_used(self.folder, "x")
+        names = {first.reserve(self.folder, numbered_names("f", ".bin")),
+                 second.reserve(self.folder, numbered_names("f", ".bin"))}
+        self.assertEqual(names, {"f.bin", "f_1.bin"})
+
+    def test_release_only_removes_empty_placeholders(self):
+        reserver = NameReserver()
+        reserver.reserve(self.folder, ["empty.txt"])
+        reserver.reserve(self.folder, ["written.txt"])
+        self.touch("written.txt", b'data')
+        self.touch("unrelated.txt")
+        for name in ("empty.txt", "written.txt", "unrelated.txt"):
+            reserver.release(os.path.join(self.folder, name))
+        self.assertEqual(sorted(os.listdir(self.folder)), ["unrelated.txt", "written.txt"])
+
+    def test_commit_keeps_file(self):
+        reserver = NameReserver()
+        reserver.reserve(self.folder, ["done.txt"])
+        path = os.path.join(self.folder, "done.txt")
+        reserver.commit(path)
+        reserver.release(path)
+        self.assertTrue(os.path.exists(path))
+
+    def test_dry_run_creates_nothing(self):
+        reserver = NameReserver(dry_run=True)
+        self.assertEqual(reserver.reserve(self.folder, numbered_names("p", ".png")), "p.png")
+        self.assertEqual(reserver.reserve(self.folder, numbered_names("p", ".png")), "p_1.png")
+        self.assertEqual(os.listdir(self.folder), [])
+
+    def test_missing_directory(self):
+        reserver = NameReserver(dry_run=True)
+        self.assertFalse(reserver.is_used(os.path.join(self.folder, "missing"), "a.txt"))
+
+    def test_exhausted_candidates(self):
+        self.touch("only.txt")
+        with self.assertRaises(FileExistsError):
+            NameReserver().reserve(self.folder, ["only.txt"])
+
+
+if __name__ == '__main__':
+    unittest.main()
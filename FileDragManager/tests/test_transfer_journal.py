@@ -0,0 +1,213 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'shared'))
+
+from transfer_journal import TransferJournal, JOB_MOVED, JOB_PENDING, JOB_MISSING, JOB_CONFLICT
+from pipeline import TransferPipeline
+
+
+def write_file(path, data=b'data'):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+class TransferJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix='transfer_journal_')
+        self.journal_file = os.path.join(self.folder, 'transfer_journal.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def make_job(self, index, name):
+        src = os.path.join(self.folder, 'src', name)
+        write_file(src)
+        dest_dir = os.path.join(self.folder, 'dest')
+        return {"index": index, "src": src, "size": 4, "dest": os.path.join(dest_dir, name),
+                "dest_dir": dest_dir, "name": name, "category": "其他"}
+
+    def test_crashed_batch_is_reported_and_classified(self):
+        jobs = [self.make_job(i, f"f{i}.txt") for i in range(3)]
+        journal = TransferJournal(self.journal_file)
+        batch = journal.begin(jobs)
+        journal.reserved(batch, jobs)
+        # 第一个任务已完成并有记录；第二个完成了但记录没落盘；第三个的源文件丢失
+        write_file(jobs[0]["dest"])
+        os.remove(jobs[0]["src"])
+        journal.mark_done(batch, jobs[0])
+        write_file(jobs[1]["dest"])
+        os.remove(jobs[1]["src"])
+        os.remove(jobs[2]["src"])
+        journal.close()
+
+        batches = TransferJournal(self.journal_file).interrupted_batches()
+        self.assertEqual([b.batch for b in batches], [batch])
+        states = batches[0].classify_jobs()
+        self.assertEqual([job["index"] for job in states[JOB_MOVED]], [0, 1])
+        self.assertEqual(states[JOB_PENDING], [])
+        self.assertEqual([job["index"] for job in states[JOB_MISSING]], [2])
+
+    def test_foreign_file_at_dest_after_crash_is_a_conflict(self):
+        jobs = [self.make_job(i, f"f{i}.txt") for i in range(4)]
+        journal = TransferJournal(self.journal_file)
+        batch = journal.begin(jobs)
+        # 只有前两个任务在崩溃前预留了目标位置：一个是空的占位文件，一个复制了一半
+        journal.reserved(batch, jobs[:2])
+        write_file(jobs[0]["dest"], b'')
+        write_file(jobs[1]["dest"], b'da')
+        # 后两个任务的目标位置随后被用户或其他进程写入了文件
+        write_file(jobs[2]["dest"], b'')
+        write_file(jobs[3]["dest"], b'user')
+        journal.close()
+
+        interrupted = TransferJournal(self.journal_file).interrupted_batches()[0]
+        self.assertEqual(interrupted.reserved, {0, 1})
+        states = interrupted.classify_jobs()
+        self.assertEqual([job["index"] for job in states[JOB_PENDING]], [0, 1])
+        self.assertEqual([job["index"] for job in states[JOB_CONFLICT]], [2, 3])
+        self.assertFalse(interrupted.owns_dest(jobs[3]))
+        # 预留过的位置上出现比源文件大、或早于批次开始的文件，同样不是本批次的
+        write_file(jobs[1]["dest"], b'larger file')
+        self.assertFalse(interrupted.owns_dest(jobs[1]))
+        write_file(jobs[1]["dest"], b'old')
+        os.utime(jobs[1]["dest"], (0, 0))
+        self.assertFalse(interrupted.owns_dest(jobs[1]))
+
+    def test_source_missing_without_reservation_is_not_moved(self):
+        job = self.make_job(0, "a.txt")
+        journal = TransferJournal(self.journal_file)
+        journal.begin([job])
+        os.remove(job["src"])
+        write_file(job["dest"], b'user')
+        journal.close()
+        states = TransferJournal(self.journal_file).interrupted_batches()[0].classify_jobs()
+        self.assertEqual(states[JOB_MISSING], [job])
+
+    def test_replan_clears_reservation(self):
+        job = self.make_job(0, "a.txt")
+        journal = TransferJournal(self.journal_file)
+        batch = journal.begin([job], reserved=True)
+        journal.replan(batch, [dict(job, name="a_1.txt", dest=job["dest"] + ".1")])
+        journal.close()
+        self.assertEqual(TransferJournal(self.journal_file).interrupted_batches()[0].reserved, set())
+
+    def test_live_batch_of_another_process_is_not_offered(self):
+        running = TransferJournal(self.journal_file)
+        batch = running.begin([self.make_job(0, "a.txt")])
+        other = TransferJournal(self.journal_file)
+        self.assertEqual(other.interrupted_batches(), [])
+        self.assertFalse(other.adopt(batch))
+
+        running.end(batch)
+        self.assertEqual(other.interrupted_batches(), [])
+        self.assertEqual(os.path.getsize(self.journal_file), 0)
+
+    def test_adopted_batch_is_claimed(self):
+        crashed = TransferJournal(self.journal_file)
+        batch = crashed.begin([self.make_job(0, "a.txt")])
+        crashed.close()
+
+        first = TransferJournal(self.journal_file)
+        second = TransferJournal(self.journal_file)
+        self.assertEqual(len(second.interrupted_batches()), 1)
+        self.assertTrue(first.adopt(batch))
+        self.assertEqual(second.interrupted_batches(), [])
+        first.end(batch)
+        self.assertFalse(os.path.exists(f"{self.journal_file}.{batch}.lock"))
+
+    def test_end_does_not_truncate_other_open_batches(self):
+        first = TransferJournal(self.journal_file)
+        second = TransferJournal(self.journal_file)
+        batch1 = first.begin([self.make_job(0, "a.txt")])
+        batch2 = second.begin([self.make_job(1, "b.txt")])
+        first.end(batch1)
+        second.close()
+        batches = TransferJournal(self.journal_file).interrupted_batches()
+        self.assertEqual([b.batch for b in batches], [batch2])
+
+    def test_replan_and_skip(self):
+        jobs = [self.make_job(i, f"f{i}.txt") for i in range(3)]
+        journal = TransferJournal(self.journal_file)
+        batch = journal.begin(jobs)
+        journal.replan(batch, [dict(jobs[1], name="f1_1.txt", dest=jobs[1]["dest"] + ".moved")])
+        journal.skip(batch, [jobs[2]])
+        journal.close()
+        interrupted = TransferJournal(self.journal_file).interrupted_batches()[0]
+        self.assertEqual([job["index"] for job in interrupted.jobs], [0, 1])
+        self.assertEqual(interrupted.jobs[1]["name"], "f1_1.txt")
+
+
+class PipelineJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix='pipeline_')
+        self.journal_file = os.path.join(self.folder, 'transfer_journal.jsonl')
+        self.target = os.path.join(self.folder, 'target')
+        self.files = []
+        for i in range(4):
+            path = os.path.join(self.folder, 'src', f"doc_{i}.txt")
+            write_file(path, f"content {i}".encode())
+            self.files.append((path, None))
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def make_pipeline(self, journal):
+        return TransferPipeline(self.files, self.target, False, False, "{date}_{num}", journal=journal)
+
+    def test_placeholders_are_journaled_before_they_exist(self):
+        journal = TransferJournal(self.journal_file)
+        pipeline = self.make_pipeline(journal)
+        seen = []
+
+        def begin(jobs, **kwargs):
+            # 写入日志时目标位置还没有占位文件
+            seen.extend(os.path.exists(job["dest"]) for job in jobs)
+            return TransferJournal.begin(journal, jobs, **kwargs)
+
+        journal.begin = begin
+        recorded = []
+        original_reserved = journal.reserved
+        journal.reserved = lambda batch, jobs: (recorded.extend(job["index"] for job in jobs),
+                                                original_reserved(batch, jobs))
+        error_files, processed_files, _, batch, _ = pipeline.run()
+        journal.end(batch)
+        self.assertEqual(seen, [False] * 4)
+        self.assertEqual(recorded, [0, 1, 2, 3])
+        self.assertEqual(error_files, [])
+        self.assertEqual(sorted(os.listdir(self.target)), [f"doc_{i}.txt" for i in range(4)])
+
+    def test_name_taken_after_planning_is_replanned(self):
+        journal = TransferJournal(self.journal_file)
+        pipeline = self.make_pipeline(journal)
+        original_begin = journal.begin
+
+        def begin(jobs, **kwargs):
+            batch = original_begin(jobs, **kwargs)
+            # 计划生成之后另一个进程写入了同名文件
+            write_file(os.path.join(self.target, "doc_0.txt"), b'other')
+            return batch
+
+        journal.begin = begin
+        pipeline.prepare_dirs()
+        journal_jobs = {}
+        original_replan = journal.replan
+        journal.replan = lambda batch, jobs: (journal_jobs.update({j["index"]: j for j in jobs}),
+                                              original_replan(batch, jobs))
+        error_files, processed_files, _, batch, _ = pipeline.run()
+        self.assertEqual(error_files, [])
+        self.assertEqual(journal_jobs[0]["name"], "doc_0_1.txt")
+        with open(os.path.join(self.target, "doc_0.txt"), 'rb') as f:
+            self.assertEqual(f.read(), b'other')
+        with open(os.path.join(self.target, "doc_0_1.txt"), 'rb') as f:
+            self.assertEqual(f.read(), b'content 0')
+        journal.end(batch)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,407 @@
+import os
+import logging
+import time
+import threading
+from collections import deque
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from move_backend import move_file
+from naming import NameReserver, numbered_names
+from file_rules import get_classifier
+
+logger = logging.getLogger('FileManager')
+
+# 同一文件系统内的移动只是重命名，可以全并发；跨设备复制按磁盘限制并发数
+DEFAULT_MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+DEFAULT_CROSS_DEVICE_LIMIT = 2
+
+# 字节进度的最小回调间隔（秒），避免大量分块回调淹没 Qt 事件循环
+PROGRESS_INTERVAL = 0.25
+
+
+def get_file_category(file_path, size=None):
+    """按共享分类规则返回分类目录名，未知类型返回 其他"""
+    return get_classifier().folder_of(file_path, size) or "其他"
+
+
+def get_file_categories(items):
+    """批量分类 (路径, 大小) 序列，需要读取文件头的文件在线程池中并发识别"""
+    classifier = get_classifier()
+    return [("其他" if code is None else classifier.folders[code])
+            for code in classifier.classify_many(items)]
+
+
+def get_device(path):
+    """返回路径所在的设备号，路径不存在时使用最近的已存在父目录"""
+    path = os.path.abspath(path)
+    while True:
+        try:
+            return os.stat(path).st_dev
+        except OSError:
+            parent = os.path.dirname(path)
+            if parent == path:
+                return None
+            path = parent
+
+
+def format_bytes(size):
+    """把字节数格式化为便于阅读的字符串"""
+    size = float(size)
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def format_eta(seconds):
+    if seconds is None or seconds < 0:
+        return "--:--"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+
+def build_image_name(rename_pattern, counter):
+    # 应用新的重命名模式
+    if rename_pattern == "毫秒级时间戳+序号":
+        now = datetime.now()
+        timestamp = now.strftime("%Y%m%d%H%M%S") + now.strftime("%f")[:3]  # 获取毫秒部分的前3位
+    else:
+        # 默认使用秒级时间戳
+        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    return f"{timestamp}_{counter:02d}"
+
+
+def job_record(job):
+    """已完成任务在历史记录中的条目；src 用于撤销时把文件移回原处"""
+    return {
+        "name": job["name"],
+        "category": job["category"],
+        "folder": os.path.basename(job["dest_dir"]),
+        "path": job["dest"],
+        "relative_path": os.path.join(os.path.basename(job["dest_dir"]), job["name"]),
+        "src": job["src"]
+    }
+
+
+def plan_restore(items, reserver=None):
+    """生成把文件移回原位置的计划，items 为 (当前路径, 原路径, 分类) 序列
+
+    原位置已被其他文件占用时追加 _1、_2 …，返回 (jobs, error_files)。
+    """
+    if reserver is None:
+        reserver = NameReserver()
+    jobs = []
+    error_files = []
+    for idx, (current, original, category) in enumerate(items):
+        try:
+            size = os.path.getsize(current)
+            dest_dir = os.path.dirname(original)
+            os.makedirs(dest_dir, exist_ok=True)
+            stem, ext = os.path.splitext(os.path.basename(original))
+            name = reserver.reserve(dest_dir, numbered_names(stem, ext))
+            jobs.append({
+                "index": idx,
+                "src": current,
+                "size": size,
+                "dest": os.path.join(dest_dir, name),
+                "dest_dir": dest_dir,
+                "name": name,
+                "category": category
+            })
+        except Exception as e:
+            logger.error(f"Error planning restore of {current}: {str(e)}")
+            error_files.append((current, str(e)))
+    return jobs, error_files
+
+
+def plan_transfers(file_list, target_dir, categorize_files, auto_rename_images, rename_pattern,
+                   reserver=None):
+    """按输入顺序生成移动计划
+
+    图片序号等依赖顺序的步骤都在这里串行完成，并发执行阶段只负责搬运数据，
+    因此无论线程如何调度，生成的文件名都是确定的。每个目标文件名都通过 reserver
+    预留（见 NameReserver），与目标目录中已有的文件或同时进行的其他传输冲突时自动换名。
+    返回 (jobs, error_files)。
+    """
+    if reserver is None:
+        reserver = NameReserver()
+    jobs = []
+    error_files = []
+    image_counter = 1
+    categories = get_file_categories((src_path, None) for src_path, _ in file_list)
+
+    for idx, (src_path, custom_name) in enumerate(file_list):
+        try:
+            ext = os.path.splitext(src_path)[1].lower()
+            size = os.path.getsize(src_path)
+            file_category = categories[idx]
+
+            # 确定目标路径
+            if categorize_files and file_category != "其他":
+                dest_dir = os.path.join(target_dir, file_category)
+            else:
+                dest_dir = target_dir
+
+            # 自动重命名处理 - 仅对图片文件，序号被占用时顺延到下一个
+            if auto_rename_images and file_category == "images":
+                while True:
+                    name = build_image_name(rename_pattern, image_counter) + ext
+                    image_counter += 1
+                    if reserver.try_reserve(dest_dir, name):
+                        break
+            else:
+                # 视频文件直接使用原始文件名；其他文件使用自定义名称或原始名称；重名时追加 _1、_2 …
+                if file_category == "videos" or not custom_name:
+                    stem = os.path.splitext(os.path.basename(src_path))[0]
+                else:
+                    stem = custom_name
+                name = reserver.reserve(dest_dir, numbered_names(stem, ext))
+
+            jobs.append({
+                "index": idx,
+                "src": src_path,
+                "size": size,
+                "dest": os.path.join(dest_dir, name),
+                "dest_dir": dest_dir,
+                "name": name,
+                "category": file_category
+            })
+        except Exception as e:
+            logger.error(f"Error planning file {src_path}: {str(e)}")
+            error_files.append((src_path, str(e)))
+
+    return jobs, error_files
+
+
+class TransferProgress:
+    """汇总所有工作线程的字节进度，按固定间隔回调吞吐量和剩余时间
+
+    callback(bytes_done, bytes_total, speed, eta)，speed 为字节/秒（指数平滑），
+    eta 为剩余秒数，速度未知时为 -1。
+    """
+
+    def __init__(self, total_bytes, callback, interval=PROGRESS_INTERVAL):
+        self.total_bytes = total_bytes
+        self.callback = callback
+        self.interval = interval
+        self.bytes_done = 0
+        self.speed = 0.0
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+        self._last_time = self._start
+        self._last_bytes = 0
+
+    def add(self, nbytes):
+        with self._lock:
+            self.bytes_done += nbytes
+            now = time.monotonic()
+            if now - self._last_time < self.interval:
+                return
+            snapshot = self._snapshot(now)
+        self.callback(*snapshot)
+
+    def finish(self):
+        with self._lock:
+            snapshot = self._snapshot(time.monotonic())
+        self.callback(*snapshot)
+
+    def _snapshot(self, now):
+        elapsed = now - self._last_time
+        if elapsed > 0:
+            instant = (self.bytes_done - self._last_bytes) / elapsed
+            self.speed = instant if self._last_bytes == 0 else self.speed * 0.7 + instant * 0.3
+        self._last_time = now
+        self._last_bytes = self.bytes_done
+        remaining = max(0, self.total_bytes - self.bytes_done)
+        eta = remaining / self.speed if self.speed > 0 else -1.0
+        return self.bytes_done, self.total_bytes, self.speed, eta
+
+
+class TransferCancelled(Exception):
+    """用户取消了传输"""
+
+
+class TransferControl:
+    """协作式的取消与暂停
+
+    工作线程在每个文件开始前、以及跨设备复制的每个分块之前调用 checkpoint()：
+    暂停时阻塞在 Event 上（不占 CPU），取消时抛出 TransferCancelled。
+    """
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+
+    def cancel(self):
+        self._cancelled.set()
+        # 唤醒暂停中的线程，让它们看到取消
+        self._running.set()
+
+    def pause(self):
+        if not self._cancelled.is_set():
+            self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    def checkpoint(self):
+        self._running.wait()
+        if self._cancelled.is_set():
+            raise TransferCancelled()
+
+
+class TransferEngine:
+    """基于线程池的文件移动引擎
+
+    任务按 (源设备, 目标设备) 分组：同一设备上的移动是原子重命名，逐个提交到线程池全并发执行；
+    跨设备的移动需要真正复制数据，每组只开有限条通道，并且每块磁盘同时参与的复制数
+    不超过 cross_device_limit，避免机械盘和网络盘被随机读写拖垮。
+    """
+
+    def __init__(self, max_workers=None, cross_device_limit=DEFAULT_CROSS_DEVICE_LIMIT):
+        self.max_workers = max_workers or DEFAULT_MAX_WORKERS
+        self.cross_device_limit = max(1, cross_device_limit)
+        self._device_semaphores = {}
+        self._lock = threading.Lock()
+
+    def _device_semaphore(self, dev):
+        with self._lock:
+            semaphore = self._device_semaphores.get(dev)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.cross_device_limit)
+                self._device_semaphores[dev] = semaphore
+            return semaphore
+
+    @staticmethod
+    def group_by_device(jobs):
+        groups = {}
+        dest_devices = {}
+        for job in jobs:
+            dest_dir = job["dest_dir"]
+            if dest_dir not in dest_devices:
+                dest_devices[dest_dir] = get_device(dest_dir)
+            key = (get_device(job["src"]), dest_devices[dest_dir])
+            groups.setdefault(key, []).append(job)
+        return groups
+
+    def move(self, job, progress=None, checkpoint=None):
+        move_file(job["src"], job["dest"], progress, checkpoint)
+
+    def _move_job(self, job, progress=None, control=None):
+        checkpoint = None
+        if control is not None:
+            control.checkpoint()
+            checkpoint = control.checkpoint
+        # 热路径：每个文件只写一条调试日志，用 % 参数让级别未开启时不必格式化字符串
+        self.move(job, progress, checkpoint)
+        logger.debug("已移动 %s -> %s（%s）", job["src"], job["dest"], job["category"])
+        return job
+
+    def _move_cross_device(self, job, devices, progress=None, control=None):
+        # 按固定顺序获取磁盘信号量，避免两组任务交叉等待造成死锁
+        semaphores = [self._device_semaphore(dev) for dev in devices]
+        for semaphore in semaphores:
+            semaphore.acquire()
+        try:
+            return self._move_job(job, progress, control)
+        finally:
+            for semaphore in reversed(semaphores):
+                semaphore.release()
+
+    def _run_lane(self, queue, devices, on_result, progress=None, control=None):
+        # 一条跨设备通道：顺序取出同组任务逐个复制
+        while True:
+            try:
+                job = queue.popleft()
+            except IndexError:
+                return
+            try:
+                self._move_cross_device(job, devices, progress, control)
+                on_result(job, None)
+            except Exception as e:
+                on_result(job, e)
+
+    def run(self, jobs, on_job_finished=None, on_bytes_progress=None, control=None):
+        """执行移动计划，返回 (error_files, processed_files, cancelled_jobs)，都按输入顺序排列
+
+        on_job_finished(done, job, error) 在工作线程中调用，done 为已完成的任务数；
+        on_bytes_progress 的参数见 TransferProgress；control 为 TransferControl，
+        取消后尚未开始的任务和复制到一半的任务都计入 cancelled_jobs，源文件保持不动。
+        """
+        tracker = None
+        progress = None
+        if on_bytes_progress:
+            tracker = TransferProgress(sum(job["size"] for job in jobs), on_bytes_progress)
+            progress = tracker.add
+
+        results = {}
+        errors = {}
+        cancelled = {}
+        done = [0]
+        result_lock = threading.Lock()
+
+        def on_result(job, error):
+            with result_lock:
+                if error is None:
+                    results[job["index"]] = job
+                elif isinstance(error, TransferCancelled):
+                    cancelled[job["index"]] = job
+                else:
+                    error_msg = f"Error moving file {job['src']}: {str(error)}"
+                    logger.error(error_msg)
+                    errors[job["index"]] = (job["src"], str(error))
+                done[0] += 1
+                finished = done[0]
+            if on_job_finished:
+                on_job_finished(finished, job, error)
+
+        # 预先创建所有目标目录，工作线程里不再做目录检查
+        for dest_dir in sorted({job["dest_dir"] for job in jobs}):
+            try:
+                os.makedirs(dest_dir, exist_ok=True)
+            except OSError as e:
+                logger.error(f"无法创建目录 {dest_dir}: {str(e)}")
+
+        groups = self.group_by_device(jobs)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="transfer") as pool:
+            futures = {}
+            for (src_dev, dst_dev), group in groups.items():
+                if src_dev is not None and src_dev == dst_dev:
+                    for job in group:
+                        futures[pool.submit(self._move_job, job, progress, control)] = job
+                else:
+                    devices = sorted({dev for dev in (src_dev, dst_dev) if dev is not None})
+                    queue = deque(group)
+                    for _ in range(min(self.cross_device_limit, len(group))):
+                        pool.submit(self._run_lane, queue, devices, on_result, progress, control)
+
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    future.result()
+                    on_result(job, None)
+                except Exception as e:
+                    on_result(job, e)
+
+        if tracker:
+            tracker.finish()
+
+        processed_files = [job_record(results[index]) for index in sorted(results)]
+        error_files = [errors[index] for index in sorted(errors)]
+        cancelled_jobs = [cancelled[index] for index in sorted(cancelled)]
+        if cancelled_jobs:
+            logger.info(f"传输已取消，{len(cancelled_jobs)} 个文件未移动")
+        return error_files, processed_files, cancelled_jobs
@@ -0,0 +1,341 @@
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+logger = logging.getLogger('FileManager')
+
+# 完成记录攒够这么多条或距上次 fsync 超过这么久才 fsync 一次
+SYNC_EVERY = 64
+SYNC_INTERVAL = 0.5
+
+# 中断批次中单个任务的状态
+JOB_MOVED = "moved"      # 已经移动到目标位置
+JOB_PENDING = "pending"  # 源文件还在，尚未移动（或跨设备复制未完成）
+JOB_MISSING = "missing"  # 源文件和目标文件都不在
+JOB_CONFLICT = "conflict"  # 源文件还在，但目标位置是其他文件，不能删除或覆盖
+
+
+def _lock_file(f, blocking=True):
+    """对打开的锁文件加排他锁，非阻塞时被其他进程（或同一文件的另一个句柄）占用则返回 False"""
+    try:
+        if os.name == 'nt':
+            f.seek(0)
+            # LK_LOCK 最多重试 10 秒后失败
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+    except OSError:
+        return False
+    return True
+
+
+def _unlock_file(f):
+    if os.name == 'nt':
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class InterruptedBatch:
+    """日志中没有结束记录的批次"""
+
+    def __init__(self, batch, time_str, kind, extra):
+        self.batch = batch
+        self.time = time_str
+        self.kind = kind
+        self.extra = extra  # begin 记录中的附加字段，例如撤销批次的 undo_of
+        self.jobs = []
+        self.done = set()
+        self.reserved = set()  # 已创建占位文件的任务序号，换了目标位置后需要重新记录
+        self._jobs = {}  # 任务序号 -> 最新的计划，读完日志后整理到 jobs
+
+    @property
+    def started(self):
+        """批次开始的时间戳（精确到秒，向下取整），无法解析时返回 None"""
+        try:
+            return datetime.strptime(self.time, "%Y-%m-%d %H:%M:%S").timestamp()
+        except ValueError:
+            return None
+
+    def classify_jobs(self):
+        """结合完成记录和文件系统的实际情况判断每个任务的状态，返回 {状态: [job]}
+
+        完成记录是批量 fsync 的，崩溃前最后几条可能没有落盘，因此没有完成记录的任务
+        还要看源文件是否仍在：源文件不在而目标文件在，说明移动其实已经完成。
+        计划先于占位文件写入日志，目标位置上的文件不一定是本批次创建的，见 owns_dest。
+        """
+        result = {JOB_MOVED: [], JOB_PENDING: [], JOB_MISSING: [], JOB_CONFLICT: []}
+        for job in self.jobs:
+            if job["index"] in self.done:
+                state = JOB_MOVED
+            elif os.path.lexists(job["src"]):
+                state = JOB_PENDING if self.owns_dest(job) else JOB_CONFLICT
+            elif (job["index"] in self.reserved and os.path.exists(job["dest"])
+                  and os.path.getsize(job["dest"]) == job["size"]):
+                state = JOB_MOVED
+            else:
+                state = JOB_MISSING
+            result[state].append(job)
+        return result
+
+    def owns_dest(self, job):
+        """目标位置不存在，或只是本批次留下的占位文件 / 未完成的复制，可以删除或覆盖
+
+        只有日志中有预留记录的任务才可能留下文件：空的占位文件、不大于源文件且不早于
+        批次开始的半成品，以及 copystat 之后删除源文件之前崩溃留下的完整副本。
+        """
+        try:
+            dest_stat = os.stat(job["dest"])
+        except FileNotFoundError:
+            return True
+        if job["index"] not in self.reserved:
+            return False
+        if dest_stat.st_size == 0:
+            return True
+        if dest_stat.st_size > job["size"]:
+            return False
+        started = self.started
+        if started is not None and dest_stat.st_mtime >= started:
+            return True
+        try:
+            src_stat = os.stat(job["src"])
+        except OSError:
+            return False
+        return dest_stat.st_size == src_stat.st_size and dest_stat.st_mtime_ns == src_stat.st_mtime_ns
+
+
+class TransferJournal:
+    """移动操作的预写日志（JSON Lines）
+
+    每个批次开始前把全部计划 (src → dest) 写入日志并 fsync，之后每移动完一个文件追加一条完成记录，
+    完成记录按条数 / 时间批量 fsync，批次结束时写入结束记录。程序崩溃或机器休眠后，
+    启动时没有结束记录的批次即为中断的批次，可以据此继续完成或回滚。
+    所有批次都结束后日志被清空，文件只保存进行中的批次。
+
+    图形界面和命令行可能同时使用同一个日志：进行中的批次持有各自的锁文件，
+    其他进程据此区分中断的批次和仍在运行的批次；写入开始 / 结束记录和清空日志
+    都在日志锁内进行，清空时不会丢掉其他进程刚写入的记录。
+    """
+
+    def __init__(self, journal_file, sync_every=SYNC_EVERY, sync_interval=SYNC_INTERVAL):
+        self.journal_file = journal_file
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._open_batches = {}  # 批次号 -> 持有的批次锁文件
+
+    # ---- 写入 ----
+
+    def _lock_path(self, batch=None):
+        return f"{self.journal_file}.{batch}.lock" if batch else f"{self.journal_file}.lock"
+
+    def _journal_lock(self):
+        """日志锁：返回已加锁的锁文件，用完后 _release 释放"""
+        f = open(self._lock_path(), 'a')
+        _lock_file(f)
+        return f
+
+    @staticmethod
+    def _release(lock):
+        try:
+            _unlock_file(lock)
+        finally:
+            lock.close()
+
+    def _claim(self, batch):
+        """获取批次锁，批次正由其他进程处理时返回 None"""
+        lock = open(self._lock_path(batch), 'a')
+        if not _lock_file(lock, blocking=False):
+            lock.close()
+            return None
+        return lock
+
+    def _write(self, records, sync):
+        if self._file is None:
+            self._file = open(self.journal_file, 'a', encoding='utf-8')
+            # 上次崩溃可能留下写了一半的行，另起一行避免与新记录粘连
+            if self._file.tell() > 0 and not self._ends_with_newline():
+                self._file.write('\n')
+        self._file.write(''.join(json.dumps(r, ensure_ascii=False, separators=(',', ':')) + '\n'
+                                 for r in records))
+        self._unsynced += len(records)
+        now = time.monotonic()
+        if sync or self._unsynced >= self.sync_every or now - self._last_sync >= self.sync_interval:
+            lock = self._journal_lock()
+            try:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            finally:
+                self._release(lock)
+            self._unsynced = 0
+            self._last_sync = now
+
+    def _ends_with_newline(self):
+        with open(self.journal_file, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def begin(self, jobs, kind="transfer", reserved=False, **extra):
+        """记录一个新批次及其全部计划，fsync 后返回批次号，之后才能开始移动
+
+        reserved 表示调用前已经为这些计划创建了占位文件（撤销、回滚的计划），
+        否则预留成功后要调用 reserved() 记录。
+        """
+        batch = datetime.now().strftime("%Y%m%d%H%M%S%f") + f"-{os.getpid()}"
+        header = {"op": "begin", "batch": batch, "kind": kind,
+                  "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+        header.update(extra)
+        records = [header]
+        records.extend({"op": "plan", "batch": batch, "job": job} for job in jobs)
+        if reserved:
+            records.extend({"op": "reserved", "batch": batch, "i": job["index"]} for job in jobs)
+        with self._lock:
+            # 先持有批次锁再写入开始记录，其他进程不会把它当作中断的批次
+            self._open_batches[batch] = self._claim(batch)
+            self._write(records, sync=True)
+        return batch
+
+    def adopt(self, batch):
+        """接手日志中中断的批次，继续在其下记录完成情况；已被其他进程接手时返回 False"""
+        with self._lock:
+            if batch in self._open_batches:
+                return True
+            lock = self._claim(batch)
+            if lock is None:
+                return False
+            self._open_batches[batch] = lock
+            return True
+
+    def replan(self, batch, jobs):
+        """批次开始后个别任务换了目标位置（预留时被其他进程抢先），fsync 后再使用新位置"""
+        records = [{"op": "plan", "batch": batch, "job": job} for job in jobs]
+        with self._lock:
+            self._write(records, sync=True)
+
+    def reserved(self, batch, jobs):
+        """记录已为这些任务创建了占位文件，恢复时只会删除或覆盖有预留记录的目标文件"""
+        records = [{"op": "reserved", "batch": batch, "i": job["index"]} for job in jobs]
+        if records:
+            with self._lock:
+                self._write(records, sync=True)
+
+    def skip(self, batch, jobs):
+        """任务从批次中去掉（重复文件、预留失败等），恢复时不再处理"""
+        records = [{"op": "skip", "batch": batch, "i": job["index"]} for job in jobs]
+        if records:
+            with self._lock:
+                self._write(records, sync=False)
+
+    def mark_done(self, batch, job):
+        with self._lock:
+            self._write([{"op": "done", "batch": batch, "i": job["index"]}], sync=False)
+
+    def end(self, batch, status="committed"):
+        """批次结束（完成 / 回滚 / 放弃），没有进行中的批次时清空日志"""
+        with self._lock:
+            self._write([{"op": "end", "batch": batch, "status": status}], sync=True)
+            lock = self._open_batches.pop(batch, None)
+            if lock is not None:
+                self._release(lock)
+                try:
+                    os.remove(self._lock_path(batch))
+                except OSError:
+                    # Windows 上其他进程正打开着锁文件检查批次，留给下次清理
+                    pass
+            if not self._open_batches:
+                self._truncate()
+
+    def _truncate(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        try:
+            # 读取和清空之间其他进程不能写入；其他进程的批次仍在日志中时不能清空
+            lock = self._journal_lock()
+            try:
+                if not self._read_interrupted():
+                    with open(self.journal_file, 'w', encoding='utf-8'):
+                        pass
+            finally:
+                self._release(lock)
+        except OSError as e:
+            logger.warning(f"清空传输日志失败: {str(e)}")
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+            for lock in self._open_batches.values():
+                if lock is not None:
+                    self._release(lock)
+            self._open_batches.clear()
+
+    # ---- 恢复 ----
+
+    def interrupted_batches(self):
+        """返回没有结束记录、也没有任何进程正在处理的批次"""
+        with self._lock:
+            batches = self._read_interrupted()
+            open_batches = set(self._open_batches)
+        result = []
+        for interrupted in batches:
+            if interrupted.batch in open_batches:
+                continue
+            lock = self._claim(interrupted.batch)
+            if lock is None:
+                # 另一个进程（例如定时运行的命令行）仍在执行这个批次
+                continue
+            self._release(lock)
+            result.append(interrupted)
+        return result
+
+    def _read_interrupted(self):
+        batches = {}
+        try:
+            with open(self.journal_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # 崩溃时写了一半的最后一行
+                        continue
+                    op = record.get("op")
+                    batch = record.get("batch")
+                    if op == "begin":
+                        extra = {k: v for k, v in record.items() if k not in ("op", "batch", "time", "kind")}
+                        batches[batch] = InterruptedBatch(batch, record.get("time", ""),
+                                                          record.get("kind", "transfer"), extra)
+                    elif batch not in batches:
+                        continue
+                    elif op == "plan":
+                        # 同一任务的后一条计划覆盖前一条
+                        batches[batch]._jobs[record["job"]["index"]] = record["job"]
+                        batches[batch].reserved.discard(record["job"]["index"])
+                    elif op == "reserved":
+                        batches[batch].reserved.add(record["i"])
+                    elif op == "skip":
+                        batches[batch]._jobs.pop(record["i"], None)
+                    elif op == "done":
+                        batches[batch].done.add(record["i"])
+                    elif op == "end":
+                        del batches[batch]
+        except FileNotFoundError:
+            return []
+        for interrupted in batches.values():
+            interrupted.jobs = sorted(interrupted._jobs.values(), key=lambda job: job["index"])
+        return list(batches.values())
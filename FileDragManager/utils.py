@@ -1,42 +1,24 @@
-import os
-import shutil
-import json
 import logging
-from datetime import datetime
 from PyQt6.QtCore import QThread, pyqtSignal
 
-# 配置日志
-logging.basicConfig(
-    filename='file_manager.log',
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger('FileManager')
+from transfer import TransferControl, TransferEngine
+from pipeline import TransferPipeline, TransferSetupError
+from scanner import SCAN_BATCH_SIZE, scan_folder
+from dedup import DEDUP_OFF
 
-# 文件分类映射
-FILE_CATEGORIES = {
-    "图像": ['.jpg', '.jpeg', '.png', '.gif'],
-    "视频": ['.mp4', '.mov', '.avi', '.mkv', '.flv', '.wmv'],
-    "音频": ['.mp3', '.wav', '.flac', '.aac'],
-    "HTML": ['.html', '.htm'],
-    "文档": ['.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', 
-           '.txt', '.md', '.epub', '.mobi', '.azw3', '.chm']
-}
-
-EN_CATEGORY_MAP = {
-    "图像": "images",
-    "视频": "videos",
-    "音频": "audios",
-    "HTML": "htmls",
-    "文档": "documents"
-}
+logger = logging.getLogger('FileManager')
 
 class FileTransferThread(QThread):
     progress_updated = pyqtSignal(int, str)
+    # (已复制字节, 总字节, 速度 字节/秒, 剩余秒数)，字节数可能超过 32 位整数范围
+    bytes_progress = pyqtSignal(object, object, float, float)
+    # (error_files, processed_files, duplicate_files, batch, cancelled_files)，
+    # batch 为传输日志中的批次号，cancelled_files 为取消后未移动的源路径
     transfer_complete = pyqtSignal(tuple)
     error_occurred = pyqtSignal(str, str)
 
-    def __init__(self, file_list, target_dir, categorize_files, auto_rename_images, rename_pattern):
+    def __init__(self, file_list, target_dir, categorize_files, auto_rename_images, rename_pattern,
+                 max_workers=None, dedup_mode=DEDUP_OFF, hash_cache_file=None, journal=None):
         super().__init__()
         self.file_list = file_list
         self.target_dir = target_dir
@@ -44,110 +26,104 @@ class FileTransferThread(QThread):
         self.auto_rename_images = auto_rename_images
         self.rename_pattern = rename_pattern
         self.total_files = len(file_list)
+        self.max_workers = max_workers
+        self.dedup_mode = dedup_mode
+        self.hash_cache_file = hash_cache_file
+        self.journal = journal
+        # 进度对话框的 暂停 / 继续 / 取消 按钮通过它控制引擎
+        self.control = TransferControl()
 
     def run(self):
-        error_files = []
-        processed_files = []
-        
-        # 确保目标目录存在
-        if not os.path.exists(self.target_dir):
-            try:
-                os.makedirs(self.target_dir)
-            except Exception as e:
-                self.error_occurred.emit("目录创建失败", f"无法创建目标目录: {str(e)}")
-                return
-        
-        # 创建分类目录
-        if self.categorize_files:
-            for category in EN_CATEGORY_MAP.values():
-                category_dir = os.path.join(self.target_dir, category)
-                if not os.path.exists(category_dir):
-                    try:
-                        os.makedirs(category_dir)
-                    except Exception as e:
-                        self.error_occurred.emit("目录创建失败", f"无法创建分类目录: {str(e)}")
-                        return
-        
-        # 计数器用于自动重命名
-        image_counter = 1
-        
-        # 移动文件（剪切）
-        for idx, (src_path, custom_name) in enumerate(self.file_list):
-            try:
-                # 获取文件扩展名
-                _, ext = os.path.splitext(src_path)
-                ext = ext.lower()
-                
-                # 查找文件分类
-                file_category = "其他"
-                for cat, exts in FILE_CATEGORIES.items():
-                    if ext in exts:
-                        file_category = EN_CATEGORY_MAP[cat]
-                        break
-                
-                # 视频文件特殊处理 - 直接使用原始文件名
-                if file_category == "videos":
-                    new_name = os.path.splitext(os.path.basename(src_path))[0]
-                # 自动重命名处理 - 仅对图片文件
-                elif self.auto_rename_images and file_category == "images":
-                    # 应用新的重命名模式
-                    if self.rename_pattern == "秒级时间戳+序号":
-                        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-                        new_name = f"{timestamp}_{image_counter:02d}"
-                    elif self.rename_pattern == "毫秒级时间戳+序号":
-                        millisecond = datetime.now().strftime("%f")[:3]  # 获取毫秒部分的前3位
-                        timestamp = datetime.now().strftime("%Y%m%d%H%M%S") + millisecond
-                        new_name = f"{timestamp}_{image_counter:02d}"
-                    else:
-                        # 默认使用秒级时间戳
-                        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-                        new_name = f"{timestamp}_{image_counter:02d}"
-                    
-                    image_counter += 1
-                else:
-                    # 对于非图片文件或未开启自动重命名，使用自定义名称或原始名称
-                    new_name = custom_name if custom_name else os.path.splitext(os.path.basename(src_path))[0]
-                
-                # 确定目标路径
-                if self.categorize_files and file_category != "其他":
-                    dest_dir = os.path.join(self.target_dir, file_category)
+        pipeline = TransferPipeline(
+            self.file_list,
+            self.target_dir,
+            self.categorize_files,
+            self.auto_rename_images,
+            self.rename_pattern,
+            max_workers=self.max_workers,
+            dedup_mode=self.dedup_mode,
+            hash_cache_file=self.hash_cache_file,
+            journal=self.journal,
+            control=self.control
+        )
+        try:
+            result = pipeline.run(self.progress_updated.emit, self.bytes_progress.emit)
+        except TransferSetupError as e:
+            self.error_occurred.emit("目录创建失败", str(e))
+            return
+        self.transfer_complete.emit(result)
+
+
+class BatchMoveThread(QThread):
+    """在后台执行已经写入传输日志的移动计划：撤销批次、继续或回滚中断的批次"""
+
+    progress_updated = pyqtSignal(int, str)
+    bytes_progress = pyqtSignal(object, object, float, float)
+    # (批次号, (error_files, processed_files))
+    batch_complete = pyqtSignal(str, tuple)
+
+    def __init__(self, jobs, journal, batch, reserver=None, max_workers=None):
+        super().__init__()
+        self.jobs = jobs
+        self.journal = journal
+        self.batch = batch
+        self.reserver = reserver
+        self.max_workers = max_workers
+
+    def run(self):
+        total = max(1, len(self.jobs))
+
+        def on_job_finished(done, job, error):
+            if error is None:
+                self.journal.mark_done(self.batch, job)
+            self.progress_updated.emit(int(done / total * 100), f"已处理: {job['name']}")
+
+        engine = TransferEngine(max_workers=self.max_workers)
+        error_files, processed_files, _ = engine.run(self.jobs, on_job_finished, self.bytes_progress.emit)
+
+        if self.reserver is not None:
+            moved = {info["path"] for info in processed_files}
+            for job in self.jobs:
+                if job["dest"] in moved:
+                    self.reserver.commit(job["dest"])
                 else:
-                    dest_dir = self.target_dir
-                
-                # 构建目标路径
-                dest_path = os.path.join(dest_dir, new_name + ext)
-                
-                # 更新进度
-                self.progress_updated.emit(int((idx + 1) / self.total_files * 100), 
-                                          f"正在移动: {new_name}{ext}")
-                
-                # 添加详细的日志记录
-                logger.debug(f"Processing file: {src_path}")
-                logger.debug(f"File category: {file_category}")
-                logger.debug(f"New name: {new_name}{ext}")
-                logger.debug(f"Destination path: {dest_path}")
-                
-                # 确保目标目录存在
-                if not os.path.exists(dest_dir):
-                    os.makedirs(dest_dir)
-                
-                # 移动文件（剪切）
-                shutil.move(src_path, dest_path)
-                
-                # 记录处理信息
-                processed_files.append({
-                    "name": new_name + ext,
-                    "category": file_category,
-                    "folder": os.path.basename(dest_dir),
-                    "path": dest_path,
-                    "relative_path": os.path.join(os.path.basename(dest_dir), new_name + ext)
-                })
-                
-                logger.debug(f"File moved successfully: {src_path}")
-                
-            except Exception as e:
-                error_msg = f"Error moving file {src_path}: {str(e)}"
-                logger.error(error_msg)
-                error_files.append((src_path, str(e)))
-        
-        self.transfer_complete.emit((error_files, processed_files))
\ No newline at end of file
+                    self.reserver.release(job["dest"])
+
+        self.batch_complete.emit(self.batch, (error_files, processed_files))
+
+
+class FolderScanThread(QThread):
+    """后台扫描文件夹，按批次把结果发送给界面，可随时取消"""
+
+    batch_found = pyqtSignal(list)
+    progress_updated = pyqtSignal(int)
+    scan_finished = pyqtSignal(int, bool)  # (文件总数, 是否被取消)
+
+    def __init__(self, folder_path, max_depth=None, extensions=None, batch_size=SCAN_BATCH_SIZE):
+        super().__init__()
+        self.folder_path = folder_path
+        self.max_depth = max_depth
+        self.extensions = extensions
+        self.batch_size = batch_size
+
+    def cancel(self):
+        self.requestInterruption()
+
+    def run(self):
+        count = 0
+        batch = []
+        for item in scan_folder(self.folder_path, self.max_depth, self.extensions,
+                                self.isInterruptionRequested):
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                count += len(batch)
+                self.batch_found.emit(batch)
+                self.progress_updated.emit(count)
+                batch = []
+                if self.isInterruptionRequested():
+                    break
+        if batch and not self.isInterruptionRequested():
+            count += len(batch)
+            self.batch_found.emit(batch)
+            self.progress_updated.emit(count)
+        self.scan_finished.emit(count, self.isInterruptionRequested())
@@ -0,0 +1,336 @@
+"""批量删除预设字段：把同一份预设应用到整个目录的文本文件
+
+用法示例：
+    python "Word Processing/batch_cleanup.py" notes/ --preset preset.txt --in-place
+    python "Word Processing/batch_cleanup.py" notes/ --preset preset.txt --ext .md --jobs 4
+
+文件在进程池中并发处理，每个工作进程只编译一次预设；结果先写临时文件再原子替换。
+目录下的 .text_cleanup_manifest.json 记录每个文件处理后的内容哈希，
+内容和预设都没有变化的文件下次直接跳过。
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from pattern_matcher import compile_preset
+
+logger = logging.getLogger('TextProcessor')
+
+DEFAULT_EXTENSIONS = ('.md', '.txt')
+# 不覆盖原文件时，输出文件名为 原名 + 后缀 + 扩展名
+DEFAULT_SUFFIX = "_cleaned"
+MANIFEST_FILE = ".text_cleanup_manifest.json"
+# 文件数少于这个值时在当前进程中处理，省去启动进程池的开销
+PROCESS_POOL_MIN_FILES = 8
+
+# 文件处理结果
+STATUS_CHANGED = "changed"
+STATUS_UNCHANGED = "unchanged"  # 没有匹配，内容不变
+STATUS_SKIPPED = "skipped"      # 按内容哈希判断上次已处理过
+STATUS_ERROR = "error"
+
+
+def content_hash(data):
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+def preset_digest(preset_content):
+    """只与生效的模式有关，空行和两端空白不同的预设视为相同"""
+    return content_hash('\n'.join(compile_preset(preset_content).patterns).encode('utf-8'))
+
+
+def parse_extensions(text):
+    exts = set()
+    for part in text.replace(';', ',').replace(' ', ',').split(','):
+        part = part.strip().lower()
+        if part:
+            exts.add(part if part.startswith('.') else '.' + part)
+    return tuple(sorted(exts)) or DEFAULT_EXTENSIONS
+
+
+def output_path(path, in_place, suffix=DEFAULT_SUFFIX):
+    if in_place:
+        return path
+    stem, ext = os.path.splitext(path)
+    return f"{stem}{suffix}{ext}"
+
+
+def collect_files(root, extensions=DEFAULT_EXTENSIONS, recursive=True, suffix=None):
+    """按名称顺序列出 root 下指定扩展名的文件；suffix 不为空时跳过之前生成的输出文件"""
+    files = []
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError as e:
+            logger.warning(f"无法读取目录 {current}: {str(e)}")
+            continue
+        subdirs = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive and not entry.name.startswith('.'):
+                        subdirs.append(entry.path)
+                    continue
+                if not entry.is_file():
+                    continue
+            except OSError:
+                continue
+            stem, ext = os.path.splitext(entry.name)
+            if ext.lower() not in extensions:
+                continue
+            if suffix and stem.endswith(suffix):
+                continue
+            files.append(entry.path)
+        stack.extend(reversed(subdirs))
+    return files
+
+
+def atomic_write(path, data):
+    """写入同目录下的临时文件并 fsync，再用 os.replace 替换，失败时不会留下半个文件"""
+    tmp_file = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_file, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            try:
+                os.chmod(tmp_file, os.stat(path).st_mode & 0o7777)
+            except OSError:
+                pass
+        os.replace(tmp_file, path)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+
+
+# ---- 工作进程 ----
+
+_worker_preset = None
+
+
+def _init_worker(preset_content):
+    # 每个工作进程只接收并编译一次预设，任务参数里不再携带整份预设
+    global _worker_preset
+    _worker_preset = preset_content
+    compile_preset(preset_content)
+
+
+def clean_file(path, dest, known_hash=None, preset_content=None):
+    """处理单个文件，返回结果字典；known_hash 为清单中记录的上次处理后的内容哈希"""
+    remover = compile_preset(_worker_preset if preset_content is None else preset_content)
+    result = {"path": path, "dest": dest, "status": STATUS_ERROR, "removed": 0, "bytes": 0, "hash": None}
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        result["bytes"] = len(data)
+        digest = content_hash(data)
+        if known_hash == digest and (dest == path or os.path.exists(dest)):
+            result.update(status=STATUS_SKIPPED, hash=digest)
+            return result
+        # 无法按 UTF-8 解码的字节原样写回
+        text = data.decode('utf-8', errors='surrogateescape')
+        cleaned, removed = remover.remove(text)
+        result["removed"] = removed
+        if removed:
+            output = cleaned.encode('utf-8', errors='surrogateescape')
+            atomic_write(dest, output)
+            result.update(status=STATUS_CHANGED, hash=content_hash(output) if dest == path else digest)
+        else:
+            if dest != path:
+                atomic_write(dest, data)
+            result.update(status=STATUS_UNCHANGED, hash=digest)
+    except (OSError, UnicodeError) as e:
+        result["error"] = str(e)
+    return result
+
+
+# ---- 批处理 ----
+
+class Manifest:
+    """记录 相对路径 -> (预设摘要, 输出文件, 内容哈希)
+
+    原地处理时记录处理后的哈希，否则记录输入文件的哈希；预设或输出位置变化后记录失效。
+    """
+
+    def __init__(self, root, enabled=True):
+        self.path = os.path.join(root, MANIFEST_FILE)
+        self.root = root
+        self.enabled = enabled
+        self.entries = {}
+        if enabled:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    entries = json.load(f)
+                if isinstance(entries, dict):
+                    self.entries = entries
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                logger.warning(f"读取处理清单失败，将重新处理所有文件: {str(e)}")
+
+    def _key(self, path):
+        return os.path.relpath(path, self.root).replace('\\', '/')
+
+    def known_hash(self, path, dest, digest):
+        entry = self.entries.get(self._key(path))
+        if entry and entry.get("preset") == digest and entry.get("dest") == self._key(dest):
+            return entry.get("hash")
+        return None
+
+    def update(self, path, dest, digest, file_hash):
+        self.entries[self._key(path)] = {"preset": digest, "dest": self._key(dest), "hash": file_hash}
+
+    def save(self):
+        if not self.enabled:
+            return
+        data = json.dumps(self.entries, ensure_ascii=False, indent=1, sort_keys=True).encode('utf-8')
+        try:
+            atomic_write(self.path, data)
+        except OSError as e:
+            logger.warning(f"保存处理清单失败: {str(e)}")
+
+
+class BatchReport:
+    def __init__(self):
+        self.results = []
+        self.elapsed = 0.0
+        self.cancelled = False
+
+    def count(self, status):
+        return sum(1 for r in self.results if r["status"] == status)
+
+    @property
+    def removed(self):
+        return sum(r["removed"] for r in self.results)
+
+    @property
+    def total_bytes(self):
+        return sum(r["bytes"] for r in self.results)
+
+    @property
+    def mb_per_second(self):
+        return self.total_bytes / 1024 / 1024 / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self):
+        return (f"{len(self.results)} 个文件：修改 {self.count(STATUS_CHANGED)}，无匹配 {self.count(STATUS_UNCHANGED)}，"
+                f"跳过 {self.count(STATUS_SKIPPED)}，失败 {self.count(STATUS_ERROR)}；"
+                f"共删除 {self.removed} 处，{self.total_bytes / 1024 / 1024:.1f} MB，"
+                f"{self.mb_per_second:.1f} MB/s，用时 {self.elapsed:.2f} 秒")
+
+
+def run_batch(preset_content, files, root, in_place=False, suffix=DEFAULT_SUFFIX, max_workers=None,
+              use_manifest=True, on_file_done=None, should_stop=None):
+    """处理 files（均位于 root 下），返回 BatchReport
+
+    on_file_done(result, done, total) 在当前进程中逐个文件调用；should_stop() 为真时
+    取消尚未开始的文件，已在处理的文件会正常完成。
+    """
+    report = BatchReport()
+    digest = preset_digest(preset_content)
+    manifest = Manifest(root, use_manifest)
+    tasks = []
+    for path in files:
+        dest = output_path(path, in_place, suffix)
+        tasks.append((path, dest, manifest.known_hash(path, dest, digest)))
+    total = len(tasks)
+    start = time.perf_counter()
+
+    def collect(result):
+        report.results.append(result)
+        if result["status"] == STATUS_ERROR:
+            logger.warning(f"处理失败 {result['path']}: {result.get('error')}")
+        elif result["hash"] is not None:
+            manifest.update(result["path"], result["dest"], digest, result["hash"])
+        if on_file_done:
+            on_file_done(result, len(report.results), total)
+
+    if total < PROCESS_POOL_MIN_FILES or max_workers == 1:
+        for path, dest, known in tasks:
+            if should_stop and should_stop():
+                report.cancelled = True
+                break
+            collect(clean_file(path, dest, known, preset_content))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(preset_content,)) as pool:
+            futures = [pool.submit(clean_file, *task) for task in tasks]
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                collect(future.result())
+                if should_stop and should_stop() and not report.cancelled:
+                    report.cancelled = True
+                    for pending in futures:
+                        pending.cancel()
+
+    report.elapsed = time.perf_counter() - start
+    # 结果按完成顺序到达，按路径排好便于阅读
+    report.results.sort(key=lambda r: r["path"])
+    manifest.save()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='把预设中的字段从目录下的所有文本文件中删除')
+    parser.add_argument('root', help='要处理的目录')
+    parser.add_argument('--preset', required=True, help='预设文件，每行一个要删除的字段')
+    parser.add_argument('--ext', default='', help=f"处理的扩展名，默认 {','.join(DEFAULT_EXTENSIONS)}")
+    parser.add_argument('--in-place', action='store_true', help='直接覆盖原文件')
+    parser.add_argument('--suffix', default=DEFAULT_SUFFIX, help=f'不覆盖原文件时输出文件名的后缀，默认 {DEFAULT_SUFFIX}')
+    parser.add_argument('--no-recursive', action='store_true', help='只处理顶层目录')
+    parser.add_argument('-j', '--jobs', type=int, help='工作进程数，默认等于 CPU 核数')
+    parser.add_argument('--no-manifest', action='store_true', help='不读写处理清单，所有文件都重新处理')
+    parser.add_argument('-q', '--quiet', action='store_true', help='只输出汇总')
+    args = parser.parse_args()
+    logging.basicConfig(stream=sys.stderr, level=logging.WARNING,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if not os.path.isdir(args.root):
+        print(f"目录不存在: {args.root}", file=sys.stderr)
+        return 2
+    try:
+        with open(args.preset, 'r', encoding='utf-8') as f:
+            preset_content = f.read()
+    except OSError as e:
+        print(f"无法读取预设文件: {str(e)}", file=sys.stderr)
+        return 2
+    if not args.in_place and not args.suffix:
+        print("不覆盖原文件时 --suffix 不能为空", file=sys.stderr)
+        return 2
+
+    root = os.path.abspath(args.root)
+    files = collect_files(root, parse_extensions(args.ext), not args.no_recursive,
+                          None if args.in_place else args.suffix)
+
+    def on_file_done(result, done, total):
+        if args.quiet:
+            return
+        rel = os.path.relpath(result["path"], root)
+        if result["status"] == STATUS_ERROR:
+            print(f"[{done}/{total}] {rel}: 失败 {result.get('error')}")
+        else:
+            print(f"[{done}/{total}] {rel}: {result['status']} 删除 {result['removed']} 处")
+
+    try:
+        report = run_batch(preset_content, files, root, args.in_place, args.suffix, args.jobs,
+                           not args.no_manifest, on_file_done)
+    except KeyboardInterrupt:
+        print("已取消", file=sys.stderr)
+        return 130
+    print(report.summary(), file=sys.stderr)
+    return 1 if report.count(STATUS_ERROR) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,205 @@
+import re
+from collections import deque
+from functools import lru_cache
+
+# 编译结果按预设内容缓存的个数：预设很少变化，保留最近几份即可
+PRESET_CACHE_SIZE = 8
+# 分块处理时每块的字符数
+STREAM_CHUNK_CHARS = 1024 * 1024
+# 日志中文本预览的最大字符数，避免把几十 MB 的文本写进日志
+LOG_PREVIEW_CHARS = 200
+
+# 匹配时把反斜杠统一为正斜杠，C:\a\b 与 C:/a/b 视为同一路径
+_SEPARATOR_TABLE = str.maketrans('\\', '/')
+
+
+def normalize_separators(text):
+    return text.translate(_SEPARATOR_TABLE)
+
+
+def preview(text, limit=LOG_PREVIEW_CHARS):
+    """日志用的文本预览：超过 limit 个字符时截断并注明总长度"""
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}…（共 {len(text)} 个字符）"
+
+
+class PatternRemover:
+    """Aho-Corasick 自动机：一次线性扫描删除文本中出现的所有模式
+
+    旧实现对每个模式各做三次 str.replace（原样、反斜杠、正斜杠），耗时与 模式数 × 文本长度
+    成正比。这里把所有模式建成一个自动机，路径分隔符在建树和扫描时都统一为 '/'，
+    因此一次扫描即可覆盖全部分隔符写法。多个模式重叠时按“最靠左、最长”的规则删除。
+    """
+
+    def __init__(self, patterns):
+        # 状态 0 为根；goto[s] 为状态 s 的出边，fail[s] 为失败指针，
+        # out[s] 为以状态 s 结尾的最长模式长度（0 表示没有），depth[s] 为状态对应的字符串长度
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [0]
+        self.depth = [0]
+        self.max_length = 0
+        self.patterns = []
+        seen = set()
+        for pattern in patterns:
+            key = normalize_separators(pattern)
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            self.max_length = max(self.max_length, len(key))
+            self.patterns.append(pattern)
+            self._add(key)
+        self._build()
+        # 在根状态时用正则直接跳到下一个可能的模式起点，跳过大段不相关的文本
+        first_chars = ''.join(sorted(self.goto[0]))
+        self._next_start = re.compile(f"[{re.escape(first_chars)}]").search if first_chars else None
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def _add(self, key):
+        state = 0
+        for ch in key:
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append(0)
+                self.depth.append(self.depth[state] + 1)
+            state = nxt
+        self.out[state] = len(key)
+
+    def _build(self):
+        # 按层（BFS）计算失败指针，并把失败状态上的最长匹配合并进来
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(ch, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                if not self.out[nxt]:
+                    self.out[nxt] = self.out[self.fail[nxt]]
+
+    def find(self, text):
+        """返回按位置排列、互不重叠的匹配区间 [(start, end)]"""
+        norm = normalize_separators(text)
+        goto, fail, out, depth = self.goto, self.fail, self.out, self.depth
+        next_start = self._next_start
+        matches = []
+        if next_start is None:
+            return matches
+        n = len(norm)
+        state = 0
+        pending = None  # 当前最靠左、最长的候选匹配 (start, end)
+        i = 0
+        while True:
+            while i < n:
+                if state == 0 and pending is None:
+                    m = next_start(norm, i)
+                    if m is None:
+                        break
+                    i = m.start()
+                ch = norm[i]
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(ch, 0)
+                i += 1
+                length = out[state]
+                if length:
+                    start = i - length
+                    if pending is None or start <= pending[0]:
+                        pending = (start, i)
+                # 之后的匹配起点都不会早于 i - depth[state]，已越过候选起点时确定该匹配，
+                # 并从匹配结尾重新开始扫描，保证匹配互不重叠
+                if pending is not None and i - depth[state] > pending[0]:
+                    matches.append(pending)
+                    i = pending[1]
+                    state = 0
+                    pending = None
+            if pending is None:
+                return matches
+            # 扫到结尾时仍有候选：确定它，匹配结尾之后的文本还要继续扫描
+            matches.append(pending)
+            i = pending[1]
+            state = 0
+            pending = None
+
+    def remove(self, text):
+        """删除所有匹配，返回 (结果文本, 删除的匹配个数)"""
+        matches = self.find(text)
+        if not matches:
+            return text, 0
+        parts = []
+        last = 0
+        for start, end in matches:
+            parts.append(text[last:start])
+            last = end
+        parts.append(text[last:])
+        return ''.join(parts), len(matches)
+
+
+class StreamingRemover:
+    """分块删除：feed() 返回已经可以确定的输出，可能跨越块边界的部分留到下一块
+
+    起点距缓冲区末尾至少 max_length 个字符的匹配，其最长形式已经完整出现，
+    因此只需保留末尾不足一个最长模式的文本，结果与一次处理整段文本完全相同。
+    """
+
+    def __init__(self, remover):
+        self.remover = remover
+        self.removed = 0
+        self._carry = ""
+
+    def feed(self, chunk):
+        buf = self._carry + chunk if self._carry else chunk
+        cut = len(buf) - self.remover.max_length + 1
+        if cut <= 0:
+            self._carry = buf
+            return ""
+        parts = []
+        last = 0
+        for start, end in self.remover.find(buf):
+            if start >= cut:
+                break
+            parts.append(buf[last:start])
+            last = end
+            self.removed += 1
+        keep = max(cut, last)
+        parts.append(buf[last:keep])
+        self._carry = buf[keep:]
+        return ''.join(parts)
+
+    def finish(self):
+        result, removed = self.remover.remove(self._carry)
+        self._carry = ""
+        self.removed += removed
+        return result
+
+
+def remove_stream(remover, chunks, write, should_stop=None):
+    """逐块删除匹配并交给 write，返回删除的匹配个数；should_stop() 为真时停止并返回 None"""
+    stream = StreamingRemover(remover)
+    for chunk in chunks:
+        if should_stop and should_stop():
+            return None
+        write(stream.feed(chunk))
+    write(stream.finish())
+    return stream.removed
+
+
+def preset_patterns(preset_content):
+    """预设文本每行一个模式，去掉两端空白，忽略空行"""
+    return [line.strip() for line in preset_content.splitlines() if line.strip()]
+
+
+@lru_cache(maxsize=PRESET_CACHE_SIZE)
+def compile_preset(preset_content):
+    """按预设内容缓存编译好的自动机，预设不变时重复处理不必重新建树"""
+    return PatternRemover(preset_patterns(preset_content))
@@ -0,0 +1,102 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from batch_cleanup import (DEFAULT_EXTENSIONS, MANIFEST_FILE, STATUS_CHANGED, STATUS_SKIPPED, STATUS_UNCHANGED,
+                           collect_files, output_path, parse_extensions, preset_digest, run_batch)
+
+PRESET = "foo\n\n  bar  \n"
+
+
+class BatchCleanupTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='batch_cleanup_')
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.write("a.txt", "foo1 bar2\n")
+        self.write("sub/b.md", "nothing here\n")
+        self.write("sub/c.log", "foo\n")
+        self.write(".hidden/d.txt", "foo\n")
+        # 无法按 UTF-8 解码的字节原样保留
+        self.write("e.txt", b"\xff foo \xfe")
+
+    def write(self, name, data):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data.encode('utf-8') if isinstance(data, str) else data)
+        return path
+
+    def read(self, name):
+        with open(os.path.join(self.root, name), 'rb') as f:
+            return f.read()
+
+    def files(self, **kwargs):
+        return collect_files(self.root, **kwargs)
+
+    def statuses(self, report):
+        return {os.path.relpath(r["path"], self.root): r["status"] for r in report.results}
+
+    def test_helpers(self):
+        self.assertEqual(parse_extensions("md; TXT log"), ('.log', '.md', '.txt'))
+        self.assertEqual(parse_extensions(""), DEFAULT_EXTENSIONS)
+        self.assertEqual(output_path("/x/a.txt", False), "/x/a_cleaned.txt")
+        self.assertEqual(output_path("/x/a.txt", True), "/x/a.txt")
+        self.assertEqual(preset_digest(PRESET), preset_digest("foo\nbar"))
+        self.assertNotEqual(preset_digest(PRESET), preset_digest("foo"))
+
+    def test_collect_files(self):
+        rel = [os.path.relpath(p, self.root) for p in self.files()]
+        self.assertEqual(rel, ["a.txt", "e.txt", os.path.join("sub", "b.md")])
+        self.assertEqual(len(self.files(recursive=False)), 2)
+        self.write("a_cleaned.txt", "")
+        self.assertEqual(len(self.files(suffix="_cleaned")), 3)
+
+    def test_in_place_with_manifest(self):
+        report = run_batch(PRESET, self.files(), self.root, in_place=True, max_workers=1)
+        self.assertEqual(self.statuses(report), {"a.txt": STATUS_CHANGED, "e.txt": STATUS_CHANGED,
+                                                 os.path.join("sub", "b.md"): STATUS_UNCHANGED})
+        self.assertEqual(self.read("a.txt"), b"1 2\n")
+        self.assertEqual(self.read("e.txt"), b"\xff  \xfe")
+        self.assertTrue(os.path.exists(os.path.join(self.root, MANIFEST_FILE)))
+
+        # 内容和预设都没变的文件第二次直接跳过；文件被修改后重新处理
+        self.write("a.txt", "foo again\n")
+        report = run_batch(PRESET, self.files(), self.root, in_place=True, max_workers=1)
+        self.assertEqual(self.statuses(report), {"a.txt": STATUS_CHANGED, "e.txt": STATUS_SKIPPED,
+                                                 os.path.join("sub", "b.md"): STATUS_SKIPPED})
+        # 预设变化后记录失效
+        report = run_batch("again", self.files(), self.root, in_place=True, max_workers=1)
+        self.assertEqual(report.count(STATUS_SKIPPED), 0)
+        self.assertEqual(self.read("a.txt"), b" \n")
+
+    def test_output_files_keep_originals(self):
+        run_batch(PRESET, self.files(), self.root, use_manifest=False, max_workers=1)
+        self.assertEqual(self.read("a.txt"), b"foo1 bar2\n")
+        self.assertEqual(self.read("a_cleaned.txt"), b"1 2\n")
+        self.assertEqual(self.read(os.path.join("sub", "b_cleaned.md")), b"nothing here\n")
+        self.assertFalse(os.path.exists(os.path.join(self.root, MANIFEST_FILE)))
+
+    def test_process_pool(self):
+        for i in range(12):
+            self.write(f"many/{i}.txt", f"foo {i} bar\n" * 50)
+        files = self.files()
+        done = []
+        report = run_batch(PRESET, files, self.root, use_manifest=False, max_workers=2,
+                           on_file_done=lambda result, count, total: done.append((count, total)))
+        self.assertEqual(done[-1], (len(files), len(files)))
+        self.assertEqual(self.read("many/3_cleaned.txt"), b" 3 \n" * 50)
+        self.assertEqual([r["path"] for r in report.results], sorted(files))
+
+    def test_should_stop_cancels_remaining_files(self):
+        report = run_batch(PRESET, self.files(), self.root, use_manifest=False, max_workers=1,
+                           should_stop=lambda: True)
+        self.assertTrue(report.cancelled)
+        self.assertEqual(report.results, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
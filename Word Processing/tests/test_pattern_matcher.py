@@ -0,0 +1,97 @@
+import os
+import re
+import sys
+import random
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pattern_matcher import (
+    PatternRemover, StreamingRemover, compile_preset, normalize_separators, preset_patterns, remove_stream
+)
+
+
+def reference_remove(text, patterns):
+    """参考实现：按长度降序组成正则分支，在统一分隔符后的文本上做最靠左、最长的匹配"""
+    keys = sorted({normalize_separators(p) for p in patterns if p}, key=len, reverse=True)
+    if not keys:
+        return text, 0
+    regex = re.compile('|'.join(re.escape(k) for k in keys))
+    parts = []
+    last = 0
+    count = 0
+    for m in regex.finditer(normalize_separators(text)):
+        parts.append(text[last:m.start()])
+        last = m.end()
+        count += 1
+    parts.append(text[last:])
+    return ''.join(parts), count
+
+
+def random_case(rng, alphabet='ab/\\'):
+    patterns = [''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 5)))
+                for _ in range(rng.randint(1, 6))]
+    text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+    return patterns, text
+
+
+class PatternRemoverTest(unittest.TestCase):
+    def test_trailing_matches_after_pending_match(self):
+        self.assertEqual(PatternRemover(['notes/', 'notes/notes/archive/']).remove('see notes/notes/'),
+                         ('see ', 2))
+        self.assertEqual(PatternRemover(['a', 'aab']).remove('aa'), ('', 2))
+
+    def test_separators_are_interchangeable(self):
+        remover = PatternRemover(['C:/work/'])
+        self.assertEqual(remover.remove('C:\\work\\a.txt C:/work/b.txt'), ('a.txt b.txt', 2))
+
+    def test_leftmost_longest(self):
+        self.assertEqual(PatternRemover(['ab', 'abcd', 'bc']).remove('xabcdy'), ('xy', 1))
+        self.assertEqual(PatternRemover(['bcd', 'ab']).remove('abcd'), ('cd', 1))
+
+    def test_empty_inputs(self):
+        self.assertEqual(PatternRemover([]).remove('text'), ('text', 0))
+        self.assertEqual(PatternRemover(['', 'a']).remove(''), ('', 0))
+
+    def test_matches_reference_on_random_inputs(self):
+        rng = random.Random(20261018)
+        for _ in range(5000):
+            patterns, text = random_case(rng)
+            with self.subTest(patterns=patterns, text=text):
+                self.assertEqual(PatternRemover(patterns).remove(text), reference_remove(text, patterns))
+
+
+class StreamingRemoverTest(unittest.TestCase):
+    def test_chunked_output_matches_one_shot(self):
+        rng = random.Random(7)
+        for _ in range(2000):
+            patterns, text = random_case(rng)
+            remover = PatternRemover(patterns)
+            cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, 6))))
+            chunks = [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+            out = []
+            removed = remove_stream(remover, chunks, out.append)
+            with self.subTest(patterns=patterns, chunks=chunks):
+                self.assertEqual((''.join(out), removed), reference_remove(text, patterns))
+
+    def test_should_stop_cancels(self):
+        stream_result = remove_stream(PatternRemover(['a']), ['aaa', 'aaa'], lambda s: None, lambda: True)
+        self.assertIsNone(stream_result)
+
+    def test_finish_resets_carry(self):
+        stream = StreamingRemover(PatternRemover(['abc']))
+        self.assertEqual(stream.feed('xab') + stream.finish(), 'xab')
+        self.assertEqual(stream.feed('abc') + stream.finish(), '')
+        self.assertEqual(stream.removed, 1)
+
+
+class PresetTest(unittest.TestCase):
+    def test_preset_patterns_skip_blank_lines(self):
+        self.assertEqual(preset_patterns('  a/b  \n\n\tc\n'), ['a/b', 'c'])
+
+    def test_compile_preset_is_cached(self):
+        self.assertIs(compile_preset('x\ny'), compile_preset('x\ny'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,145 @@
+import os
 import sys
+import logging
+import multiprocessing
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-    QLabel, QTextEdit, QPushButton, QFileDialog, QMessageBox, QDialog, QGroupBox, QStatusBar
+    QLabel, QTextEdit, QPushButton, QFileDialog, QMessageBox, QDialog, QGroupBox, QStatusBar,
+    QProgressDialog
 )
-from PyQt6.QtCore import QSettings, QCoreApplication, Qt
+from PyQt6.QtCore import QSettings, QCoreApplication, Qt, QThread, pyqtSignal
 from PyQt6.QtGui import QFont, QPalette, QColor, QClipboard
 
+# 三个程序共用的日志配置模块
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
+from log_setup import setup_logging
+from pattern_matcher import STREAM_CHUNK_CHARS, compile_preset, preview, remove_stream
+from batch_cleanup import DEFAULT_EXTENSIONS, DEFAULT_SUFFIX, STATUS_ERROR, collect_files, run_batch
+
+logger = logging.getLogger('TextProcessor')
+
+
+class TextProcessThread(QThread):
+    """在后台分块删除预设模式
+
+    text 模式处理输入框中的文本；文件模式直接从 input_file 流式读取、写入 output_file，
+    大文件不经过 QTextEdit 也不整体载入内存。跨块边界的匹配由 StreamingRemover 处理。
+    """
+
+    progress_updated = pyqtSignal(int)
+    text_ready = pyqtSignal(str, int)   # (结果文本, 删除的匹配个数)
+    file_ready = pyqtSignal(str, int)   # (输出文件, 删除的匹配个数)
+    process_cancelled = pyqtSignal()
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, preset_content, text=None, input_file=None, output_file=None,
+                 chunk_chars=STREAM_CHUNK_CHARS):
+        super().__init__()
+        self.preset_content = preset_content
+        self.text = text
+        self.input_file = input_file
+        self.output_file = output_file
+        self.chunk_chars = chunk_chars
+
+    def cancel(self):
+        self.requestInterruption()
+
+    def run(self):
+        try:
+            remover = compile_preset(self.preset_content)
+            logger.info(f"预设模式数: {len(remover)}")
+            if self.input_file is None:
+                self.process_text(remover)
+            else:
+                self.process_file(remover)
+        except Exception as e:
+            logger.error(f"处理文本失败: {str(e)}")
+            self.error_occurred.emit(str(e))
+
+    def process_text(self, remover):
+        text = self.text
+        total = max(1, len(text))
+
+        def chunks():
+            for start in range(0, len(text), self.chunk_chars):
+                yield text[start:start + self.chunk_chars]
+                self.progress_updated.emit(min(100, (start + self.chunk_chars) * 100 // total))
+
+        parts = []
+        removed = remove_stream(remover, chunks(), parts.append, self.isInterruptionRequested)
+        if removed is None:
+            self.process_cancelled.emit()
+            return
+        result = ''.join(parts)
+        logger.info(f"删除了 {removed} 处匹配，处理后文本长度: {len(result)}，预览: {preview(result)}")
+        self.text_ready.emit(result, removed)
+
+    def process_file(self, remover):
+        total = max(1, os.path.getsize(self.input_file))
+        # 先写临时文件，完成后原子替换，取消或出错时不会留下半个输出文件；
+        # newline='' 保留原有换行符，无法按 UTF-8 解码的字节原样写回
+        tmp_file = self.output_file + '.tmp'
+        try:
+            with open(self.input_file, 'r', encoding='utf-8', errors='surrogateescape', newline='') as src, \
+                    open(tmp_file, 'w', encoding='utf-8', errors='surrogateescape', newline='') as dst:
+                def chunks():
+                    while True:
+                        chunk = src.read(self.chunk_chars)
+                        if not chunk:
+                            return
+                        yield chunk
+                        self.progress_updated.emit(min(100, src.buffer.tell() * 100 // total))
+
+                removed = remove_stream(remover, chunks(), dst.write, self.isInterruptionRequested)
+            if removed is None:
+                os.remove(tmp_file)
+                self.process_cancelled.emit()
+                return
+            os.replace(tmp_file, self.output_file)
+        except BaseException:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            raise
+        logger.info(f"{self.input_file} -> {self.output_file}: 删除了 {removed} 处匹配")
+        self.file_ready.emit(self.output_file, removed)
+
+
+class BatchCleanupThread(QThread):
+    """在后台把预设应用到整个目录的文本文件（进程池并发），信号与 TextProcessThread 相同"""
+
+    progress_updated = pyqtSignal(int)
+    batch_ready = pyqtSignal(object)  # BatchReport
+    process_cancelled = pyqtSignal()
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, preset_content, root, in_place, extensions=DEFAULT_EXTENSIONS):
+        super().__init__()
+        self.preset_content = preset_content
+        self.root = root
+        self.in_place = in_place
+        self.extensions = extensions
+
+    def cancel(self):
+        self.requestInterruption()
+
+    def run(self):
+        try:
+            files = collect_files(self.root, self.extensions, suffix=None if self.in_place else DEFAULT_SUFFIX)
+            report = run_batch(
+                self.preset_content, files, self.root, self.in_place,
+                on_file_done=lambda result, done, total: self.progress_updated.emit(done * 100 // total),
+                should_stop=self.isInterruptionRequested
+            )
+        except Exception as e:
+            logger.error(f"批量处理失败: {str(e)}")
+            self.error_occurred.emit(str(e))
+            return
+        logger.info(f"批量处理 {self.root}: {report.summary()}")
+        if report.cancelled:
+            self.process_cancelled.emit()
+        self.batch_ready.emit(report)
+
+
 class PresetDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -119,6 +253,7 @@ class TextProcessorApp(QMainWindow):
         
         # 创建预设对话框
         self.preset_dialog = PresetDialog(self)
+        self.process_thread = None
         
         self.init_ui()
         self.load_config()
@@ -221,8 +356,22 @@ class TextProcessorApp(QMainWindow):
         """)
         self.process_copy_btn.clicked.connect(self.process_and_copy_text)
         
+        # 处理文件：直接读写文件，大文本不必粘贴到输入框
+        self.process_file_btn = QPushButton("处理文件")
+        self.process_file_btn.setStyleSheet(self.paste_btn.styleSheet())
+        self.process_file_btn.setToolTip("从文件读取文本，删除预设字段后写入新文件")
+        self.process_file_btn.clicked.connect(self.process_file)
+        
         buttons_layout.addWidget(self.paste_btn)
         buttons_layout.addWidget(self.process_copy_btn)
+        buttons_layout.addWidget(self.process_file_btn)
+        
+        # 批量处理：把预设应用到整个目录的 .md / .txt 文件
+        self.batch_btn = QPushButton("批量处理")
+        self.batch_btn.setStyleSheet(self.paste_btn.styleSheet())
+        self.batch_btn.setToolTip(f"删除目录下所有 {' / '.join(DEFAULT_EXTENSIONS)} 文件中的预设字段")
+        self.batch_btn.clicked.connect(self.process_folder)
+        buttons_layout.addWidget(self.batch_btn)
         main_layout.addLayout(buttons_layout)
         
         main_widget.setLayout(main_layout)
@@ -281,35 +430,116 @@ class TextProcessorApp(QMainWindow):
             QMessageBox.warning(self, "警告", "请输入需要处理的文本！")
             return
         
-        # 调试信息
-        print(f"输入文本: '{input_content}'")
-        print(f"输入文本长度: {len(input_content)}")
-        print(f"预设文本: '{preset_content}'")
-        print(f"预设文本行数: {len([p for p in preset_content.splitlines() if p.strip()])}")
-        
-        # 处理文本
-        result = input_content
-        for pattern in preset_content.splitlines():
-            pattern = pattern.strip()  # 移除模式两端的空格
-            if pattern:
-                print(f"替换模式: '{pattern}'")
-                original_len = len(result)
-                # 尝试匹配并替换
-                result = result.replace(pattern, "")
-                # 处理可能的路径分隔符差异
-                pattern_with_backslash = pattern.replace('/', '\\')
-                result = result.replace(pattern_with_backslash, "")
-                pattern_with_forward_slash = pattern.replace('\\', '/')
-                result = result.replace(pattern_with_forward_slash, "")
-                new_len = len(result)
-                print(f"替换后减少了 {original_len - new_len} 个字符")
+        # 日志只记录长度和截断的预览，几十 MB 的文本不会被完整写进日志
+        logger.info(f"输入文本长度: {len(input_content)}，预览: {preview(input_content)}")
+        
+        # 在后台分块处理：所有预设模式编译为一个自动机（按预设内容缓存），正反斜杠视为相同
+        thread = TextProcessThread(preset_content, text=input_content)
+        thread.text_ready.connect(self.handle_text_ready)
+        self.start_processing(thread, "正在处理文本...")
+        
+    def process_file(self):
+        input_file, _ = QFileDialog.getOpenFileName(
+            self, "选择要处理的文件", "", "文本文件 (*.txt *.log);;所有文件 (*.*)")
+        if not input_file:
+            return
+        stem, ext = os.path.splitext(input_file)
+        output_file, _ = QFileDialog.getSaveFileName(
+            self, "保存处理结果", f"{stem}_processed{ext}", "文本文件 (*.txt *.log);;所有文件 (*.*)")
+        if not output_file:
+            return
+        if os.path.abspath(output_file) == os.path.abspath(input_file):
+            QMessageBox.warning(self, "警告", "输出文件不能与输入文件相同！")
+            return
+        
+        thread = TextProcessThread(self.preset_dialog.preset_text.toPlainText(),
+                                   input_file=input_file, output_file=output_file)
+        thread.file_ready.connect(self.handle_file_ready)
+        self.start_processing(thread, f"正在处理 {os.path.basename(input_file)}...")
+        
+    def process_folder(self):
+        preset_content = self.preset_dialog.preset_text.toPlainText()
+        if not preset_content.strip():
+            QMessageBox.warning(self, "警告", "请先设置预设文本！")
+            return
+        root = QFileDialog.getExistingDirectory(self, "选择要批量处理的目录")
+        if not root:
+            return
+        
+        box = QMessageBox(self)
+        box.setWindowTitle("批量处理")
+        box.setText(f"删除 {root} 下所有 {' / '.join(DEFAULT_EXTENSIONS)} 文件中的预设字段")
+        in_place_btn = box.addButton("覆盖原文件", QMessageBox.ButtonRole.AcceptRole)
+        copy_btn = box.addButton(f"另存为 *{DEFAULT_SUFFIX}", QMessageBox.ButtonRole.AcceptRole)
+        box.addButton("取消", QMessageBox.ButtonRole.RejectRole)
+        box.exec()
+        if box.clickedButton() not in (in_place_btn, copy_btn):
+            return
+        
+        thread = BatchCleanupThread(preset_content, root, box.clickedButton() is in_place_btn)
+        thread.batch_ready.connect(self.handle_batch_ready)
+        self.start_processing(thread, f"正在批量处理 {os.path.basename(root)}...")
         
+    def start_processing(self, thread, label):
+        if self.process_thread is not None and self.process_thread.isRunning():
+            return
+        self.process_thread = thread
+        self.process_copy_btn.setEnabled(False)
+        self.process_file_btn.setEnabled(False)
+        self.batch_btn.setEnabled(False)
+        
+        # 处理很快时不弹出进度对话框
+        progress_dialog = QProgressDialog(label, "取消", 0, 100, self)
+        progress_dialog.setWindowTitle("处理中")
+        progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        progress_dialog.setMinimumDuration(500)
+        progress_dialog.setAutoClose(False)
+        progress_dialog.setValue(0)
+        progress_dialog.canceled.connect(thread.cancel)
+        thread.progress_updated.connect(progress_dialog.setValue)
+        thread.process_cancelled.connect(lambda: self.status_bar.showMessage("处理已取消", 3000))
+        thread.error_occurred.connect(
+            lambda message: QMessageBox.critical(self, "错误", f"处理失败:\n{message}"))
+        thread.finished.connect(progress_dialog.close)
+        thread.finished.connect(self.handle_processing_finished)
+        thread.start()
+        
+    def handle_processing_finished(self):
+        self.process_copy_btn.setEnabled(True)
+        self.process_file_btn.setEnabled(True)
+        self.batch_btn.setEnabled(True)
+        
+    def handle_text_ready(self, result, removed):
         # 复制结果到剪贴板
         clipboard = QApplication.clipboard()
         clipboard.setText(result)
+        self.status_bar.showMessage(f"删除了 {removed} 处匹配", 3000)
         QMessageBox.information(self, "成功", "处理结果已复制到剪贴板！")
-        print(f"处理后文本: '{result}'")
-        print(f"处理后文本长度: {len(result)}")
+        
+    def handle_file_ready(self, output_file, removed):
+        self.status_bar.showMessage(f"删除了 {removed} 处匹配", 3000)
+        QMessageBox.information(self, "成功", f"处理结果已保存到:\n{output_file}")
+        
+    def handle_batch_ready(self, report):
+        self.status_bar.showMessage(f"批量处理完成，删除了 {report.removed} 处匹配", 3000)
+        lines = []
+        for result in report.results:
+            if result["status"] == STATUS_ERROR:
+                lines.append(f"{result['path']}: 失败 {result.get('error')}")
+            else:
+                lines.append(f"{result['path']}: {result['status']}，删除 {result['removed']} 处")
+        box = QMessageBox(self)
+        box.setIcon(QMessageBox.Icon.Warning if report.count(STATUS_ERROR) else QMessageBox.Icon.Information)
+        box.setWindowTitle("批量处理完成" if not report.cancelled else "批量处理已取消")
+        box.setText(report.summary())
+        box.setDetailedText("\n".join(lines))
+        box.exec()
+        
+    def closeEvent(self, event):
+        if self.process_thread is not None and self.process_thread.isRunning():
+            self.process_thread.cancel()
+            self.process_thread.wait()
+        event.accept()
         
     def apply_dark_theme(self):
         # 设置深色主题
@@ -337,6 +567,9 @@ class TextProcessorApp(QMainWindow):
         self.status_bar.showMessage(status_text)
 
 if __name__ == "__main__":
+    # 批量处理使用进程池，打包后的程序需要它才能启动工作进程
+    multiprocessing.freeze_support()
+    setup_logging(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'text_processor.log'))
     app = QApplication(sys.argv)
     window = TextProcessorApp()
     window.show()
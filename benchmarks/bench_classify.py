@@ -0,0 +1,92 @@
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from collections import deque
+from functools import partial
+
+# 让基准脚本可以直接导入 shared 下的模块
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(PROJECT_ROOT, 'shared'))
+
+from file_rules import DEFAULT_RULES, FileClassifier
+from sniffer import ContentSniffer
+
+EXTRA_EXTS = ['.py', '.zip', '.exe', '.json', '.log', '.tar.gz']
+
+
+def legacy_classify(categories, path):
+    """旧实现：逐个分类遍历扩展名列表"""
+    ext = os.path.splitext(path)[1].lower()
+    for cat, exts in categories.items():
+        if ext in exts:
+            return cat
+    return None
+
+
+def make_paths(count, distinct, seed=0):
+    rng = random.Random(seed)
+    exts = [ext for category in DEFAULT_RULES['categories'] for ext in category['extensions']]
+    exts += EXTRA_EXTS
+    names = [f"C:/data/folder_{i % 97}/file_{i}{rng.choice(exts).upper() if i % 5 == 0 else rng.choice(exts)}"
+             for i in range(distinct)]
+    return [names[rng.randrange(distinct)] for _ in range(count)]
+
+
+def bench(label, func, paths):
+    start = time.perf_counter()
+    # map 在 C 层循环，计时里只包含分类本身
+    deque(map(func, paths), maxlen=0)
+    elapsed = time.perf_counter() - start
+    per_million = elapsed / len(paths) * 1_000_000
+    print(f"{label:<28} {len(paths) / elapsed / 1e6:>10.2f} {per_million:>14.3f}")
+
+
+def bench_sniff(count):
+    """没有扩展名的文件按文件头识别：首次读取与命中 inode 缓存的对比"""
+    folder = tempfile.mkdtemp(prefix='bench_sniff_')
+    heads = [bytes.fromhex("89504e470d0a1a0a"), b"%PDF-1.7", b"ID3\x04", b"plain text"]
+    items = []
+    for i in range(count):
+        path = os.path.join(folder, f"download_{i}")
+        with open(path, 'wb') as f:
+            f.write(heads[i % len(heads)] + b"\x00" * 1024)
+        items.append((path, None))
+    classifier = FileClassifier(sniffer=ContentSniffer())
+    for label in ('按内容分类（首次读取）', '按内容分类（inode 缓存）'):
+        start = time.perf_counter()
+        classifier.classify_many(items)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<28} {count / elapsed / 1e6:>10.2f} {elapsed / count * 1_000_000:>14.3f}")
+    shutil.rmtree(folder, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='比较旧的逐类遍历与编译后分类器的分类吞吐量')
+    parser.add_argument('--count', type=int, default=1_000_000, help='分类的路径总数')
+    parser.add_argument('--distinct', type=int, default=200_000, help='其中不同路径的数量')
+    parser.add_argument('--sniff', type=int, default=5000, help='按内容分类测试创建的无扩展名文件数')
+    args = parser.parse_args()
+
+    paths = make_paths(args.count, args.distinct)
+    # 先只比较按名称分类：去掉内容规则，未知扩展名不会去读文件
+    legacy = {c['name']: c['extensions'] for c in DEFAULT_RULES['categories']}
+    name_rules = {'categories': [{k: v for k, v in c.items() if k != 'content'}
+                                 for c in DEFAULT_RULES['categories']]}
+
+    print(f"路径数: {args.count}，不同路径: {args.distinct}")
+    print(f"{'实现':<28} {'百万路径/秒':>10} {'秒/百万路径':>14}")
+    bench('逐类遍历扩展名列表', partial(legacy_classify, legacy), paths)
+    classifier = FileClassifier(name_rules)
+    bench('FileClassifier（冷缓存）', classifier.classify, paths)
+    bench('FileClassifier（热缓存）', classifier.classify, paths)
+    print(classifier.cache_info())
+    if args.sniff:
+        bench_sniff(args.sniff)
+
+
+if __name__ == '__main__':
+    main()
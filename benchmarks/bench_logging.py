@@ -0,0 +1,90 @@
+import os
+import sys
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import subprocess
+
+# 让基准脚本可以直接导入 shared 下的模块
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(PROJECT_ROOT, 'shared'))
+
+from log_setup import LEVELS_ENV, setup_logging, shutdown_logging
+
+SCENARIOS = {
+    'legacy': '旧配置：basicConfig DEBUG，每个文件 4 条',
+    'queue-info': '队列 + 轮转，INFO 级别',
+    'queue-debug': '队列 + 轮转 + 限流，DEBUG 级别',
+}
+
+
+def legacy_per_file(logger, job):
+    """旧的传输循环：每个文件 4 条 f-string 调试日志，同步写入文件"""
+    logger.debug(f"Processing file: {job['src']}")
+    logger.debug(f"File category: {job['category']}")
+    logger.debug(f"Destination path: {job['dest']}")
+    logger.debug(f"File moved successfully: {job['src']}")
+
+
+def new_per_file(logger, job):
+    """现在的传输循环：每个文件一条 % 参数的调试日志"""
+    logger.debug("已移动 %s -> %s（%s）", job["src"], job["dest"], job["category"])
+
+
+def run_scenario(name, count, log_file):
+    if name == 'legacy':
+        logging.basicConfig(filename=log_file, level=logging.DEBUG,
+                            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        per_file = legacy_per_file
+    else:
+        if name == 'queue-debug':
+            os.environ[LEVELS_ENV] = 'FileManager=DEBUG'
+        setup_logging(log_file)
+        per_file = new_per_file
+    logger = logging.getLogger('FileManager')
+    jobs = [{"src": f"C:/Users/me/Downloads/file_{i}.jpg",
+             "dest": f"D:/收藏/images/20240101120000_{i:02d}.jpg",
+             "category": "images"} for i in range(count)]
+
+    start = time.perf_counter()
+    for job in jobs:
+        per_file(logger, job)
+    caller = time.perf_counter() - start
+    # 包含后台线程把队列写完的时间
+    if name == 'legacy':
+        logging.shutdown()
+    else:
+        shutdown_logging()
+    total = time.perf_counter() - start
+    size = os.path.getsize(log_file) if os.path.exists(log_file) else 0
+    print(f"{SCENARIOS[name]:<32} {caller / count * 1e6:>10.2f} {total / count * 1e6:>12.2f} {size / 1024:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='测量传输循环中每个文件的日志开销')
+    parser.add_argument('--count', type=int, default=100_000, help='模拟的文件数')
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), help='只运行一个场景（内部使用）')
+    parser.add_argument('--log-file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        run_scenario(args.scenario, args.count, args.log_file)
+        return
+
+    # 日志配置是进程级的全局状态，每个场景在独立的子进程中运行
+    print(f"文件数: {args.count}")
+    print(f"{'场景':<32} {'调用方 微秒/文件':>10} {'含落盘 微秒/文件':>12} {'日志 KB':>10}")
+    folder = tempfile.mkdtemp(prefix='bench_logging_')
+    env = dict(os.environ)
+    env.pop(LEVELS_ENV, None)
+    for name in SCENARIOS:
+        log_file = os.path.join(folder, f"{name}.log")
+        subprocess.run([sys.executable, os.path.abspath(__file__), '--count', str(args.count),
+                        '--scenario', name, '--log-file', log_file], env=env, check=True)
+    shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+# 让基准脚本可以直接导入 FileDragManager 下的模块
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(PROJECT_ROOT, 'FileDragManager'))
+
+from move_backend import move_file
+
+SIZES = {
+    '1KB': 1024,
+    '1MB': 1024 * 1024,
+    '2GB': 2 * 1024 * 1024 * 1024
+}
+
+
+def make_file(path, size):
+    block = os.urandom(min(size, 4 * 1024 * 1024))
+    with open(path, 'wb') as f:
+        remaining = size
+        while remaining > 0:
+            n = min(remaining, len(block))
+            f.write(block[:n])
+            remaining -= n
+
+
+def bench(label, mover, src_dir, dst_dir, size, count):
+    sources = []
+    for i in range(count):
+        path = os.path.join(src_dir, f"{label}_{i}.bin")
+        make_file(path, size)
+        sources.append(path)
+
+    start = time.perf_counter()
+    for path in sources:
+        mover(path, os.path.join(dst_dir, os.path.basename(path)))
+    elapsed = time.perf_counter() - start
+
+    for path in sources:
+        os.remove(os.path.join(dst_dir, os.path.basename(path)))
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='比较 shutil.move 与 move_backend.move_file 的吞吐量')
+    parser.add_argument('--src-dir', default=None, help='源目录（默认临时目录）')
+    parser.add_argument('--dst-dir', default=None,
+                        help='目标目录（默认临时目录），须与源目录在不同设备上，否则只测到 os.replace')
+    parser.add_argument('--sizes', default='1KB,1MB,2GB', help='逗号分隔的文件大小: 1KB,1MB,2GB')
+    parser.add_argument('--total', type=int, default=256 * 1024 * 1024,
+                        help='每种大小至少移动的总字节数，小文件会重复多次')
+    args = parser.parse_args()
+
+    src_dir = args.src_dir or tempfile.mkdtemp(prefix='bench_src_')
+    dst_dir = args.dst_dir or tempfile.mkdtemp(prefix='bench_dst_')
+    if os.stat(src_dir).st_dev == os.stat(dst_dir).st_dev:
+        # 同一设备上两种方式都只是一次 os.replace，测不到复制路径
+        print(f"警告: 源目录 {src_dir} 与目标目录 {dst_dir} 在同一设备上，"
+              f"请用 --src-dir / --dst-dir 指定不同磁盘上的目录", file=sys.stderr)
+        cleanup(args, src_dir, dst_dir)
+        sys.exit(2)
+    print(f"源目录: {src_dir}")
+    print(f"目标目录: {dst_dir}")
+    print(f"{'大小':>6} {'文件数':>6} {'shutil.move MB/s':>18} {'move_file MB/s':>16}")
+
+    for name in args.sizes.split(','):
+        size = SIZES[name.strip()]
+        count = max(1, min(args.total // size, 2000))
+        results = []
+        for label, mover in (('shutil', shutil.move), ('backend', move_file)):
+            elapsed = bench(label, mover, src_dir, dst_dir, size, count)
+            results.append(size * count / elapsed / (1024 * 1024))
+        print(f"{name:>6} {count:>6} {results[0]:>18.1f} {results[1]:>16.1f}")
+
+    cleanup(args, src_dir, dst_dir)
+
+
+def cleanup(args, src_dir, dst_dir):
+    """删除本脚本创建的临时目录，用户指定的目录保留"""
+    if not args.src_dir:
+        shutil.rmtree(src_dir, ignore_errors=True)
+    if not args.dst_dir:
+        shutil.rmtree(dst_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+import os
+import sys
+import time
+import random
+import argparse
+
+# 让基准脚本可以直接导入 Word Processing 下的模块
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(PROJECT_ROOT, 'Word Processing'))
+
+from pattern_matcher import compile_preset
+
+
+def legacy_remove(text, patterns):
+    """旧实现：每个模式做三次 str.replace（原样、反斜杠、正斜杠）"""
+    result = text
+    for pattern in patterns:
+        result = result.replace(pattern, "")
+        result = result.replace(pattern.replace('/', '\\'), "")
+        result = result.replace(pattern.replace('\\', '/'), "")
+    return result
+
+
+def make_preset(count):
+    return [f"C:/Users/dev/project_{i}/src/module_{i % 37}/" for i in range(count)]
+
+
+def make_log(patterns, size_mb, seed=0):
+    """模拟粘贴进来的日志：约一半的行带有预设中的路径前缀，分隔符正反斜杠混用"""
+    rng = random.Random(seed)
+    lines = []
+    total = 0
+    i = 0
+    while total < size_mb * 1024 * 1024:
+        if i % 2:
+            prefix = rng.choice(patterns)
+            if i % 4 == 1:
+                prefix = prefix.replace('/', '\\')
+        else:
+            prefix = "D:/other/place/"
+        line = f"2024-01-01 12:00:{i % 60:02d} INFO {prefix}file_{i}.py:{i % 500} task finished in {i % 97} ms"
+        lines.append(line)
+        total += len(line) + 1
+        i += 1
+    return "\n".join(lines)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='比较逐个 str.replace 与 Aho-Corasick 自动机的删除耗时')
+    parser.add_argument('--patterns', type=int, default=2000, help='预设模式数')
+    parser.add_argument('--size', type=float, default=5, help='输入文本大小（MB）')
+    parser.add_argument('--skip-legacy', action='store_true', help='不运行旧实现（模式很多时非常慢）')
+    args = parser.parse_args()
+
+    patterns = make_preset(args.patterns)
+    text = make_log(patterns, args.size)
+    preset = "\n".join(patterns)
+    print(f"模式数: {len(patterns)}，文本: {len(text) / 1024 / 1024:.1f} MB")
+
+    compile_preset.cache_clear()
+    _, build = timed(compile_preset, preset)
+    remover, cached = timed(compile_preset, preset)
+    (result, removed), scan = timed(remover.remove, text)
+    print(f"{'编译自动机':<20} {build:>10.3f} 秒")
+    print(f"{'命中预设缓存':<20} {cached:>10.6f} 秒")
+    print(f"{'自动机删除':<20} {scan:>10.3f} 秒  ({len(text) / scan / 1e6:.1f} M 字符/秒，删除 {removed} 处)")
+    if not args.skip_legacy:
+        expected, legacy = timed(legacy_remove, text, patterns)
+        print(f"{'逐个 str.replace':<20} {legacy:>10.3f} 秒")
+        print(f"加速: {legacy / (build + scan):.1f}x（含编译），结果{'一致' if expected == result else '不一致'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,364 @@
+import os
+import re
+import fnmatch
+import logging
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import accumulate, compress
+
+logger = logging.getLogger('FileViewer')
+
+_GLOB_CHARS = set('*?[')
+
+
+def time_filter_start(time_filter, now=None):
+    """把 "今天/本周/本月" 转换为起始时间戳，"全部时间" 返回 None"""
+    now = now or datetime.now()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if time_filter == "今天":
+        start = today
+    elif time_filter == "本周":
+        start = today - timedelta(days=today.weekday())
+    elif time_filter == "本月":
+        start = today.replace(day=1)
+    else:
+        return None
+    return start.timestamp()
+
+
+@lru_cache(maxsize=64)
+def _glob_matcher(pattern):
+    """通配符（匹配整个文件名）→ (检查函数, 用于查找候选的最长一段普通字符)
+
+    "*.jpg"、"报告*"、"*草稿*" 这类只有首尾星号的常见写法不经过正则，
+    检查函数为 None 表示候选即结果。
+    """
+    parts = re.split(r'\[!?\]?[^\]]*\]|[*?]', pattern)
+    literal = max(parts, key=len)
+    core = pattern.strip('*')
+    if core and not _GLOB_CHARS & set(core):
+        if pattern.startswith('*') and pattern.endswith('*'):
+            return None, core
+        if pattern.startswith('*'):
+            return (lambda name: name.endswith(core)), core
+        if pattern.endswith('*'):
+            return (lambda name: name.startswith(core)), core
+    return re.compile(fnmatch.translate(pattern)).match, literal
+
+
+class _CategoryView:
+    """一个分类中有效行的行号（升序），以及名称 / 时间筛选用的辅助结构
+
+    名称筛选：该分类的文件名用换行符连接成一个串，子串用 str.find 跳着查找；
+    通配符先用其中最长的一段普通字符找出候选，再对候选逐个完整匹配。
+    时间筛选：在排好序的修改时间上二分查找。
+    辅助结构在第一次用到时建立，目录变化时就地增删，只有受影响的部分需要重建。
+    """
+
+    __slots__ = ("rows", "_names", "_joined", "_starts", "_mtimes", "_sorted_mtimes", "_by_mtime",
+                 "_last_name_query", "_last_since_query")
+
+    def __init__(self, rows):
+        self.rows = rows
+        self._names = self._joined = self._starts = None
+        self._mtimes = self._sorted_mtimes = self._by_mtime = None
+        self._last_name_query = self._last_since_query = None
+
+    def add_row(self, row, name, mtime):
+        # 新行号总是大于已有行号，追加后仍然升序
+        self.rows.append(row)
+        self._last_name_query = self._last_since_query = None
+        if self._names is not None:
+            self._names.append(name)
+            # 连接串下次名称筛选时再重建：逐个追加会为一批新文件反复复制整个串
+            self._joined = self._starts = None
+        if self._mtimes is not None:
+            self._mtimes.append(mtime)
+            insort(self._sorted_mtimes, mtime)
+            self._by_mtime = None
+
+    def remove_row(self, row):
+        position = bisect_left(self.rows, row)
+        if position == len(self.rows) or self.rows[position] != row:
+            return
+        del self.rows[position]
+        self._last_name_query = self._last_since_query = None
+        if self._names is not None:
+            del self._names[position]
+            self._joined = self._starts = None
+        if self._mtimes is not None:
+            mtime = self._mtimes.pop(position)
+            del self._sorted_mtimes[bisect_left(self._sorted_mtimes, mtime)]
+            self._by_mtime = None
+
+    def set_mtime(self, row, mtime):
+        position = bisect_left(self.rows, row)
+        if self._mtimes is not None and position < len(self.rows) and self.rows[position] == row:
+            del self._sorted_mtimes[bisect_left(self._sorted_mtimes, self._mtimes[position])]
+            insort(self._sorted_mtimes, mtime)
+            self._mtimes[position] = mtime
+            self._by_mtime = None
+        self._last_since_query = None
+
+    def _find_all(self, text):
+        """包含 text 的文件名的位置，升序
+
+        命中少时在连接串上用 str.find 跳着查找，命中多时逐个文件名做包含判断。
+        """
+        if self._joined is None:
+            self._joined = '\n'.join(self._names)
+        joined = self._joined
+        if joined.count(text) * 8 > len(self._names):
+            return [p for p, name in enumerate(self._names) if text in name]
+        if self._starts is None:
+            # 每个文件名在连接串中的起始位置，最后一项为串长加一
+            self._starts = list(accumulate((len(name) + 1 for name in self._names), initial=0))
+        starts = self._starts
+        find = joined.find
+        positions = []
+        i = find(text)
+        while i >= 0:
+            p = bisect_right(starts, i) - 1
+            positions.append(p)
+            i = find(text, starts[p + 1])
+        return positions
+
+    def name_positions(self, names_lower, name_filter):
+        """匹配名称条件的位置，升序；含 * ? [ 时按通配符匹配整个文件名，否则按子串匹配
+
+        最近一次的结果保留到该分类发生变化为止，切换时间筛选或其他分类变化时不必重新匹配。
+        """
+        if self._last_name_query is not None and self._last_name_query[0] == name_filter:
+            return self._last_name_query[1]
+        positions = self._match_names(names_lower, name_filter)
+        self._last_name_query = (name_filter, positions)
+        return positions
+
+    def _match_names(self, names_lower, name_filter):
+        if self._names is None:
+            self._names = [names_lower[row] for row in self.rows]
+        if not _GLOB_CHARS & set(name_filter):
+            return self._find_all(name_filter)
+        match, literal = _glob_matcher(name_filter)
+        candidates = self._find_all(literal) if literal else range(len(self._names))
+        if match is None:
+            return list(candidates)
+        names = self._names
+        return [p for p in candidates if match(names[p])]
+
+    def since_positions(self, mtimes, since):
+        """修改时间不早于 since 的位置，升序；与名称筛选一样保留最近一次的结果"""
+        if self._last_since_query is not None and self._last_since_query[0] == since:
+            return self._last_since_query[1]
+        positions = self._match_since(mtimes, since)
+        self._last_since_query = (since, positions)
+        return positions
+
+    def _match_since(self, mtimes, since):
+        # 在排好序的修改时间上二分得到命中数：命中少时取按修改时间排序的位置表末尾一段再排序，
+        # 命中多时直接比较各位置的修改时间，避免对大量位置排序
+        if self._sorted_mtimes is None:
+            self._mtimes = array('d', [mtimes[row] for row in self.rows])
+            self._sorted_mtimes = sorted(self._mtimes)
+        count = len(self._sorted_mtimes) - bisect_left(self._sorted_mtimes, since)
+        if count * 8 < len(self._sorted_mtimes):
+            if self._by_mtime is None:
+                self._by_mtime = sorted(range(len(self._mtimes)), key=self._mtimes.__getitem__)
+            return sorted(self._by_mtime[len(self._by_mtime) - count:])
+        return [p for p, mtime in enumerate(self._mtimes) if mtime >= since]
+
+
+class FolderCatalog:
+    """当前文件夹的内存目录
+
+    文件名、扩展名、分类、大小、修改时间按列存放（array / bytearray），
+    行号一旦分配就不再改变，删除只做标记，便于模型按行号做增量更新。
+    每个分类维护一个 _CategoryView，目录变化时就地增删，不必整体重建；
+    条件不变时重新查询只重算变化的分类。
+    """
+
+    def __init__(self, classifier):
+        # classifier: 共享分类规则编译出的 FileClassifier，只收录能分类的文件
+        self.classifier = classifier
+        self.category_names = list(classifier.categories)
+        self.folder_path = None
+        self._reset()
+
+    def _reset(self):
+        self.paths = []
+        self.names_lower = []
+        self.exts = []
+        self.categories = bytearray()
+        self.sizes = array('q')
+        self.mtimes = array('d')
+        self.alive = bytearray()
+        self._row_of = {}
+        self._views = [_CategoryView([]) for _ in self.category_names]
+
+    def __len__(self):
+        return len(self._row_of)
+
+    def category_of(self, path, size=None):
+        return self.classifier.classify(path, size)
+
+    # ---- 构建与修改 ----
+
+    def snapshot(self, folder_path):
+        """用一次 os.scandir 读取文件夹，返回 {路径: (大小, 修改时间, 分类序号)}，不修改目录，应在后台线程调用
+
+        分类（包括扩展名无法识别时读取文件头）都在这里完成，load / apply_snapshot
+        在界面线程中只按快照里的分类序号填充各列。
+        """
+        files = {}
+        with os.scandir(folder_path) as it:
+            for entry in it:
+                try:
+                    if not entry.is_file():
+                        continue
+                    st = entry.stat()
+                except OSError as e:
+                    logger.debug(f"跳过无法访问的文件 {entry.path}: {str(e)}")
+                    continue
+                files[entry.path] = (st.st_size, st.st_mtime)
+        return self.classify_snapshot(files)
+
+    def classify_snapshot(self, files):
+        """{路径: (大小, 修改时间)} → {路径: (大小, 修改时间, 分类序号)}，只保留能分类的文件"""
+        items = [(path, value[0]) for path, value in files.items()]
+        codes = self.classifier.classify_many(items)
+        return {path: (size, files[path][1], code) for (path, size), code in zip(items, codes) if code is not None}
+
+    def load(self, folder_path, snapshot=None):
+        """使用已分类的快照（没有时当场读取文件夹），按文件名排序后分配行号
+
+        界面中应先在后台线程用 snapshot() 生成快照，见 FolderSnapshotThread。
+        """
+        if snapshot is None:
+            snapshot = self.snapshot(folder_path)
+        self.folder_path = folder_path
+        self._reset()
+        self._extend(snapshot, snapshot)
+        return len(snapshot)
+
+    def apply_snapshot(self, snapshot):
+        """与新的文件夹快照比较并更新目录，返回 (新增行号, 删除行号, 修改行号)
+
+        新文件追加到末尾获得新行号，已有行号保持不变，模型据此做增量更新。
+        """
+        removed = [self.remove(path) for path in [p for p in self._row_of if p not in snapshot]]
+        modified = []
+        new_paths = []
+        for path, (size, mtime, _) in snapshot.items():
+            row = self._row_of.get(path)
+            if row is None:
+                new_paths.append(path)
+            elif self.sizes[row] != size or self.mtimes[row] != mtime:
+                self._set_mtime(row, mtime)
+                self.sizes[row] = size
+                modified.append(row)
+        added = self._extend(new_paths, snapshot)
+        return added, removed, modified
+
+    def _extend(self, paths, snapshot):
+        """按文件名排序后批量追加到各列，返回新分配的行号"""
+        keyed = sorted((os.path.basename(path).lower(), path) for path in paths)
+        start = len(self.paths)
+        names = [name for name, _ in keyed]
+        ordered = [path for _, path in keyed]
+        values = [snapshot[path] for path in ordered]
+        self.paths.extend(ordered)
+        self.names_lower.extend(names)
+        self.exts.extend(os.path.splitext(name)[1] for name in names)
+        self.categories.extend(code for _, _, code in values)
+        self.sizes.extend(size for size, _, _ in values)
+        self.mtimes.extend(mtime for _, mtime, _ in values)
+        self.alive.extend(bytes([1]) * len(ordered))
+        rows = range(start, start + len(ordered))
+        self._row_of.update(zip(ordered, rows))
+        if start == 0:
+            self._build_views()
+        else:
+            for row, name, mtime in zip(rows, names, self.mtimes[start:]):
+                self._views[self.categories[row]].add_row(row, name, mtime)
+        return list(rows)
+
+    def _append(self, path, size, mtime, code):
+        name = os.path.basename(path)
+        row = len(self.paths)
+        self.paths.append(path)
+        self.names_lower.append(name.lower())
+        self.exts.append(os.path.splitext(name)[1].lower())
+        self.categories.append(code)
+        self.sizes.append(size)
+        self.mtimes.append(mtime)
+        self.alive.append(1)
+        self._row_of[path] = row
+        self._views[code].add_row(row, self.names_lower[row], mtime)
+        return row
+
+    def _set_mtime(self, row, mtime):
+        if self.mtimes[row] != mtime:
+            self.mtimes[row] = mtime
+            self._views[self.categories[row]].set_mtime(row, mtime)
+
+    def add(self, path, size, mtime):
+        """新增或更新一个文件，返回行号；无法分类的文件返回 None"""
+        code = self.category_of(path, size)
+        if code is None:
+            return None
+        row = self._row_of.get(path)
+        if row is None:
+            row = self._append(path, size, mtime, code)
+        else:
+            self.sizes[row] = size
+            self._set_mtime(row, mtime)
+        return row
+
+    def remove(self, path):
+        """标记删除，返回原行号"""
+        row = self._row_of.pop(path, None)
+        if row is not None:
+            self.alive[row] = 0
+            self._views[self.categories[row]].remove_row(row)
+        return row
+
+    def row_of(self, path):
+        return self._row_of.get(path)
+
+    # ---- 查询 ----
+
+    def query_by_category(self, name_filter="", since=None):
+        """按分类返回同时满足名称与时间条件的行号 {分类序号: [行号, ...]}，行号升序
+
+        name_filter 不区分大小写；since 为时间戳，只保留修改时间不早于它的文件。
+        """
+        name_filter = name_filter.strip().lower()
+        mtimes = self.mtimes
+        groups = {}
+        for code, view in enumerate(self._views):
+            rows = view.rows
+            if name_filter:
+                rows = [rows[p] for p in view.name_positions(self.names_lower, name_filter)]
+                if since is not None:
+                    rows = [row for row in rows if mtimes[row] >= since]
+            elif since is not None:
+                rows = [rows[p] for p in view.since_positions(mtimes, since)]
+            groups[code] = list(rows)
+        return groups
+
+    def _build_views(self):
+        """目录为空时批量加入文件后按分类拆分有效行，之后随目录的增删改增量维护，查询不再整体重建
+
+        分类列经 bytes.translate 得到每个分类的掩码，再与有效标记按位与，拆分在 C 层完成。
+        """
+        count = len(self.alive)
+        alive = None if self.alive.count(0) == 0 else int.from_bytes(self.alive, 'little')
+        views = []
+        for code in range(len(self.category_names)):
+            mask = self.categories.translate(bytes(int(i == code) for i in range(256)))
+            if alive is not None:
+                mask = (int.from_bytes(mask, 'little') & alive).to_bytes(count, 'little')
+            views.append(_CategoryView(list(compress(range(count), mask))))
+        self._views = views
@@ -2,15 +2,32 @@ import os
 import json
 import logging
 
-# 配置日志
-logging.basicConfig(
-    filename='file_viewer.log',
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger('FileViewer')
 
 class Config:
+    @staticmethod
+    def _load():
+        try:
+            with open("file_viewer_gui.json", "r", encoding="utf-8") as file:
+                config = json.load(file)
+                return config if isinstance(config, dict) else {}
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    @staticmethod
+    def load_library_mode():
+        return bool(Config._load().get("library_mode", False))
+
+    @staticmethod
+    def save_library_mode(enabled):
+        config = Config._load()
+        config["library_mode"] = bool(enabled)
+        try:
+            with open("file_viewer_gui.json", "w", encoding="utf-8") as file:
+                json.dump(config, file, ensure_ascii=False, indent=4)
+        except Exception as e:
+            logger.error(f"保存库模式失败: {str(e)}")
+
     @staticmethod
     def load_last_folder():
         try:
@@ -24,9 +41,9 @@ class Config:
     @staticmethod
     def save_last_folder(folder_path):
         if folder_path:
-            config = {
-                "last_folder": folder_path
-            }
+            # 保留配置文件中的其他设置（如库模式）
+            config = Config._load()
+            config["last_folder"] = folder_path
             try:
                 with open("file_viewer_gui.json", "w", encoding="utf-8") as file:
                     json.dump(config, file, ensure_ascii=False, indent=4)
@@ -0,0 +1,271 @@
+import os
+import logging
+from bisect import bisect_left
+
+from PyQt6.QtWidgets import QListView, QStyledItemDelegate, QStyle, QAbstractItemView
+from PyQt6.QtCore import Qt, QSize, QRect, QEvent, QAbstractListModel, QModelIndex, pyqtSignal
+from PyQt6.QtGui import QFont, QColor, QFontMetrics, QPainter
+
+from thumbnails import THUMBNAIL_SIZE
+
+logger = logging.getLogger('FileViewer')
+
+
+# 增量更新超过这么多段连续区间时改为整体重置，逐段通知反而更慢
+MAX_DIFF_RANGES = 100
+
+
+def _runs(positions):
+    """把升序的位置列表合并为 (first, last) 连续区间"""
+    runs = []
+    for pos in positions:
+        if runs and runs[-1][1] == pos - 1:
+            runs[-1][1] = pos
+        else:
+            runs.append([pos, pos])
+    return runs
+
+
+class FileGridModel(QAbstractListModel):
+    """一个分类标签页的文件模型，只保存目录中的行号（升序），卡片由委托按需绘制"""
+
+    PATH_ROLE = Qt.ItemDataRole.UserRole
+
+    def __init__(self, catalog, thumbnails=None, parent=None):
+        super().__init__(parent)
+        self.catalog = catalog
+        self.thumbnails = thumbnails
+        self._rows = []
+        if thumbnails is not None:
+            thumbnails.thumbnail_ready.connect(self._on_thumbnail_ready)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        path = self.catalog.paths[row]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return os.path.basename(path)
+        if role in (self.PATH_ROLE, Qt.ItemDataRole.ToolTipRole):
+            return path
+        if role == Qt.ItemDataRole.DecorationRole and self.thumbnails is not None:
+            # 只有可见的卡片才会被绘制，缩略图请求因此只针对可见区域；
+            # 缓存键用目录中的大小和修改时间，重绘时不访问文件系统
+            return self.thumbnails.request(path, self.catalog.sizes[row], self.catalog.mtimes[row])
+        return None
+
+    def set_rows(self, rows, reset=False):
+        """更新显示的行号列表
+
+        筛选条件变化时只对新旧结果做差异比较，按连续区间发出行删除 / 插入通知；
+        切换文件夹（行号含义改变）或差异过于零碎时整体重置。
+        """
+        rows = list(rows)
+        old = self._rows
+        if reset or not old or not rows:
+            self._reset_rows(rows)
+            return
+        new_set = set(rows)
+        old_set = set(old)
+        removed = _runs(i for i, row in enumerate(old) if row not in new_set)
+        inserted = _runs(j for j, row in enumerate(rows) if row not in old_set)
+        if len(removed) + len(inserted) > MAX_DIFF_RANGES:
+            self._reset_rows(rows)
+            return
+        # 先从后往前删除，剩下的行保持升序，再按最终位置从前往后插入
+        for first, last in reversed(removed):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self._rows[first:last + 1]
+            self.endRemoveRows()
+        for first, last in inserted:
+            self.beginInsertRows(QModelIndex(), first, last)
+            self._rows[first:first] = rows[first:last + 1]
+            self.endInsertRows()
+
+    def _reset_rows(self, rows):
+        self.beginResetModel()
+        self._rows = rows
+        self.endResetModel()
+
+    def remove_catalog_row(self, row):
+        position = self._position_of(row)
+        if position is None:
+            return
+        self.beginRemoveRows(QModelIndex(), position, position)
+        del self._rows[position]
+        self.endRemoveRows()
+
+    def refresh_catalog_rows(self, rows):
+        """目录中的文件被修改后通知视图重绘对应的卡片（例如重新生成缩略图）"""
+        for row in rows:
+            position = self._position_of(row)
+            if position is not None:
+                index = self.index(position)
+                self.dataChanged.emit(index, index)
+
+    def _position_of(self, row):
+        position = bisect_left(self._rows, row)
+        if position < len(self._rows) and self._rows[position] == row:
+            return position
+        return None
+
+    def _on_thumbnail_ready(self, path, pixmap):
+        row = self.catalog.row_of(path)
+        position = None if row is None else self._position_of(row)
+        if position is not None:
+            index = self.index(position)
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+
+
+class FileCardDelegate(QStyledItemDelegate):
+    """绘制文件卡片，并在委托中对五个操作按钮做点击检测，不为每个文件创建控件"""
+
+    # 点击按钮时发出 (按钮键, 文件路径)
+    action_triggered = pyqtSignal(str, str)
+
+    # (键, 文本, 背景色, 悬停色)
+    BUTTONS = (
+        ("preview", "预览", "#0d47a1", "#1565c0"),
+        ("path", "复制路径", "#dc3545", "#bd2130"),
+        ("html", "复制HTML", "#ff9800", "#f57c00"),
+        ("md", "复制MD链接", "#9c27b0", "#7b1fa2"),
+        ("delete", "删除", "#b71c1c", "#d32f2f"),
+    )
+    MARGIN = 10
+    SPACING = 5
+    NAME_HEIGHT = 22
+    BUTTON_HEIGHT = 28
+    BUTTON_PADDING = 10
+
+    def __init__(self, show_thumbnail=False, placeholder=None, parent=None):
+        super().__init__(parent)
+        self.show_thumbnail = show_thumbnail
+        self.placeholder = placeholder
+        self._hover = None  # (行号, 按钮键)
+        self.name_font = QFont("Microsoft YaHei", 10, QFont.Weight.Bold)
+        self.button_font = QFont("Microsoft YaHei", 9)
+        metrics = QFontMetrics(self.button_font)
+        self._button_widths = [metrics.horizontalAdvance(label) + 2 * self.BUTTON_PADDING
+                               for _, label, _, _ in self.BUTTONS]
+
+    # ---- 布局 ----
+
+    def card_size(self):
+        width = sum(self._button_widths) + self.SPACING * (len(self.BUTTONS) - 1) + 2 * self.MARGIN
+        height = 2 * self.MARGIN + self.NAME_HEIGHT + self.SPACING + self.BUTTON_HEIGHT
+        if self.show_thumbnail:
+            height += THUMBNAIL_SIZE + self.SPACING
+        return QSize(width, height)
+
+    def _name_rect(self, rect):
+        return QRect(rect.left() + self.MARGIN, rect.top() + self.MARGIN,
+                     rect.width() - 2 * self.MARGIN, self.NAME_HEIGHT)
+
+    def _thumbnail_rect(self, rect):
+        top = self._name_rect(rect).bottom() + 1 + self.SPACING
+        return QRect(rect.left() + self.MARGIN, top, rect.width() - 2 * self.MARGIN, THUMBNAIL_SIZE)
+
+    def _button_rects(self, rect):
+        x = rect.left() + self.MARGIN
+        y = rect.bottom() - self.MARGIN - self.BUTTON_HEIGHT + 1
+        rects = []
+        for (key, _, _, _), width in zip(self.BUTTONS, self._button_widths):
+            rects.append((key, QRect(x, y, width, self.BUTTON_HEIGHT)))
+            x += width + self.SPACING
+        return rects
+
+    def _hit_test(self, rect, pos):
+        for key, button_rect in self._button_rects(rect):
+            if button_rect.contains(pos):
+                return key
+        return None
+
+    def sizeHint(self, option, index):
+        return self.card_size()
+
+    # ---- 绘制 ----
+
+    def paint(self, painter, option, index):
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        rect = option.rect.adjusted(0, 0, -1, -1)
+
+        painter.setPen(QColor("#424242"))
+        painter.setBrush(QColor("#1e1e1e"))
+        painter.drawRoundedRect(rect, 5, 5)
+
+        # 文件名
+        name_rect = self._name_rect(rect)
+        painter.setFont(self.name_font)
+        painter.setPen(QColor("#e0e0e0"))
+        name = QFontMetrics(self.name_font).elidedText(
+            index.data(Qt.ItemDataRole.DisplayRole), Qt.TextElideMode.ElideMiddle, name_rect.width())
+        painter.drawText(name_rect, Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft, name)
+
+        # 缩略图，未就绪时绘制占位图
+        if self.show_thumbnail:
+            pixmap = index.data(Qt.ItemDataRole.DecorationRole)
+            if pixmap is None:
+                pixmap = self.placeholder
+            if pixmap is not None and not pixmap.isNull():
+                thumb_rect = self._thumbnail_rect(rect)
+                target = QRect(0, 0, pixmap.width(), pixmap.height())
+                target.moveCenter(thumb_rect.center())
+                painter.drawPixmap(target, pixmap)
+
+        # 操作按钮
+        hovered = self._hover[1] if (self._hover and self._hover[0] == index.row()
+                                     and option.state & QStyle.StateFlag.State_MouseOver) else None
+        painter.setFont(self.button_font)
+        for (key, button_rect), (_, label, color, hover_color) in zip(self._button_rects(rect), self.BUTTONS):
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(QColor(hover_color if key == hovered else color))
+            painter.drawRoundedRect(button_rect, 3, 3)
+            painter.setPen(QColor("white"))
+            painter.drawText(button_rect, Qt.AlignmentFlag.AlignCenter, label)
+        painter.restore()
+
+    # ---- 交互 ----
+
+    def editorEvent(self, event, model, option, index):
+        event_type = event.type()
+        rect = option.rect.adjusted(0, 0, -1, -1)
+        if event_type == QEvent.Type.MouseMove:
+            hover = (index.row(), self._hit_test(rect, event.position().toPoint()))
+            if hover != self._hover:
+                self._hover = hover
+                if option.widget is not None:
+                    option.widget.viewport().update()
+            return False
+        if event_type == QEvent.Type.MouseButtonRelease and event.button() == Qt.MouseButton.LeftButton:
+            key = self._hit_test(rect, event.position().toPoint())
+            if key:
+                self.action_triggered.emit(key, index.data(FileGridModel.PATH_ROLE))
+                return True
+        return False
+
+
+class FileGridView(QListView):
+    """图标模式的卡片网格，只有可见区域的卡片会被绘制"""
+
+    def __init__(self, delegate, parent=None):
+        super().__init__(parent)
+        self.setItemDelegate(delegate)
+        self.setViewMode(QListView.ViewMode.IconMode)
+        self.setResizeMode(QListView.ResizeMode.Adjust)
+        self.setMovement(QListView.Movement.Static)
+        self.setWrapping(True)
+        # 所有卡片尺寸相同，布局时无需逐项计算 sizeHint
+        self.setUniformItemSizes(True)
+        self.setLayoutMode(QListView.LayoutMode.Batched)
+        self.setBatchSize(500)
+        self.setSpacing(5)
+        self.setGridSize(delegate.card_size() + QSize(10, 10))
+        self.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.verticalScrollBar().setSingleStep(20)
+        self.setMouseTracking(True)
+        self.setStyleSheet("QListView { background-color: #121212; border: 1px solid #424242; border-radius: 5px; }")
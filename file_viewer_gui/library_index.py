@@ -0,0 +1,215 @@
+import os
+import stat
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger('FileViewer')
+
+# 库索引数据库，与 file_viewer_gui.json 一样相对当前工作目录
+DEFAULT_LIBRARY_DB = "file_viewer_library.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS roots (
+    path TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    root TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dirs_parent ON dirs(parent);
+CREATE INDEX IF NOT EXISTS dirs_root ON dirs(root);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    dir TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    category INTEGER
+);
+CREATE INDEX IF NOT EXISTS files_dir ON files(dir);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# files.category：分类序号；无法分类为 UNCLASSIFIABLE，NULL 表示尚未分类（旧索引或规则已修改）
+UNCLASSIFIABLE = -1
+# 同步时每批补充分类的文件数
+CLASSIFY_BATCH = 5000
+
+
+class LibraryIndex:
+    """多个根文件夹的递归文件索引（SQLite）
+
+    每个目录记录自己的 mtime：目录中增删、改名文件时 mtime 会变化，
+    因此再次启动时只需 stat 每个目录，mtime 未变的目录直接沿用索引里的文件和子目录，
+    只有变化过的目录才重新 scandir。连接在线程间共享，由锁串行化。
+
+    每个文件的分类在同步时（后台线程）算好并存入索引，打开库时界面线程只读出分类序号，
+    不再对整个库逐个分类；分类规则改变后旧的分类结果在下次同步时重新计算。
+    """
+
+    def __init__(self, db_file=DEFAULT_LIBRARY_DB, classifier=None):
+        self.db_file = db_file
+        self.classifier = classifier
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(files)")}
+        if "category" not in columns:
+            self._conn.execute("ALTER TABLE files ADD COLUMN category INTEGER")
+        if classifier is not None:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'rules'").fetchone()
+            if row is None or row[0] != classifier.fingerprint:
+                self._conn.execute("UPDATE files SET category = NULL")
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('rules', ?)",
+                                   (classifier.fingerprint,))
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ---- 根文件夹 ----
+
+    def roots(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT path FROM roots ORDER BY path")]
+
+    def add_root(self, path):
+        path = os.path.abspath(path)
+        with self._lock:
+            with self._conn:
+                self._conn.execute("INSERT OR IGNORE INTO roots (path) VALUES (?)", (path,))
+        return path
+
+    def remove_root(self, path):
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM files WHERE dir IN (SELECT path FROM dirs WHERE root = ?)", (path,))
+                self._conn.execute("DELETE FROM dirs WHERE root = ?", (path,))
+                self._conn.execute("DELETE FROM roots WHERE path = ?", (path,))
+
+    # ---- 读取 ----
+
+    def load_files(self):
+        """返回索引中已分类的文件 {路径: (大小, 修改时间, 分类序号)}，格式与 FolderCatalog.snapshot 相同"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, size, mtime, category FROM files WHERE category >= 0").fetchall()
+        return {path: (size, mtime, code) for path, size, mtime, code in rows}
+
+    def file_count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    # ---- 与文件系统同步 ----
+
+    def reconcile(self, should_stop=None):
+        """遍历所有根文件夹，只重新扫描 mtime 变化过的目录，返回重新扫描的目录数"""
+        with self._lock:
+            known = {}
+            children = {}
+            for path, parent, mtime_ns in self._conn.execute("SELECT path, parent, mtime_ns FROM dirs"):
+                known[path] = mtime_ns
+                children.setdefault(parent, []).append(path)
+        seen = set()
+        rescanned = 0
+
+        for root in self.roots():
+            stack = [(root, None)]
+            while stack:
+                if should_stop and should_stop():
+                    return rescanned
+                path, parent = stack.pop()
+                if path in seen:
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if not stat.S_ISDIR(st.st_mode):
+                    continue
+                seen.add(path)
+                if known.get(path) == st.st_mtime_ns:
+                    stack.extend((child, path) for child in children.get(path, ()))
+                    continue
+                subdirs = self._rescan_dir(path, parent, root, st.st_mtime_ns)
+                if subdirs is None:
+                    continue
+                stack.extend((child, path) for child in subdirs)
+                rescanned += 1
+
+        gone = [path for path in known if path not in seen]
+        if gone:
+            with self._lock:
+                with self._conn:
+                    self._conn.executemany("DELETE FROM files WHERE dir = ?", ((path,) for path in gone))
+                    self._conn.executemany("DELETE FROM dirs WHERE path = ?", ((path,) for path in gone))
+        classified = self._classify_pending(should_stop)
+        if rescanned or gone or classified:
+            logger.info(f"库索引同步完成: 重新扫描 {rescanned} 个目录，移除 {len(gone)} 个目录，"
+                        f"补充分类 {classified} 个文件")
+        return rescanned + len(gone) + classified
+
+    def _classify(self, items):
+        """items 为 (路径, 大小)，返回对应的 category 列值"""
+        codes = self.classifier.classify_many(items)
+        return [UNCLASSIFIABLE if code is None else code for code in codes]
+
+    def _classify_pending(self, should_stop=None):
+        """为尚未分类的文件（旧索引、规则修改后）补充分类，返回处理的文件数"""
+        if self.classifier is None:
+            return 0
+        total = 0
+        while not (should_stop and should_stop()):
+            with self._lock:
+                items = self._conn.execute(
+                    "SELECT path, size FROM files WHERE category IS NULL LIMIT ?", (CLASSIFY_BATCH,)).fetchall()
+            if not items:
+                break
+            codes = self._classify(items)
+            with self._lock:
+                with self._conn:
+                    self._conn.executemany("UPDATE files SET category = ? WHERE path = ?",
+                                           ((code, path) for (path, _), code in zip(items, codes)))
+            total += len(items)
+        return total
+
+    def _rescan_dir(self, path, parent, root, mtime_ns):
+        files = []
+        subdirs = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.is_file():
+                            st = entry.stat()
+                            files.append((entry.path, path, st.st_size, st.st_mtime))
+                    except OSError as e:
+                        logger.debug(f"跳过无法访问的条目 {entry.path}: {str(e)}")
+        except OSError as e:
+            logger.warning(f"无法读取目录 {path}: {str(e)}")
+            return None
+        if self.classifier is not None and files:
+            codes = self._classify([(file[0], file[2]) for file in files])
+            files = [file + (code,) for file, code in zip(files, codes)]
+        else:
+            files = [file + (None,) for file in files]
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM files WHERE dir = ?", (path,))
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO files (path, dir, size, mtime, category) VALUES (?, ?, ?, ?, ?)",
+                    files)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO dirs (path, parent, root, mtime_ns) VALUES (?, ?, ?, ?)",
+                    (path, parent, root, mtime_ns))
+        return subdirs
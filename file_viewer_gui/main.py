@@ -1,8 +1,15 @@
+import os
 import sys
 from PyQt6.QtWidgets import QApplication
+
+# 两个程序共用的分类规则模块
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
 from ui_components import FileViewerApp
+from log_setup import setup_logging
 
 def main():
+    # 日志经队列由后台线程写入程序目录下的轮转文件
+    setup_logging(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'file_viewer.log'))
     app = QApplication(sys.argv)
     window = FileViewerApp()
     window.show()
@@ -0,0 +1,88 @@
+import os
+import sys
+import random
+import fnmatch
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'shared'))
+
+from file_rules import FileClassifier
+from catalog import FolderCatalog
+
+EXTENSIONS = ['.jpg', '.png', '.mp4', '.mp3', '.pdf', '.docx', '.zip']
+FILTERS = ["", "a", "ab", "b_1", ".jpg", "*.jpg", "a*", "*b*", "a?_*", "*_[12]*", "[!a]*", "*.[jp]*", "zz"]
+
+
+def random_name(rng):
+    stem = ''.join(rng.choice('abAB_12') for _ in range(rng.randint(1, 6)))
+    return stem + rng.choice(EXTENSIONS)
+
+
+def expected(catalog, name_filter, since):
+    """逐行检查的参考实现"""
+    name_filter = name_filter.strip().lower()
+    groups = {code: [] for code in range(len(catalog.category_names))}
+    for path, row in catalog._row_of.items():
+        name = catalog.names_lower[row]
+        if name_filter:
+            if any(c in name_filter for c in '*?['):
+                if not fnmatch.fnmatchcase(name, name_filter):
+                    continue
+            elif name_filter not in name:
+                continue
+        if since is not None and catalog.mtimes[row] < since:
+            continue
+        groups[catalog.categories[row]].append(row)
+    return {code: sorted(rows) for code, rows in groups.items()}
+
+
+class FolderCatalogQueryTest(unittest.TestCase):
+    def setUp(self):
+        self.rng = random.Random(11)
+        self.catalog = FolderCatalog(FileClassifier())
+
+    def random_snapshot(self, count):
+        files = {f"/data/d{i % 3}/{random_name(self.rng)}": (i, float(self.rng.randint(0, 100)))
+                 for i in range(count)}
+        return self.catalog.classify_snapshot(files)
+
+    def check_all(self):
+        for name_filter in FILTERS:
+            for since in (None, 0.0, 30.0, 95.0, 101.0):
+                self.assertEqual(self.catalog.query_by_category(name_filter, since),
+                                 expected(self.catalog, name_filter, since), (name_filter, since))
+
+    def test_query_matches_reference(self):
+        self.catalog.load("/data", self.random_snapshot(400))
+        self.check_all()
+
+    def test_incremental_changes(self):
+        snapshot = self.random_snapshot(300)
+        self.catalog.load("/data", snapshot)
+        # 先查询一遍让各分类建立辅助结构和缓存，再验证增删改后结果仍然正确
+        self.check_all()
+        for _ in range(5):
+            paths = list(snapshot)
+            for path in self.rng.sample(paths, 20):
+                del snapshot[path]
+            for path in self.rng.sample(list(snapshot), 20):
+                size, _, code = snapshot[path]
+                snapshot[path] = (size + 1, float(self.rng.randint(0, 100)), code)
+            snapshot.update(self.random_snapshot(20))
+            self.catalog.apply_snapshot(snapshot)
+            self.check_all()
+
+        self.catalog.remove(next(iter(snapshot)))
+        self.catalog.add("/data/new/a_1.jpg", 5, 99.0)
+        self.catalog.add(next(iter(self.catalog._row_of)), 7, 100.0)
+        self.check_all()
+
+    def test_add_to_empty_catalog(self):
+        self.assertEqual(self.catalog.query_by_category("a"), expected(self.catalog, "a", None))
+        self.catalog.add("/data/a.jpg", 1, 1.0)
+        self.check_all()
+
+
+if __name__ == '__main__':
+    unittest.main()
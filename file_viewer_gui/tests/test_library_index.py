@@ -0,0 +1,100 @@
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'shared'))
+
+from file_rules import FileClassifier, DEFAULT_RULES
+from library_index import LibraryIndex
+from catalog import FolderCatalog
+
+
+def touch(path, data=b''):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+class CountingClassifier(FileClassifier):
+    """记录分类调用次数，确认界面线程上的操作不再分类"""
+
+    def __init__(self, rules=None):
+        super().__init__(rules)
+        self.calls = 0
+
+    def classify_many(self, items):
+        items = list(items)
+        self.calls += len(items)
+        return super().classify_many(items)
+
+
+class LibraryIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix='library_index_')
+        self.root = os.path.join(self.folder, 'root')
+        self.db_file = os.path.join(self.folder, 'library.db')
+        touch(os.path.join(self.root, 'a.jpg'))
+        touch(os.path.join(self.root, 'sub', 'b.pdf'))
+        touch(os.path.join(self.root, 'sub', 'notes.unknownext'), b'plain text')
+        # 没有扩展名但内容是 PNG
+        touch(os.path.join(self.root, 'sub', 'picture'), b'\x89PNG\r\n\x1a\n' + b'\0' * 32)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def open_index(self, classifier):
+        index = LibraryIndex(self.db_file, classifier)
+        self.addCleanup(index.close)
+        return index
+
+    def test_categories_are_stored_during_sync(self):
+        classifier = CountingClassifier()
+        index = self.open_index(classifier)
+        index.add_root(self.root)
+        self.assertGreater(index.reconcile(), 0)
+
+        files = index.load_files()
+        names = {os.path.basename(path): value[2] for path, value in files.items()}
+        images = classifier.code_of_folder("images")
+        self.assertEqual(names, {"a.jpg": images, "b.pdf": classifier.code_of_folder("documents"),
+                                 "picture": images})
+
+        # 打开库（load）和无变化的同步（apply_snapshot）都不再分类
+        catalog = FolderCatalog(classifier)
+        classifier.calls = 0
+        catalog.load("库", files)
+        self.assertEqual(catalog.apply_snapshot(index.load_files()), ([], [], []))
+        self.assertEqual(classifier.calls, 0)
+        self.assertEqual(index.reconcile(), 0)
+
+    def test_rules_change_reclassifies(self):
+        index = self.open_index(FileClassifier())
+        index.add_root(self.root)
+        index.reconcile()
+        index.close()
+
+        rules = {"categories": [{"name": "未知", "folder": "unknown", "extensions": [".unknownext"]}]}
+        index = self.open_index(FileClassifier(rules))
+        self.assertEqual(index.load_files(), {})
+        self.assertEqual(index.reconcile(), 4)
+        self.assertEqual([os.path.basename(path) for path in index.load_files()], ["notes.unknownext"])
+
+    def test_old_index_without_category_column(self):
+        conn = sqlite3.connect(self.db_file)
+        conn.executescript("""
+            CREATE TABLE files (path TEXT PRIMARY KEY, dir TEXT NOT NULL, size INTEGER NOT NULL, mtime REAL NOT NULL);
+            INSERT INTO files VALUES ('/old/x.jpg', '/old', 1, 2.0);
+        """)
+        conn.close()
+        index = self.open_index(FileClassifier(DEFAULT_RULES))
+        self.assertEqual(index.load_files(), {})
+        index.reconcile()
+        self.assertEqual(index.load_files(), {'/old/x.jpg': (1, 2.0, 0)})
+
+
+if __name__ == '__main__':
+    unittest.main()
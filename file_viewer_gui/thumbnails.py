@@ -0,0 +1,164 @@
+import os
+import hashlib
+import logging
+from collections import OrderedDict
+
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, QThread, QSize, pyqtSignal
+from PyQt6.QtGui import QImage, QImageReader, QPixmap, QColor, QPainter, QFont
+
+logger = logging.getLogger('FileViewer')
+
+# 缩略图边长（像素）
+THUMBNAIL_SIZE = 120
+# 内存中最多保留的缩略图数量，约 120*120*4 字节一张
+MEMORY_CACHE_SIZE = 500
+# 磁盘缓存目录，与 file_viewer_gui.json 一样相对当前工作目录
+DISK_CACHE_DIR = "thumbnail_cache"
+
+
+def thumbnail_key(file_path, size, mtime):
+    """以 路径 + 修改时间 + 大小 作为缓存键，文件变化后旧缩略图自动失效
+
+    大小和修改时间取自目录中已有的列，绘制卡片时不再访问文件系统。
+    """
+    return f"{os.path.abspath(file_path)}|{mtime!r}|{size}|{THUMBNAIL_SIZE}"
+
+
+def scaled_size(size, box=THUMBNAIL_SIZE):
+    """按比例缩放到 box 以内，小图不放大"""
+    width, height = size.width(), size.height()
+    if width <= 0 or height <= 0:
+        return QSize(box, box)
+    if width <= box and height <= box:
+        return QSize(width, height)
+    ratio = min(box / width, box / height)
+    return QSize(max(1, round(width * ratio)), max(1, round(height * ratio)))
+
+
+def decode_thumbnail(file_path, box=THUMBNAIL_SIZE):
+    """只解码缩小后的图像：JPEG 等格式由解码器直接按比例降采样，不会展开整张原图"""
+    reader = QImageReader(file_path)
+    reader.setAutoTransform(True)
+    original = reader.size()
+    if original.isValid():
+        reader.setScaledSize(scaled_size(original, box))
+    image = reader.read()
+    if image.isNull():
+        raise OSError(reader.errorString())
+    # 部分格式不支持 setScaledSize，此时再缩放一次
+    if image.width() > box or image.height() > box:
+        image = image.scaled(box, box, Qt.AspectRatioMode.KeepAspectRatio,
+                             Qt.TransformationMode.SmoothTransformation)
+    return image
+
+
+class _TaskSignals(QObject):
+    # (文件路径, 缓存键, QImage 或 None)
+    finished = pyqtSignal(str, str, object)
+
+
+class ThumbnailTask(QRunnable):
+    """在线程池中读取磁盘缓存或解码图片，只产出 QImage（QPixmap 只能在界面线程创建）"""
+
+    def __init__(self, file_path, key, cache_dir, signals):
+        super().__init__()
+        self.file_path = file_path
+        self.key = key
+        self.cache_dir = cache_dir
+        self.signals = signals
+
+    def run(self):
+        image = None
+        cache_file = None
+        if self.cache_dir:
+            digest = hashlib.sha1(self.key.encode('utf-8')).hexdigest()
+            cache_file = os.path.join(self.cache_dir, digest[:2], digest + ".png")
+            if os.path.exists(cache_file):
+                image = QImage(cache_file)
+                if image.isNull():
+                    image = None
+        if image is None:
+            try:
+                image = decode_thumbnail(self.file_path)
+            except Exception as e:
+                logger.error(f"无法加载缩略图 {self.file_path}: {str(e)}")
+                self.signals.finished.emit(self.file_path, self.key, None)
+                return
+            if cache_file:
+                self._save(image, cache_file)
+        self.signals.finished.emit(self.file_path, self.key, image)
+
+    @staticmethod
+    def _save(image, cache_file):
+        # 先写临时文件再替换，避免其他进程读到写了一半的缓存
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            tmp_file = f"{cache_file}.{os.getpid()}.{id(image)}.tmp"
+            if image.save(tmp_file, "PNG"):
+                os.replace(tmp_file, cache_file)
+        except OSError as e:
+            logger.warning(f"写入缩略图缓存失败: {str(e)}")
+
+
+class ThumbnailService(QObject):
+    """缩略图服务：线程池解码 + 内存 LRU + 磁盘缓存
+
+    request() 命中内存缓存时直接返回 QPixmap，否则返回 None 并在后台生成，
+    完成后发出 thumbnail_ready(路径, QPixmap)。文件的大小和修改时间由调用方从目录中传入。
+    """
+
+    thumbnail_ready = pyqtSignal(str, QPixmap)
+
+    def __init__(self, parent=None, cache_dir=DISK_CACHE_DIR, memory_size=MEMORY_CACHE_SIZE):
+        super().__init__(parent)
+        self.cache_dir = cache_dir
+        self.memory_size = memory_size
+        self._memory = OrderedDict()  # 缓存键 -> QPixmap
+        self._pending = set()  # 正在生成的缓存键
+        self._failed = set()  # 无法解码的缓存键，不再重复尝试
+        self._placeholder = None
+
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(1, min(4, QThread.idealThreadCount())))
+        self._signals = _TaskSignals()
+        self._signals.finished.connect(self._on_task_finished)
+
+    def request(self, file_path, size, mtime):
+        key = thumbnail_key(file_path, size, mtime)
+        pixmap = self._memory.get(key)
+        if pixmap is not None:
+            self._memory.move_to_end(key)
+            return pixmap
+        if key not in self._pending and key not in self._failed:
+            self._pending.add(key)
+            self.pool.start(ThumbnailTask(file_path, key, self.cache_dir, self._signals))
+        return None
+
+    def cancel_pending(self):
+        """切换文件夹时调用：丢弃尚未开始的解码任务"""
+        self.pool.clear()
+        self._pending.clear()
+
+    def placeholder(self):
+        if self._placeholder is None:
+            pixmap = QPixmap(THUMBNAIL_SIZE, THUMBNAIL_SIZE)
+            pixmap.fill(QColor("#2a2a2a"))
+            painter = QPainter(pixmap)
+            painter.setPen(QColor("#757575"))
+            painter.setFont(QFont("Microsoft YaHei", 9))
+            painter.drawText(pixmap.rect(), Qt.AlignmentFlag.AlignCenter, "加载中…")
+            painter.end()
+            self._placeholder = pixmap
+        return self._placeholder
+
+    def _on_task_finished(self, file_path, key, image):
+        self._pending.discard(key)
+        if image is None:
+            self._failed.add(key)
+            return
+        pixmap = QPixmap.fromImage(image)
+        self._memory[key] = pixmap
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+        self.thumbnail_ready.emit(file_path, pixmap)
@@ -1,33 +1,20 @@
-import os
-from datetime import datetime, timedelta
-
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
     QPushButton, QFileDialog, QFrame, QComboBox, QLineEdit, 
-    QTabWidget, QScrollArea, QMessageBox, QStatusBar
+    QTabWidget, QMessageBox, QStatusBar
 )
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtGui import QFont, QColor, QPalette
 
 from config import Config
 from file_operations import FileOperations
+from thumbnails import ThumbnailService
+from file_grid import FileGridModel, FileCardDelegate, FileGridView
+from catalog import FolderCatalog, time_filter_start
+from watcher import FolderWatcher, FolderSnapshotThread, LibrarySyncThread
+from library_index import LibraryIndex
+from file_rules import get_classifier
 
-# 文件分类映射
-FILE_CATEGORIES = {
-    "图像": ['.jpg', '.jpeg', '.png', '.gif'],
-    "视频": ['.mp4', '.avi', '.mkv'],
-    "音频": ['.mp3', '.wav', '.aac', '.flac'],
-    "HTML": ['.html', '.htm'],
-    "文档": ['.txt', '.pdf', '.docx', '.doc', '.wps', '.xls', '.xlsx', '.csv', '.pptx', '.ppt', '.epub', '.mobi', '.azw3']
-}
-
-EN_CATEGORY_MAP = {
-    "图像": "images",
-    "视频": "videos",
-    "音频": "audios",
-    "HTML": "htmls",
-    "文档": "documents"
-}
 
 class FileViewerApp(QMainWindow):
     def __init__(self):
@@ -41,6 +28,31 @@ class FileViewerApp(QMainWindow):
         self.name_filter = ""
         self.last_folder = None
 
+        # 缩略图在线程池中解码，并缓存到内存和磁盘
+        self.thumbnails = ThumbnailService(self)
+
+        # 当前文件夹的内存目录，筛选在目录上查询，不再重新读取文件夹
+        self.catalog = FolderCatalog(get_classifier())
+
+        # 监视当前文件夹，新增 / 删除 / 修改的文件增量更新到目录和各标签页
+        self.folder_watcher = FolderWatcher(self.catalog, self)
+        self.folder_watcher.catalog_changed.connect(self.on_catalog_changed)
+
+        # 打开文件夹时在后台扫描和分类，界面线程只填充目录；loading_folder 为最近一次请求打开的文件夹
+        self.load_thread = None
+        self.loading_folder = None
+
+        # 库模式：多个根文件夹递归索引到 SQLite，打开时直接读取索引，再在后台与文件系统同步
+        self.library = LibraryIndex(classifier=self.catalog.classifier)
+        self.library_mode = False
+        self.library_thread = None
+
+        # 名称筛选防抖，输入停顿后再查询
+        self.name_filter_timer = QTimer(self)
+        self.name_filter_timer.setSingleShot(True)
+        self.name_filter_timer.setInterval(200)
+        self.name_filter_timer.timeout.connect(self.apply_filters)
+
         # 创建主部件和布局
         self.central_widget = QWidget()
         self.setCentralWidget(self.central_widget)
@@ -78,6 +90,10 @@ class FileViewerApp(QMainWindow):
         self.setStatusBar(self.status_bar)
         self.update_status_bar()
 
+        # 上次退出时处于库模式则直接打开库
+        if Config.load_library_mode():
+            self.open_library()
+
     def create_title(self):
         # 标题
         title_label = QLabel("文件查看器")
@@ -180,6 +196,39 @@ class FileViewerApp(QMainWindow):
         self.remember_path_button.clicked.connect(self.remember_current_path)
         button_layout.addWidget(self.remember_path_button)
 
+        # 库模式按钮
+        self.add_library_button = QPushButton("添加到库")
+        self.add_library_button.setFont(QFont("Microsoft YaHei", 10))
+        self.add_library_button.setStyleSheet("""
+            QPushButton {
+                background-color: #6c757d;
+                color: white;
+                padding: 8px 15px;
+                border-radius: 4px;
+            }
+            QPushButton:hover {
+                background-color: #5a6268;
+            }
+        """)
+        self.add_library_button.clicked.connect(self.add_library_folder)
+        button_layout.addWidget(self.add_library_button)
+
+        self.open_library_button = QPushButton("打开库")
+        self.open_library_button.setFont(QFont("Microsoft YaHei", 10))
+        self.open_library_button.setStyleSheet("""
+            QPushButton {
+                background-color: #9c27b0;
+                color: white;
+                padding: 8px 15px;
+                border-radius: 4px;
+            }
+            QPushButton:hover {
+                background-color: #7b1fa2;
+            }
+        """)
+        self.open_library_button.clicked.connect(self.open_library)
+        button_layout.addWidget(self.open_library_button)
+
         path_layout.addLayout(button_layout)
 
         # 路径标签
@@ -217,27 +266,24 @@ class FileViewerApp(QMainWindow):
             }
         """)
 
-        # 创建分类标签页
+        # 创建分类标签页：每个标签页是一个模型 + 卡片网格视图，只绘制可见的卡片
         self.tabs = {}
-        self.scroll_areas = {}
-
-        for category in FILE_CATEGORIES.keys():
-            # 创建滚动区域
-            scroll_area = QScrollArea()
-            scroll_area.setWidgetResizable(True)
-            scroll_area.setStyleSheet("background-color: #121212; border: 1px solid #424242; border-radius: 5px;")
-
-            # 创建内容框架
-            content_frame = QFrame()
-            content_frame.setStyleSheet("background-color: #121212;")
-            content_layout = QVBoxLayout(content_frame)
-            content_layout.setSpacing(10)
-
-            scroll_area.setWidget(content_frame)
-            self.notebook.addTab(scroll_area, category)
-
-            self.tabs[category] = content_layout
-            self.scroll_areas[category] = scroll_area
+        self.views = {}
+
+        classifier = self.catalog.classifier
+        for category, folder in zip(classifier.categories, classifier.folders):
+            show_thumbnail = folder == "images"
+            model = FileGridModel(self.catalog, self.thumbnails if show_thumbnail else None, self)
+            delegate = FileCardDelegate(show_thumbnail,
+                                        self.thumbnails.placeholder() if show_thumbnail else None, self)
+            delegate.action_triggered.connect(
+                lambda key, path, model=model: self.on_card_action(model, key, path))
+            view = FileGridView(delegate)
+            view.setModel(model)
+            self.notebook.addTab(view, category)
+
+            self.tabs[category] = model
+            self.views[category] = view
 
         self.main_layout.addWidget(self.notebook)
         
@@ -248,55 +294,130 @@ class FileViewerApp(QMainWindow):
         Config.save_last_folder(self.last_folder)
 
     def display_folder_contents(self, folder_path):
-        # 清空每个标签页
-        for layout in self.tabs.values():
-            while layout.count() > 0:
-                item = layout.takeAt(0)
-                widget = item.widget()
-                if widget:
-                    layout.removeWidget(widget)
-                    widget.hide()
-
-        # 文件分类
-        categorized_files = {category: [] for category in FILE_CATEGORIES}
-
-        try:
-            file_count = 0
-            for item in os.listdir(folder_path):
-                item_path = os.path.join(folder_path, item)
-                if os.path.isfile(item_path):
-                    ext = os.path.splitext(item)[1].lower()
-                    for category, extensions in FILE_CATEGORIES.items():
-                        if ext in extensions:
-                            categorized_files[category].append(item_path)
-                            file_count += 1
-                            break
-            print(f"已加载 {file_count} 个文件")
-        except Exception as e:
-            print(f"读取文件夹内容失败: {str(e)}")
-            QMessageBox.critical(self, "错误", f"无法读取文件夹内容: {str(e)}")
+        # 丢弃上一次尚未完成的缩略图任务
+        self.thumbnails.cancel_pending()
+        self.stop_library_sync()
+        self.folder_watcher.stop()
+
+        self.loading_folder = folder_path
+        self.status_bar.showMessage(f"正在读取文件夹: {folder_path}")
+        if self.load_thread is not None and self.load_thread.isRunning():
+            # 上一个文件夹还在后台读取，读完后丢弃其结果再读取这个文件夹
             return
+        self.start_folder_load()
+
+    def start_folder_load(self):
+        self.load_thread = FolderSnapshotThread(self.catalog, self.loading_folder)
+        self.load_thread.snapshot_ready.connect(self.on_folder_loaded)
+        self.load_thread.start()
+
+    def on_folder_loaded(self, folder_path, snapshot):
+        if folder_path != self.loading_folder:
+            # 读取期间切换到了其他文件夹或库
+            if self.loading_folder is not None:
+                self.start_folder_load()
+            return
+        self.loading_folder = None
+        if snapshot is None:
+            print(f"读取文件夹内容失败: {self.load_thread.error}")
+            self.status_bar.showMessage("就绪")
+            QMessageBox.critical(self, "错误", f"无法读取文件夹内容: {self.load_thread.error}")
+            return
+
+        file_count = self.catalog.load(folder_path, snapshot)
+        print(f"已加载 {file_count} 个文件")
+        self.folder_watcher.watch(folder_path)
 
-        # 显示分类内容
-        for category, files in categorized_files.items():
-            if files:
-                layout = self.tabs[category]
-                for file_path in files:
-                    FileOperations.display_file(file_path, layout)
+        # 行号已对应新的文件夹，各标签页整体重置
+        self.apply_filters(reset=True)
+
+    def apply_filters(self, reset=False):
+        """在内存目录上执行时间和名称筛选，并增量更新各标签页"""
+        since = time_filter_start(self.time_filter)
+        groups = self.catalog.query_by_category(self.name_filter, since)
+        shown = 0
+        for code, category in enumerate(self.catalog.category_names):
+            self.tabs[category].set_rows(groups[code], reset=reset)
+            shown += len(groups[code])
+        if hasattr(self, 'status_bar'):
+            self.status_bar.showMessage(f"显示 {shown} / {len(self.catalog)} 个文件")
+
+    # ---- 库模式 ----
+
+    def add_library_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "选择要加入库的文件夹", self.last_folder or "")
+        if folder:
+            self.library.add_root(folder)
+            self.open_library()
+
+    def open_library(self):
+        roots = self.library.roots()
+        if not roots:
+            QMessageBox.warning(self, "警告", "库中还没有文件夹，请先点击\"添加到库\"")
+            return
+        self.thumbnails.cancel_pending()
+        self.folder_watcher.stop()
+        self.stop_library_sync()
+        self.loading_folder = None
+        self.library_mode = True
+        Config.save_library_mode(True)
+
+        # 先用索引中的内容立即显示，再在后台与文件系统同步
+        file_count = self.catalog.load("库", self.library.load_files())
+        print(f"已从库索引加载 {file_count} 个文件")
+        self.apply_filters(reset=True)
+        self.update_path_label()
+
+        self.library_thread = LibrarySyncThread(self.library)
+        self.library_thread.synced.connect(self.on_library_synced)
+        self.library_thread.start()
+
+    def on_library_synced(self, changed, snapshot):
+        if not self.library_mode or snapshot is None:
+            return
+        added, removed, modified = self.catalog.apply_snapshot(snapshot)
+        if added or removed or modified:
+            self.on_catalog_changed(added, removed, modified)
+
+    def stop_library_sync(self):
+        if self.library_thread is not None and self.library_thread.isRunning():
+            self.library_thread.requestInterruption()
+            self.library_thread.wait()
+        self.library_thread = None
+
+    def on_catalog_changed(self, added, removed, modified):
+        # 新增和删除通过重新筛选后的差异比较体现为行插入 / 删除
+        self.apply_filters()
+        if modified:
+            for model in self.tabs.values():
+                model.refresh_catalog_rows(modified)
+
+    def on_card_action(self, model, key, file_path):
+        if key == "preview":
+            FileOperations.preview_file(file_path)
+        elif key == "path":
+            FileOperations.copy_to_clipboard(file_path)
+        elif key == "html":
+            FileOperations.copy_html_code(file_path)
+        elif key == "md":
+            FileOperations.copy_md_link(file_path)
+        elif key == "delete":
+            if FileOperations.delete_file(file_path):
+                model.remove_catalog_row(self.catalog.remove(file_path))
 
     def on_time_filter_changed(self, text):
         self.time_filter = text
-        if self.last_folder:
-            self.display_folder_contents(self.last_folder)
+        self.apply_filters()
 
     def on_name_filter_changed(self, text):
         self.name_filter = text
-        if self.last_folder:
-            self.display_folder_contents(self.last_folder)
+        self.name_filter_timer.start()
 
     def select_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "选择文件夹")
         if folder:
+            self.library_mode = False
+            Config.save_library_mode(False)
             self.last_folder = folder
             self.save_last_folder()
             self.update_path_label()
@@ -310,7 +431,9 @@ class FileViewerApp(QMainWindow):
             QMessageBox.warning(self, "警告", "请先选择一个文件夹")
 
     def update_path_label(self):
-        if self.last_folder:
+        if self.library_mode:
+            self.path_label.setText(f"当前路径: 库 ({'; '.join(self.library.roots())})")
+        elif self.last_folder:
             self.path_label.setText(f"当前路径: {self.last_folder}")
         else:
             self.path_label.setText("当前路径: 未选择文件夹")
@@ -318,6 +441,16 @@ class FileViewerApp(QMainWindow):
     def update_status_bar(self):
         self.status_bar.showMessage("就绪")
 
+    def closeEvent(self, event):
+        self.loading_folder = None
+        if self.load_thread is not None:
+            self.load_thread.wait()
+        self.folder_watcher.close()
+        self.stop_library_sync()
+        self.library.close()
+        self.thumbnails.cancel_pending()
+        super().closeEvent(event)
+
     def apply_dark_theme(self):
         palette = QPalette()
         palette.setColor(QPalette.ColorRole.Window, QColor(30, 30, 30))
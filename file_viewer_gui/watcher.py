@@ -0,0 +1,130 @@
+import logging
+
+from PyQt6.QtCore import QObject, QThread, QTimer, QFileSystemWatcher, pyqtSignal
+
+logger = logging.getLogger('FileViewer')
+
+# 目录变化后等待的合并窗口（毫秒），窗口内的所有事件只触发一次重新扫描
+DEBOUNCE_MS = 300
+
+
+class FolderSnapshotThread(QThread):
+    """在后台线程中扫描并分类文件夹，生成 {路径: (大小, 修改时间, 分类序号)} 快照"""
+
+    snapshot_ready = pyqtSignal(str, object)
+
+    def __init__(self, catalog, folder_path):
+        super().__init__()
+        self.catalog = catalog
+        self.folder_path = folder_path
+        self.error = None  # 扫描失败时的错误信息，此时快照为 None
+
+    def run(self):
+        try:
+            snapshot = self.catalog.snapshot(self.folder_path)
+        except OSError as e:
+            logger.warning(f"扫描文件夹失败 {self.folder_path}: {str(e)}")
+            self.error = str(e)
+            snapshot = None
+        self.snapshot_ready.emit(self.folder_path, snapshot)
+
+
+class LibrarySyncThread(QThread):
+    """在后台把库索引与文件系统同步，完成后读出最新的文件列表"""
+
+    # (重新扫描的目录数, {路径: (大小, 修改时间, 分类序号)})
+    synced = pyqtSignal(int, object)
+
+    def __init__(self, library):
+        super().__init__()
+        self.library = library
+
+    def run(self):
+        try:
+            changed = self.library.reconcile(self.isInterruptionRequested)
+            snapshot = self.library.load_files() if changed else None
+        except Exception as e:
+            logger.error(f"同步库索引失败: {str(e)}")
+            changed, snapshot = 0, None
+        if not self.isInterruptionRequested():
+            self.synced.emit(changed, snapshot)
+
+
+class FolderWatcher(QObject):
+    """监视当前文件夹，把变化合并后增量写入目录
+
+    QFileSystemWatcher 只报告"目录变了"，因此在防抖窗口结束时于后台重新扫描一次，
+    再与目录做差异比较。窗口从第一个事件开始计时且不会被后续事件推迟，
+    一次性移入上千个文件时也只会扫描少数几次，不会一直等不到刷新。
+    """
+
+    # (新增行号, 删除行号, 修改行号)
+    catalog_changed = pyqtSignal(list, list, list)
+
+    def __init__(self, catalog, parent=None):
+        super().__init__(parent)
+        self.catalog = catalog
+        self.folder_path = None
+        self._thread = None
+        self._rescan_again = False
+
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self._on_directory_changed)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(DEBOUNCE_MS)
+        self.timer.timeout.connect(self._rescan)
+
+    def watch(self, folder_path):
+        self.stop()
+        self.folder_path = folder_path
+        if not self.watcher.addPath(folder_path):
+            logger.warning(f"无法监视文件夹: {folder_path}")
+
+    def stop(self):
+        directories = self.watcher.directories()
+        if directories:
+            self.watcher.removePaths(directories)
+        self.timer.stop()
+        self.folder_path = None
+        self._rescan_again = False
+
+    def close(self):
+        """程序退出时调用，等待正在进行的扫描结束"""
+        self.stop()
+        if self._thread is not None:
+            self._thread.wait()
+
+    def _on_directory_changed(self, path):
+        if path != self.folder_path:
+            return
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def _rescan(self):
+        if self.folder_path is None:
+            return
+        if self._thread is not None and self._thread.isRunning():
+            # 上一次扫描尚未结束，结束后再补扫一次
+            self._rescan_again = True
+            return
+        self._thread = FolderSnapshotThread(self.catalog, self.folder_path)
+        self._thread.snapshot_ready.connect(self._on_snapshot_ready)
+        self._thread.start()
+
+    def _on_snapshot_ready(self, folder_path, snapshot):
+        # 扫描期间已切换到其他文件夹，丢弃结果
+        if folder_path != self.folder_path or folder_path != self.catalog.folder_path:
+            return
+        if snapshot is not None:
+            added, removed, modified = self.catalog.apply_snapshot(snapshot)
+            if added or removed or modified:
+                logger.info(f"文件夹变化: 新增 {len(added)}，删除 {len(removed)}，修改 {len(modified)}")
+                self.catalog_changed.emit(added, removed, modified)
+            # 文件夹被删除后重建时需要重新加入监视
+            if folder_path not in self.watcher.directories():
+                self.watcher.addPath(folder_path)
+        if self._rescan_again:
+            self._rescan_again = False
+            self.timer.start()
@@ -0,0 +1,397 @@
+import os
+import re
+import mmap
+import logging
+from array import array
+from contextlib import contextmanager
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPlainTextEdit, QComboBox, QLineEdit, QCheckBox, QPushButton
+)
+from PyQt6.QtCore import QThread, QTimer, pyqtSignal
+from PyQt6.QtGui import QFont, QTextCursor
+
+# 打开时显示的最后几行，以及向上滚动到顶部时每次加载的行数
+TAIL_LINES = 1000
+PAGE_LINES = 500
+# 跟随模式检查文件增长的间隔
+FOLLOW_INTERVAL_MS = 1000
+# 过滤条件输入停止这么久后才重建索引
+FILTER_DELAY_MS = 300
+# 后台建立索引时每次扫描的字节数，扫描完一块检查一次是否取消
+INDEX_CHUNK_BYTES = 8 * 1024 * 1024
+
+LEVEL_CHOICES = [("全部级别", 0), ("INFO 及以上", logging.INFO),
+                 ("WARNING 及以上", logging.WARNING), ("ERROR 及以上", logging.ERROR)]
+_LEVEL_NAMES = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+
+
+def build_filter(min_level, text):
+    """把级别和关键字编译为按行匹配的正则，没有过滤条件返回 None
+
+    日志格式为 "时间 - 名称 - 级别 - 消息"（旧格式没有名称），级别两侧都是 " - "。
+    关键字不区分 ASCII 大小写。
+    """
+    parts = []
+    if min_level:
+        names = [name for name in _LEVEL_NAMES if logging.getLevelName(name) >= min_level]
+        parts.append(rb'(?=[^\n]* - (?:' + b'|'.join(n.encode() for n in names) + rb') - )')
+    if text:
+        parts.append(rb'(?=[^\n]*' + re.escape(text.encode('utf-8')) + rb')')
+    if not parts:
+        return None
+    return re.compile(rb'^' + b''.join(parts), re.MULTILINE | re.IGNORECASE)
+
+
+def decode_line(line):
+    return line.rstrip(b'\r').decode('utf-8', errors='replace')
+
+
+class LogFile:
+    """按需内存映射日志文件，只读取需要显示的部分
+
+    映射只在每次读取期间保持打开：Windows 上被映射的文件不能改名，
+    一直映射会让 RotatingFileHandler 无法轮转日志。
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def identity(self):
+        """返回 ((设备, inode), 大小)，文件不存在时返回 (None, 0)；轮转后 inode 改变"""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None, 0
+        return (st.st_dev, st.st_ino), st.st_size
+
+    @contextmanager
+    def mapped(self):
+        with open(self.path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield b''
+                return
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                yield mm
+            finally:
+                mm.close()
+
+    @staticmethod
+    def complete_end(mm):
+        """最后一个换行符之后的位置：正在写入的半行不显示"""
+        return mm.rfind(b'\n') + 1
+
+    @staticmethod
+    def lines_before(mm, end, count):
+        """返回 end（行首位置）之前的最多 count 行及第一行的起始位置"""
+        lines = []
+        pos = end
+        while pos > 0 and len(lines) < count:
+            start = mm.rfind(b'\n', 0, pos - 1) + 1
+            lines.append(decode_line(mm[start:pos - 1]))
+            pos = start
+        lines.reverse()
+        return lines, pos
+
+    @staticmethod
+    def line_at(mm, start):
+        end = mm.find(b'\n', start)
+        return decode_line(mm[start:end if end >= 0 else len(mm)])
+
+    def read_from(self, start):
+        """读取 start 之后新追加的完整行，返回 (未解码的行列表, 新的结束位置)"""
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            data = f.read()
+        end = data.rfind(b'\n') + 1
+        if not end:
+            return [], start
+        return data[:end - 1].split(b'\n'), start + end
+
+
+class LogIndexThread(QThread):
+    """在后台扫描整个日志，建立符合过滤条件的行首偏移索引"""
+
+    progress_updated = pyqtSignal(int)
+    index_ready = pyqtSignal(object, object)  # (行首偏移 array, 扫描到的位置)
+
+    def __init__(self, log_file, pattern):
+        super().__init__()
+        self.log_file = log_file
+        self.pattern = pattern
+
+    def cancel(self):
+        self.requestInterruption()
+
+    def run(self):
+        offsets = array('q')
+        try:
+            with self.log_file.mapped() as mm:
+                end = LogFile.complete_end(mm) if len(mm) else 0
+                pos = 0
+                while pos < end:
+                    if self.isInterruptionRequested():
+                        return
+                    # 每块都截止到行尾，^ 总是从行首开始匹配
+                    chunk_end = mm.find(b'\n', min(pos + INDEX_CHUNK_BYTES, end) - 1) + 1 or end
+                    offsets.extend(m.start() for m in self.pattern.finditer(mm, pos, chunk_end))
+                    pos = chunk_end
+                    self.progress_updated.emit(int(pos * 100 / end))
+        except OSError:
+            end = 0
+        self.index_ready.emit(offsets, end)
+
+
+class LogViewerDialog(QDialog):
+    """日志查看器：打开时只显示最后几行，向上滚动时按页加载更早的内容
+
+    未过滤时直接在映射中向前查找换行符；设置级别或关键字后在后台建立匹配行的偏移索引，
+    再按索引分页。跟随模式定时读取新追加的行，日志轮转后自动重新加载。
+    """
+
+    def __init__(self, log_path, parent=None, title="关于", header=""):
+        super().__init__(parent)
+        self.setWindowTitle(title)
+        self.setMinimumSize(800, 520)
+        self.log_file = LogFile(log_path)
+        self.pattern = None
+        self.index = None         # 过滤时的匹配行偏移；None 表示未过滤
+        self.top = 0              # 未过滤：已显示的第一行的偏移；过滤：已显示的第一条在索引中的位置
+        self.end = 0              # 已读取到的位置，跟随模式从这里继续
+        self.identity = None
+        self.index_thread = None
+        self.loading = False
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(15, 15, 15, 15)
+        layout.setSpacing(10)
+
+        if header:
+            header_label = QLabel(header)
+            header_label.setStyleSheet("color: #e0e0e0;")
+            layout.addWidget(header_label)
+
+        filter_layout = QHBoxLayout()
+        self.level_combo = QComboBox()
+        for label, level in LEVEL_CHOICES:
+            self.level_combo.addItem(label, level)
+        self.level_combo.currentIndexChanged.connect(self.schedule_reload)
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("按关键字过滤日志...")
+        self.search_edit.setStyleSheet("""
+            QLineEdit {
+                background-color: #121212;
+                color: #e0e0e0;
+                padding: 4px;
+                border: 1px solid #424242;
+                border-radius: 4px;
+            }
+        """)
+        self.search_edit.textChanged.connect(self.schedule_reload)
+        self.follow_check = QCheckBox("跟随新日志")
+        self.follow_check.setStyleSheet("color: #e0e0e0;")
+        self.follow_check.setChecked(True)
+        filter_layout.addWidget(self.level_combo)
+        filter_layout.addWidget(self.search_edit, 1)
+        filter_layout.addWidget(self.follow_check)
+        layout.addLayout(filter_layout)
+
+        self.view = QPlainTextEdit()
+        self.view.setReadOnly(True)
+        self.view.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        self.view.setFont(QFont("Consolas", 9))
+        self.view.setStyleSheet("""
+            QPlainTextEdit {
+                background-color: #121212;
+                color: #e0e0e0;
+                border: 1px solid #424242;
+                border-radius: 5px;
+            }
+        """)
+        self.view.verticalScrollBar().valueChanged.connect(self.on_scroll)
+        layout.addWidget(self.view, 1)
+
+        bottom_layout = QHBoxLayout()
+        self.status_label = QLabel()
+        self.status_label.setStyleSheet("color: #9e9e9e;")
+        close_btn = QPushButton("关闭")
+        close_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #0d47a1;
+                color: white;
+                padding: 6px 16px; font-size: 9pt;
+                border-radius: 4px;
+            }
+            QPushButton:hover {
+                background-color: #1565c0;
+            }
+        """)
+        close_btn.clicked.connect(self.accept)
+        bottom_layout.addWidget(self.status_label, 1)
+        bottom_layout.addWidget(close_btn)
+        layout.addLayout(bottom_layout)
+
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(FILTER_DELAY_MS)
+        self.filter_timer.timeout.connect(self.reload)
+        self.follow_timer = QTimer(self)
+        self.follow_timer.setInterval(FOLLOW_INTERVAL_MS)
+        self.follow_timer.timeout.connect(self.poll)
+        self.follow_timer.start()
+
+        self.reload()
+
+    # ---- 加载 ----
+
+    def schedule_reload(self):
+        self.filter_timer.start()
+
+    def reload(self):
+        self.cancel_index()
+        self.view.clear()
+        self.index = None
+        self.top = self.end = 0
+        self.identity, size = self.log_file.identity()
+        if self.identity is None:
+            self.status_label.setText(f"日志文件不存在: {self.log_file.path}")
+            return
+        self.pattern = build_filter(self.level_combo.currentData(), self.search_edit.text().strip())
+        if self.pattern is None:
+            self.load_tail()
+            return
+        self.status_label.setText("正在建立索引...")
+        self.index_thread = LogIndexThread(self.log_file, self.pattern)
+        self.index_thread.progress_updated.connect(
+            lambda percent: self.status_label.setText(f"正在建立索引... {percent}%"))
+        self.index_thread.index_ready.connect(self.handle_index_ready)
+        self.index_thread.start()
+
+    def load_tail(self):
+        try:
+            with self.log_file.mapped() as mm:
+                self.end = LogFile.complete_end(mm) if len(mm) else 0
+                lines, self.top = LogFile.lines_before(mm, self.end, TAIL_LINES)
+        except OSError as e:
+            self.status_label.setText(f"无法读取日志文件: {str(e)}")
+            return
+        self.show_lines(lines)
+        self.update_status()
+
+    def handle_index_ready(self, offsets, end):
+        if self.sender() is not self.index_thread:
+            return
+        self.index = offsets
+        self.end = end
+        self.top = max(0, len(offsets) - TAIL_LINES)
+        self.show_lines(self.indexed_lines(self.top, len(offsets)))
+        self.update_status()
+
+    def indexed_lines(self, first, last):
+        if first >= last:
+            return []
+        try:
+            with self.log_file.mapped() as mm:
+                return [LogFile.line_at(mm, self.index[i]) for i in range(first, last)]
+        except OSError:
+            return []
+
+    def show_lines(self, lines):
+        self.loading = True
+        self.view.setPlainText("\n".join(lines))
+        bar = self.view.verticalScrollBar()
+        bar.setValue(bar.maximum())
+        self.loading = False
+
+    def load_previous_page(self):
+        if self.index is None:
+            if self.top <= 0:
+                return
+            try:
+                with self.log_file.mapped() as mm:
+                    lines, self.top = LogFile.lines_before(mm, self.top, PAGE_LINES)
+            except OSError:
+                return
+        else:
+            if self.top <= 0:
+                return
+            first = max(0, self.top - PAGE_LINES)
+            lines = self.indexed_lines(first, self.top)
+            self.top = first
+        if not lines:
+            return
+
+        # 在开头插入后把滚动条下移同样的行数，保持当前看到的内容不动
+        self.loading = True
+        bar = self.view.verticalScrollBar()
+        old_max, old_value = bar.maximum(), bar.value()
+        cursor = QTextCursor(self.view.document())
+        cursor.movePosition(QTextCursor.MoveOperation.Start)
+        cursor.insertText("\n".join(lines) + "\n")
+        bar.setValue(old_value + bar.maximum() - old_max)
+        self.loading = False
+        self.update_status()
+
+    def on_scroll(self, value):
+        if not self.loading and value == self.view.verticalScrollBar().minimum():
+            self.load_previous_page()
+
+    # ---- 跟随 ----
+
+    def poll(self):
+        if not self.follow_check.isChecked() or self.filter_timer.isActive():
+            return
+        if self.index_thread is not None and self.index_thread.isRunning():
+            return
+        identity, size = self.log_file.identity()
+        if identity != self.identity or size < self.end:
+            # 日志被轮转或截断
+            self.reload()
+            return
+        if size == self.end:
+            return
+        try:
+            lines, end = self.log_file.read_from(self.end)
+        except OSError:
+            return
+        if self.pattern is not None:
+            matched = []
+            offset = self.end
+            for line in lines:
+                if self.pattern.match(line):
+                    self.index.append(offset)
+                    matched.append(line)
+                offset += len(line) + 1
+            lines = matched
+        lines = [decode_line(line) for line in lines]
+        self.end = end
+        if lines:
+            bar = self.view.verticalScrollBar()
+            at_bottom = bar.value() == bar.maximum()
+            self.loading = True
+            self.view.appendPlainText("\n".join(lines))
+            self.loading = False
+            if at_bottom:
+                bar.setValue(bar.maximum())
+            self.update_status()
+
+    def update_status(self):
+        size = self.end / 1024 / 1024
+        if self.index is None:
+            shown = self.view.document().blockCount()
+            more = "，向上滚动加载更早的日志" if self.top > 0 else ""
+            self.status_label.setText(f"{self.log_file.path}（{size:.1f} MB）已显示 {shown} 行{more}")
+        else:
+            self.status_label.setText(f"{self.log_file.path}（{size:.1f} MB）匹配 {len(self.index)} 行，"
+                                      f"已显示 {len(self.index) - self.top} 行")
+
+    def cancel_index(self):
+        if self.index_thread is not None and self.index_thread.isRunning():
+            self.index_thread.cancel()
+            self.index_thread.wait()
+        self.index_thread = None
+
+    def done(self, result):
+        self.follow_timer.stop()
+        self.cancel_index()
+        super().done(result)
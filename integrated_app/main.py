@@ -1,8 +1,8 @@
 import os
 import sys
 import os
-import logging
-from PyQt6.QtWidgets import QApplication, QMainWindow, QTabWidget, QWidget, QVBoxLayout, QSplitter, QPushButton, QMessageBox, QTextEdit
+import multiprocessing
+from PyQt6.QtWidgets import QApplication, QMainWindow, QTabWidget, QWidget, QVBoxLayout, QSplitter, QPushButton
 from PyQt6.QtCore import Qt
 
 # 设置日志重定向
@@ -10,28 +10,12 @@ log_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'logs')
 os.makedirs(log_dir, exist_ok=True)
 log_file = os.path.join(log_dir, 'app.log')
 
-# 配置日志
-logging.basicConfig(
-    filename=log_file,
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    encoding='utf-8'
-)
-
-# 重定向stdout和stderr到日志
-class LoggerWriter:
-    def __init__(self, level):
-        self.level = level
-
-    def write(self, message):
-        if message.strip():
-            self.level(message.strip())
-
-    def flush(self):
-        pass
-
-sys.stdout = LoggerWriter(logging.info)
-sys.stderr = LoggerWriter(logging.error)
+# 配置日志：记录经队列由后台线程写入轮转文件，print 的输出也按行写入日志，界面线程不会阻塞在磁盘上
+shared_path = os.path.join(os.path.dirname(__file__), '..', 'shared')
+if shared_path not in sys.path:
+    sys.path.append(shared_path)
+from log_setup import setup_logging
+setup_logging(log_file, capture_output=True)
 
 # 隐藏控制台窗口
 if hasattr(sys, 'frozen') and sys.frozen in ('windows_exe', 'console_exe'):
@@ -85,6 +69,8 @@ except ImportError as e:
         print(f"无法导入FileManagerApp: {e2}")
         sys.exit(1)
 
+from log_viewer import LogViewerDialog
+
 class IntegratedApp(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -152,51 +138,9 @@ class IntegratedApp(QMainWindow):
         self.statusBar().addPermanentWidget(self.about_button)
 
     def show_about(self):
-        # 创建自定义对话框
-        dialog = QMessageBox(self)
-        dialog.setWindowTitle("关于")
-        dialog.setIcon(QMessageBox.Icon.Information)
-        
-        # 创建文本编辑控件显示日志
-        log_text = QTextEdit()
-        log_text.setReadOnly(True)
-        log_text.setMinimumSize(600, 400)
-        
-        # 读取日志文件
-        try:
-            # 获取日志文件路径
-            if hasattr(sys, 'frozen'):
-                # 当应用被打包为exe时
-                base_path = os.path.dirname(sys.executable)
-            else:
-                # 开发环境
-                base_path = os.path.dirname(os.path.abspath(__file__))
-            
-            log_path = os.path.join(base_path, '..', 'logs', 'app.log')
-            log_path = os.path.abspath(log_path)
-            
-            if os.path.exists(log_path):
-                with open(log_path, 'r', encoding='utf-8') as f:
-                    log_content = f.read()
-                log_text.setText(log_content)
-                dialog.setText(f"整合应用 v1.0\n\n日志文件路径: {log_path}")
-            else:
-                log_text.setText("日志文件不存在或尚无日志记录")
-                dialog.setText("整合应用 v1.0\n\n这是一个整合了文件拖拽管理器、文件查看器和文本处理器的应用程序。")
-        except Exception as e:
-            log_text.setText(f"无法读取日志文件: {str(e)}")
-            dialog.setText("整合应用 v1.0\n\n日志查看功能出错")
-        
-        # 设置对话框布局
-        layout = QVBoxLayout()
-        layout.addWidget(dialog.layout())
-        layout.addWidget(log_text)
-        
-        # 创建容器窗口并设置布局
-        container = QWidget()
-        container.setLayout(layout)
-        dialog.setLayout(layout)
-        
+        # 日志可能有上百 MB：查看器只映射文件并显示最后几页，向上滚动时再按需加载
+        dialog = LogViewerDialog(os.path.abspath(log_file), self, title="关于",
+                                 header="整合应用 v1.0\n\n这是一个整合了文件拖拽管理器、文件查看器和文本处理器的应用程序。")
         dialog.exec()
 
     def on_tab_changed(self, index):
@@ -216,4 +160,6 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == "__main__":
+    # 文本处理器的批量处理使用进程池，打包后的程序需要它才能启动工作进程
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
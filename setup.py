@@ -84,7 +84,7 @@ def package_app(onefile=True, windowed=True, clean=True, version=APP_VERSION):
         return False
 
     # 检查必要目录是否存在
-    required_dirs = ['integrated_app', 'FileDragManager', 'file_viewer_gui', 'Word Processing']
+    required_dirs = ['integrated_app', 'FileDragManager', 'file_viewer_gui', 'Word Processing', 'shared']
     if not check_directories(required_dirs):
         logger.warning("部分目录不存在，但仍尝试继续打包。")
     else:
@@ -98,6 +98,7 @@ def package_app(onefile=True, windowed=True, clean=True, version=APP_VERSION):
         f'--paths={os.path.join(PROJECT_ROOT, "file_viewer_gui")}',
         f'--paths={os.path.join(PROJECT_ROOT, "Word Processing")}',
         f'--paths={os.path.join(PROJECT_ROOT, "FileDragManager")}',
+        f'--paths={os.path.join(PROJECT_ROOT, "shared")}',
         # 注意: PyInstaller的--version参数不接受值，它只是显示PyInstaller版本
         # 我们可以在应用内部设置版本，而不是通过PyInstaller参数
     ]
@@ -163,6 +164,11 @@ def package_app(onefile=True, windowed=True, clean=True, version=APP_VERSION):
         'PyQt6.QtGui',
         'ui_components',
         'text_editor',
+        'file_rules',
+        'pattern_matcher',
+        'batch_cleanup',
+        'log_setup',
+        'log_viewer',
         'FileDragManager.main',
         'FileDragManager.dialogs',
         'FileDragManager.history',
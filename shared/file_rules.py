@@ -0,0 +1,347 @@
+import os
+import re
+import json
+import fnmatch
+import hashlib
+import logging
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+
+from sniffer import PARALLEL_THRESHOLD, get_sniffer, read_header
+
+logger = logging.getLogger('FileRules')
+
+# 用户规则文件，与 file_viewer_gui.json 一样相对当前工作目录；不存在时使用内置规则
+RULES_FILE = "file_rules.json"
+# 按小写文件名缓存仅由名称决定的分类结果
+NAME_CACHE_SIZE = 65536
+
+# 内置规则，格式与规则文件相同：
+#   categories 按顺序排列，name 为界面显示名，folder 为分类目录名；
+#   extensions 是最常见的规则；rules 中的每条规则可组合 extensions / glob / regex /
+#   min_size / max_size / magic（十六进制前缀列表，可配 offset），同一条规则内的条件全部满足才算命中。
+#   所有规则按 分类顺序、分类内顺序 依次判断，第一条命中的规则决定分类。
+#   extensions 中的 "" 表示没有扩展名的文件。
+#   content 为内容类型通配符（image/* 等）：按名称无法分类时读取文件头识别内容类型再归类；
+#   顶层 "sniff": "always" 时所有文件都先按内容识别，可纠正扩展名错误的文件。
+DEFAULT_RULES = {
+    "categories": [
+        {
+            "name": "图像",
+            "folder": "images",
+            "extensions": [".jpg", ".jpeg", ".png", ".gif", ".jfif", ".webp", ".heic", ".heif"],
+            "content": ["image/*"]
+        },
+        {
+            "name": "视频",
+            "folder": "videos",
+            "extensions": [".mp4", ".mov", ".avi", ".mkv", ".flv", ".wmv"],
+            "content": ["video/*"]
+        },
+        {
+            "name": "音频",
+            "folder": "audios",
+            "extensions": [".mp3", ".wav", ".flac", ".aac"],
+            "content": ["audio/*"]
+        },
+        {
+            "name": "HTML",
+            "folder": "htmls",
+            "extensions": [".html", ".htm"],
+            "content": ["text/html"]
+        },
+        {
+            "name": "文档",
+            "folder": "documents",
+            "extensions": [".pdf", ".doc", ".docx", ".wps", ".xls", ".xlsx", ".csv", ".ppt", ".pptx",
+                           ".txt", ".md", ".epub", ".mobi", ".azw3", ".chm"],
+            "content": ["application/pdf", "application/epub+zip", "application/x-mobipocket-ebook",
+                        "application/x-ole-storage"]
+        }
+    ]
+}
+
+
+_MISSING = object()
+
+
+class RuleError(ValueError):
+    """规则文件格式错误"""
+
+
+class _Rule:
+    """一条编译后的规则：名称条件在缓存中判断，大小 / 文件头条件需要访问文件"""
+
+    __slots__ = ("code", "extensions", "globs", "regex", "min_size", "max_size", "magic", "head_size")
+
+    def __init__(self, code, spec):
+        self.code = code
+        exts = spec.get("extensions")
+        self.extensions = None if exts is None else frozenset(_normalize_ext(ext) for ext in exts)
+        self.globs = tuple(re.compile(fnmatch.translate(p.lower())).match for p in _as_list(spec.get("glob")))
+        patterns = _as_list(spec.get("regex"))
+        self.regex = re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE).search if patterns else None
+        self.min_size = spec.get("min_size")
+        self.max_size = spec.get("max_size")
+        offset = int(spec.get("offset", 0))
+        try:
+            self.magic = tuple((offset, bytes.fromhex(m)) for m in _as_list(spec.get("magic")))
+        except ValueError as e:
+            raise RuleError(f"magic 必须是十六进制字符串: {e}")
+        self.head_size = max((o + len(m) for o, m in self.magic), default=0)
+
+    @property
+    def needs_file(self):
+        return self.min_size is not None or self.max_size is not None or bool(self.magic)
+
+    def match_name(self, name):
+        if self.globs and not any(match(name) for match in self.globs):
+            return False
+        if self.regex is not None and self.regex(name) is None:
+            return False
+        return True
+
+    def match_file(self, size, head):
+        if self.min_size is not None and size < self.min_size:
+            return False
+        if self.max_size is not None and size > self.max_size:
+            return False
+        if self.magic and not any(head[o:o + len(m)] == m for o, m in self.magic):
+            return False
+        return True
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+
+def _normalize_ext(ext):
+    ext = ext.lower()
+    return ext if not ext or ext.startswith('.') else '.' + ext
+
+
+class FileClassifier:
+    """把分类规则编译成按扩展名索引的查找表
+
+    每个扩展名（含 .tar.gz 这类多段扩展名）对应一个按优先级排好的候选规则元组，
+    截止到第一条无额外条件的规则；大多数文件因此只需一次字典查找。
+    只依赖文件名的结果放在 LRU 缓存里，需要大小或文件头的规则才会访问文件。
+    """
+
+    def __init__(self, rules=None, sniffer=None):
+        rules = DEFAULT_RULES if rules is None else rules
+        # 规则内容的指纹：保存了分类结果的地方（库索引）据此判断结果是否过期
+        self.fingerprint = hashlib.sha1(
+            json.dumps(rules, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+        self.sniffer = sniffer if sniffer is not None else get_sniffer()
+        sniff = rules.get("sniff", "unknown")
+        if sniff not in ("unknown", "always"):
+            raise RuleError("sniff 只能是 unknown 或 always")
+        self._sniff_always = sniff == "always"
+        categories = rules.get("categories")
+        if not categories:
+            raise RuleError("规则中没有定义任何分类")
+        if len(categories) > 255:
+            raise RuleError("分类数量不能超过 255 个")
+        self.categories = []
+        self.folders = []
+        compiled = []
+        content_patterns = []
+        for code, category in enumerate(categories):
+            try:
+                self.categories.append(category["name"])
+                self.folders.append(category.get("folder") or category["name"])
+            except (KeyError, TypeError):
+                raise RuleError(f"第 {code + 1} 个分类缺少 name")
+            if category.get("extensions"):
+                compiled.append(_Rule(code, {"extensions": category["extensions"]}))
+            for spec in category.get("rules", ()):
+                compiled.append(_Rule(code, spec))
+            content_patterns.extend((code, p.lower()) for p in _as_list(category.get("content")))
+        self._content_patterns = tuple(content_patterns)
+        self._content_code = lru_cache(maxsize=256)(self._match_content)
+
+        # 没有扩展名限制的规则适用于所有文件，按原有优先级合并进每个扩展名的候选列表
+        generic = [rule for rule in compiled if rule.extensions is None]
+        exts = set()
+        for rule in compiled:
+            if rule.extensions is not None:
+                exts.update(rule.extensions)
+        self._by_ext = {ext: self._chain(r for r in compiled if r.extensions is None or ext in r.extensions)
+                        for ext in exts}
+        self._generic = self._chain(generic)
+        self._max_dots = max((ext.count('.') for ext in exts), default=1)
+        # 只由扩展名决定分类的常见情况直接查表，不经过 LRU；
+        # 是某个多段扩展名结尾的扩展名（.tar.gz 中的 .gz）不能只看最后一段
+        tails = {'.' + ext.rsplit('.', 1)[1] for ext in exts if ext.count('.') > 1}
+        self._simple = {ext: chain[0].code for ext, chain in self._by_ext.items()
+                        if ext and ext not in tails and len(chain) == 1
+                        and not chain[0].globs and chain[0].regex is None and not chain[0].needs_file}
+        self._resolve = lru_cache(maxsize=NAME_CACHE_SIZE)(self._resolve_name)
+
+    @staticmethod
+    def _chain(rules):
+        chain = []
+        for rule in rules:
+            chain.append(rule)
+            if not rule.globs and rule.regex is None and not rule.needs_file:
+                break
+        return tuple(chain)
+
+    def _candidates(self, name):
+        stem = name.lstrip('.')
+        if self._max_dots <= 1:
+            dot = stem.rfind('.')
+            return self._by_ext.get(stem[dot:] if dot >= 0 else "", self._generic)
+        parts = stem.split('.')
+        if len(parts) == 1:
+            return self._by_ext.get("", self._generic)
+        # 从最长的后缀开始尝试，例如 a.tar.gz 先查 .tar.gz 再查 .gz
+        for i in range(max(1, len(parts) - self._max_dots), len(parts)):
+            chain = self._by_ext.get('.' + '.'.join(parts[i:]))
+            if chain is not None:
+                return chain
+        return self._generic
+
+    def _resolve_name(self, name):
+        """返回 (待定规则, 兜底分类)：待定规则需要文件大小或文件头才能判断"""
+        pending = []
+        for rule in self._candidates(name):
+            if not rule.match_name(name):
+                continue
+            if not rule.needs_file:
+                return tuple(pending), rule.code
+            pending.append(rule)
+        return tuple(pending), None
+
+    def _classify_by_rules(self, path, size):
+        name = os.path.basename(path)
+        dot = name.rfind('.')
+        if dot > 0:
+            code = self._simple.get(name[dot:].lower(), _MISSING)
+            if code is not _MISSING:
+                return code
+        pending, code = self._resolve(name.lower())
+        if not pending:
+            return code
+        head = None
+        for rule in pending:
+            if size is None and (rule.min_size is not None or rule.max_size is not None):
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    return code
+            if rule.magic and head is None:
+                try:
+                    head = read_header(path, max(r.head_size for r in pending))
+                except OSError:
+                    head = b""
+            if rule.match_file(size, head):
+                return rule.code
+        return code
+
+    def _needs_file(self, path):
+        """不读取文件能否确定分类：返回 (分类序号, 是否还需要访问文件)"""
+        if self._sniff_always:
+            return None, True
+        name = os.path.basename(path)
+        dot = name.rfind('.')
+        if dot > 0 and name[dot:].lower() in self._simple:
+            return self._simple[name[dot:].lower()], False
+        pending, code = self._resolve(name.lower())
+        if pending or (code is None and self._content_patterns):
+            return None, True
+        return code, False
+
+    def classify(self, path, size=None):
+        """返回分类序号，无法分类返回 None；size 为 None 且规则需要时现场获取
+
+        按名称的规则无法分类时读取文件头识别内容类型（规则中 sniff 为 always 时先识别内容），
+        因此没有扩展名或扩展名不认识的文件也能归类。
+        """
+        if self._sniff_always:
+            code = self.classify_content(path)
+            if code is not None:
+                return code
+            return self._classify_by_rules(path, size)
+        code = self._classify_by_rules(path, size)
+        if code is None and self._content_patterns:
+            code = self.classify_content(path)
+        return code
+
+    def classify_content(self, path):
+        """只按文件内容分类"""
+        return self._content_code(self.sniffer.sniff(path))
+
+    def _match_content(self, content_type):
+        if content_type is None:
+            return None
+        for code, pattern in self._content_patterns:
+            if fnmatch.fnmatchcase(content_type, pattern):
+                return code
+        return None
+
+    def classify_many(self, items):
+        """items 为 (路径, 大小) 序列，返回分类序号列表
+
+        能按名称确定的直接查表，需要读取文件的（文件头、大小）大量出现时在线程池中并发处理，
+        拖入上千个下载文件时不会逐个串行打开。
+        """
+        items = list(items)
+        codes = [None] * len(items)
+        slow = []
+        for i, (path, size) in enumerate(items):
+            code, needs_file = self._needs_file(path)
+            if needs_file:
+                slow.append(i)
+            else:
+                codes[i] = code
+        if len(slow) < PARALLEL_THRESHOLD:
+            for i in slow:
+                codes[i] = self.classify(*items[i])
+            return codes
+        with ThreadPoolExecutor(max_workers=self.sniffer.max_workers, thread_name_prefix="classify") as pool:
+            for i, code in zip(slow, pool.map(lambda i: self.classify(*items[i]), slow)):
+                codes[i] = code
+        return codes
+
+    def folder_of(self, path, size=None):
+        """返回分类目录名，无法分类返回 None"""
+        code = self.classify(path, size)
+        return None if code is None else self.folders[code]
+
+    def code_of_folder(self, folder):
+        try:
+            return self.folders.index(folder)
+        except ValueError:
+            return None
+
+    def cache_info(self):
+        return self._resolve.cache_info()
+
+
+def load_rules(rules_file=RULES_FILE):
+    """读取规则文件，不存在或格式错误时返回内置规则"""
+    if not os.path.exists(rules_file):
+        return DEFAULT_RULES
+    try:
+        with open(rules_file, 'r', encoding='utf-8') as f:
+            rules = json.load(f)
+        FileClassifier(rules)
+        return rules
+    except (OSError, ValueError, TypeError, AttributeError) as e:
+        logger.warning(f"分类规则文件 {rules_file} 无效，使用内置规则: {str(e)}")
+        return DEFAULT_RULES
+
+
+_classifier = None
+
+
+def get_classifier():
+    """两个程序共用的分类器，首次调用时读取规则文件"""
+    global _classifier
+    if _classifier is None:
+        _classifier = FileClassifier(load_rules())
+    return _classifier
@@ -0,0 +1,190 @@
+import os
+import sys
+import time
+import queue
+import atexit
+import logging
+import threading
+import multiprocessing
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# 单个日志文件的大小上限和保留的轮转文件数
+MAX_LOG_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+# 各模块的默认日志级别，可用环境变量 APP_LOG_LEVELS="FileManager=DEBUG,FileRules=INFO" 覆盖
+DEFAULT_LEVELS = {
+    '': logging.INFO,
+    'FileManager': logging.INFO,
+    'FileViewer': logging.INFO,
+    'FileRules': logging.WARNING,
+    'TextProcessor': logging.INFO,
+}
+LEVELS_ENV = 'APP_LOG_LEVELS'
+# 每个调用位置每秒最多写入的 DEBUG / INFO 记录数，超出的记录丢弃并在下一条中注明数量
+RATE_LIMIT_PER_SECOND = 20
+RATE_LIMIT_BURST = 100
+
+_listener = None
+_lock = threading.Lock()
+
+
+class RateLimitFilter(logging.Filter):
+    """按调用位置（文件 + 行号）限流的令牌桶，WARNING 及以上的记录从不丢弃
+
+    传输、扫描这类热路径每个文件都会写日志，上万个文件时日志本身就成了瓶颈；
+    限流后同一行代码每秒最多写入 rate 条，被丢弃的条数附在下一条放行的记录后面。
+    记录带有 call_site 属性时（StreamToLogger 捕获的 print）按其中的调用位置计数，
+    否则所有 print 都来自 StreamToLogger 的同一行，会共用一个桶互相挤占。
+    """
+
+    def __init__(self, rate=RATE_LIMIT_PER_SECOND, burst=RATE_LIMIT_BURST):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}  # (文件, 行号) -> [令牌数, 上次补充时间, 已丢弃条数]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        key = getattr(record, 'call_site', None) or (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.burst, now, 0]
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            dropped, bucket[2] = bucket[2], 0
+        if dropped:
+            record.msg = f"{record.getMessage()}（此前省略 {dropped} 条同类日志）"
+            record.args = None
+        return True
+
+
+class StreamToLogger:
+    """替换 sys.stdout / sys.stderr：按行写入日志，经队列异步落盘，print 不再阻塞界面线程"""
+
+    def __init__(self, logger, level):
+        self.logger = logger
+        self.level = level
+        # 每个线程尚未换行的内容分开存放：print 的正文和换行是两次 write，
+        # 共用一个缓冲区时其他线程的输出会插在中间
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def write(self, message):
+        ident = threading.get_ident()
+        with self._lock:
+            *lines, rest = (self._buffers.pop(ident, '') + message).split('\n')
+            if rest:
+                self._buffers[ident] = rest
+        if lines:
+            site = self._call_site()
+            # 在锁外写日志：处理器本身向 stdout / stderr 输出时不会死锁
+            for line in lines:
+                if line.strip():
+                    self._log(line.rstrip(), site)
+
+    def flush(self):
+        with self._lock:
+            rest = self._buffers.pop(threading.get_ident(), '')
+        if rest.strip():
+            self._log(rest.rstrip(), self._call_site())
+
+    @staticmethod
+    def _call_site():
+        # 记下调用 print / write 的代码位置（本函数由 write / flush 直接调用），
+        # 限流按它而不是按本模块的这一行计数
+        try:
+            frame = sys._getframe(2)
+            return frame.f_code.co_filename, frame.f_lineno
+        except ValueError:
+            # 解释器退出时直接调用 flush，调用栈上没有 Python 代码
+            return None
+
+    def _log(self, line, site):
+        self.logger.log(self.level, line, extra={'call_site': site})
+
+    def isatty(self):
+        return False
+
+
+def parse_levels(text):
+    """把 "FileManager=DEBUG,FileRules=INFO" 解析为 {logger 名称: 级别}，无法识别的项忽略"""
+    levels = {}
+    for part in (text or '').split(','):
+        name, sep, level = part.partition('=')
+        if not sep:
+            name, level = '', name
+        level = logging.getLevelName(level.strip().upper())
+        if isinstance(level, int):
+            levels[name.strip()] = level
+    return levels
+
+
+def setup_logging(log_file, levels=None, max_bytes=MAX_LOG_BYTES, backup_count=LOG_BACKUP_COUNT,
+                  capture_output=False):
+    """配置三个程序共用的日志：记录经 QueueHandler 进入队列，由后台 QueueListener 写入轮转文件
+
+    levels 为 {logger 名称: 级别}，'' 表示根 logger，未给出的使用 DEFAULT_LEVELS，
+    环境变量 APP_LOG_LEVELS 优先级最高。capture_output 时 print 的输出也写入日志。
+    重复调用时直接返回已有的 QueueListener；进程池的工作进程中不做任何配置，
+    避免多个进程同时轮转同一个文件。
+    """
+    global _listener
+    if multiprocessing.parent_process() is not None:
+        return None
+    with _lock:
+        if _listener is not None:
+            return _listener
+
+        log_dir = os.path.dirname(os.path.abspath(log_file))
+        os.makedirs(log_dir, exist_ok=True)
+        file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count,
+                                           encoding='utf-8', delay=True)
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = QueueHandler(log_queue)
+        queue_handler.addFilter(RateLimitFilter())
+
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+
+        effective = dict(DEFAULT_LEVELS)
+        effective.update(levels or {})
+        effective.update(parse_levels(os.environ.get(LEVELS_ENV)))
+        for name, level in effective.items():
+            logging.getLogger(name or None).setLevel(level)
+
+        _listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+    if capture_output:
+        sys.stdout = StreamToLogger(logging.getLogger('stdout'), logging.INFO)
+        sys.stderr = StreamToLogger(logging.getLogger('stderr'), logging.ERROR)
+    return _listener
+
+
+def shutdown_logging():
+    """停止后台线程并写完队列中剩余的记录"""
+    global _listener
+    with _lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        for stream in (sys.stdout, sys.stderr):
+            if isinstance(stream, StreamToLogger):
+                stream.flush()
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
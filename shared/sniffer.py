@@ -0,0 +1,142 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger('FileRules')
+
+# 只读取文件开头这么多字节，足够覆盖常见格式的文件头
+SNIFF_BYTES = 512
+# 按 (设备, inode, 大小, 修改时间) 缓存的识别结果条数
+SNIFF_CACHE_SIZE = 100000
+# 超过这么多个文件时在线程池中并发读取文件头
+PARALLEL_THRESHOLD = 32
+DEFAULT_SNIFF_WORKERS = min(16, (os.cpu_count() or 1) * 4)
+
+# Windows 没有 os.pread，刚打开的文件从偏移 0 读取，os.read 同样只需一次系统调用
+_pread = getattr(os, 'pread', None)
+
+# ISO BMFF（ftyp）的主品牌 -> 内容类型
+_FTYP_BRANDS = {
+    b"heic": "image/heic", b"heix": "image/heic", b"hevc": "image/heic", b"heim": "image/heic",
+    b"heis": "image/heic", b"mif1": "image/heif", b"msf1": "image/heif",
+    b"avif": "image/avif", b"avis": "image/avif",
+    b"M4A ": "audio/mp4", b"M4B ": "audio/mp4",
+    b"qt  ": "video/quicktime",
+}
+
+# (偏移, 文件头前缀, 内容类型)，按顺序匹配
+_SIGNATURES = (
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+    (0, b"BM", "image/bmp"),
+    (0, b"II*\x00", "image/tiff"),
+    (0, b"MM\x00*", "image/tiff"),
+    (0, b"%PDF-", "application/pdf"),
+    (0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "application/x-ole-storage"),
+    (60, b"BOOKMOBI", "application/x-mobipocket-ebook"),
+    (0, b"\x1aE\xdf\xa3", "video/x-matroska"),
+    (0, b"FLV\x01", "video/x-flv"),
+    (0, b"0&\xb2u\x8ef\xcf\x11", "video/x-ms-asf"),
+    (0, b"ID3", "audio/mpeg"),
+    (0, b"fLaC", "audio/flac"),
+    (0, b"OggS", "audio/ogg"),
+)
+
+_HTML_PREFIXES = (b"<!doctype html", b"<html", b"<head", b"<body")
+
+
+def detect(head):
+    """根据文件开头的字节判断内容类型，无法识别返回 None"""
+    for offset, prefix, content_type in _SIGNATURES:
+        if head.startswith(prefix, offset):
+            return content_type
+    if head[4:8] == b"ftyp":
+        return _FTYP_BRANDS.get(head[8:12], "video/mp4")
+    if head[:4] == b"RIFF":
+        kind = head[8:12]
+        if kind == b"WEBP":
+            return "image/webp"
+        if kind == b"WAVE":
+            return "audio/wav"
+        if kind == b"AVI ":
+            return "video/x-msvideo"
+    if head[:4] == b"PK\x03\x04":
+        # EPUB 要求第一个条目是未压缩的 mimetype 文件
+        if head[30:58] == b"mimetypeapplication/epub+zip":
+            return "application/epub+zip"
+        return "application/zip"
+    # MPEG 音频帧同步字：MP3 / ADTS AAC
+    if len(head) >= 2 and head[0] == 0xff and head[1] & 0xf0 == 0xf0:
+        return "audio/aac" if head[1] & 0x06 == 0 else "audio/mpeg"
+    text = head.lstrip(b"\xef\xbb\xbf \t\r\n")[:16].lower()
+    if text.startswith(_HTML_PREFIXES):
+        return "text/html"
+    return None
+
+
+def read_header(path, length=SNIFF_BYTES):
+    """打开文件并用一次 pread 读取开头 length 字节"""
+    fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        return _pread(fd, length, 0) if _pread is not None else os.read(fd, length)
+    finally:
+        os.close(fd)
+
+
+class ContentSniffer:
+    """读取文件头识别内容类型，结果按 (设备, inode, 大小, 修改时间) 缓存
+
+    文件被修改后大小或修改时间改变，缓存自然失效；同一文件反复分类（拖放后再执行移动、
+    文件夹重新扫描）只需一次 stat。多个文件时在线程池中并发读取。
+    """
+
+    def __init__(self, cache_size=SNIFF_CACHE_SIZE, max_workers=DEFAULT_SNIFF_WORKERS):
+        self.cache_size = cache_size
+        self.max_workers = max_workers
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def sniff(self, path, st=None):
+        """返回内容类型，无法识别或无法读取返回 None；st 为已有的 stat 结果"""
+        try:
+            if st is None:
+                st = os.stat(path)
+            key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        except OSError:
+            return None
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        try:
+            content_type = detect(read_header(path)) if st.st_size else None
+        except OSError as e:
+            logger.debug(f"读取文件头失败 {path}: {str(e)}")
+            return None
+        with self._lock:
+            self._cache[key] = content_type
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return content_type
+
+    def sniff_many(self, paths):
+        """批量识别，返回与 paths 对应的内容类型列表"""
+        paths = list(paths)
+        if len(paths) < PARALLEL_THRESHOLD:
+            return [self.sniff(path) for path in paths]
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="sniff") as pool:
+            return list(pool.map(self.sniff, paths))
+
+
+_sniffer = None
+
+
+def get_sniffer():
+    global _sniffer
+    if _sniffer is None:
+        _sniffer = ContentSniffer()
+    return _sniffer
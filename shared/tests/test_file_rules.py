@@ -0,0 +1,105 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from file_rules import DEFAULT_RULES, FileClassifier, RuleError, load_rules
+
+
+class NoSniffer:
+    """不读取文件内容，只测试按名称 / 大小 / 文件头规则的分类"""
+
+    max_workers = 2
+
+    def sniff(self, path):
+        return None
+
+
+RULES = {
+    "categories": [
+        {"name": "压缩包", "folder": "archives", "extensions": [".tar.gz", ".zip"]},
+        {"name": "截图", "folder": "screens",
+         "rules": [{"extensions": [".png"], "glob": "screenshot*"}]},
+        {"name": "图像", "folder": "images", "extensions": [".png", "jpg"]},
+        {"name": "大视频", "folder": "big", "rules": [{"extensions": [".mp4"], "min_size": 1000}]},
+        {"name": "视频", "folder": "videos", "extensions": [".mp4"]},
+        {"name": "日志", "folder": "logs", "rules": [{"regex": r"\.log(\.\d+)?$"}]},
+        {"name": "PDF", "folder": "pdf", "rules": [{"magic": "25504446"}]},
+        {"name": "无扩展名", "folder": "bare", "extensions": [""]},
+    ]
+}
+
+
+class FileClassifierTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix='file_rules_')
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+        self.classifier = FileClassifier(RULES, NoSniffer())
+
+    def write(self, name, data=b''):
+        path = os.path.join(self.folder, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def folder_of(self, name, size=None):
+        return self.classifier.folder_of(os.path.join(self.folder, name), size)
+
+    def test_extensions_and_priority(self):
+        self.assertEqual(self.folder_of("a.ZIP"), "archives")
+        self.assertEqual(self.folder_of("a.tar.gz"), "archives")
+        self.assertEqual(self.folder_of("photo.jpg"), "images")
+        self.assertEqual(self.folder_of("Screenshot 1.png"), "screens")
+        self.assertEqual(self.folder_of("holiday.png"), "images")
+        self.assertEqual(self.folder_of("README"), "bare")
+        self.assertIsNone(self.folder_of("a.gz"))
+
+    def test_size_rules(self):
+        self.assertEqual(self.folder_of("movie.mp4", 5000), "big")
+        self.assertEqual(self.folder_of("clip.mp4", 10), "videos")
+        # 没有给出大小时现场获取
+        self.assertEqual(self.classifier.folder_of(self.write("x.mp4", b'0' * 2000)), "big")
+
+    def test_regex_and_magic_rules(self):
+        self.assertEqual(self.folder_of("server.log.3"), "logs")
+        self.assertEqual(self.classifier.folder_of(self.write("paper.bin", b'%PDF-1.7')), "pdf")
+        self.assertIsNone(self.classifier.folder_of(self.write("other.bin", b'hello')))
+
+    def test_classify_many_matches_classify(self):
+        items = [(self.write(name, data), None) for name, data in
+                 [("a.zip", b''), ("b.mp4", b'0' * 2000), ("c.bin", b'%PDF-'), ("d.xyz", b'')]]
+        self.assertEqual(self.classifier.classify_many(items * 20),
+                         [self.classifier.classify(path) for path, _ in items * 20])
+
+    def test_default_rules(self):
+        classifier = FileClassifier(DEFAULT_RULES, NoSniffer())
+        self.assertEqual(classifier.folder_of("/x/a.JPEG"), "images")
+        self.assertEqual(classifier.folder_of("/x/book.epub"), "documents")
+        self.assertEqual(classifier.code_of_folder("videos"), 1)
+        self.assertIsNone(classifier.code_of_folder("missing"))
+
+    def test_fingerprint_follows_rules(self):
+        self.assertEqual(FileClassifier(RULES, NoSniffer()).fingerprint, self.classifier.fingerprint)
+        self.assertNotEqual(FileClassifier(DEFAULT_RULES, NoSniffer()).fingerprint, self.classifier.fingerprint)
+
+    def test_invalid_rules(self):
+        for rules in ({"categories": []}, {"categories": [{"folder": "x"}]},
+                      {"categories": [{"name": "x", "rules": [{"magic": "zz"}]}]},
+                      {"sniff": "never", "categories": [{"name": "x"}]}):
+            with self.assertRaises(RuleError):
+                FileClassifier(rules, NoSniffer())
+
+    def test_load_rules_falls_back_to_defaults(self):
+        self.assertIs(load_rules(os.path.join(self.folder, "missing.json")), DEFAULT_RULES)
+        broken = self.write("broken.json", b'{"categories": [}')
+        self.assertIs(load_rules(broken), DEFAULT_RULES)
+        valid = self.write("rules.json", json.dumps(RULES).encode('utf-8'))
+        self.assertEqual(load_rules(valid), RULES)
+
+
+if __name__ == '__main__':
+    unittest.main()
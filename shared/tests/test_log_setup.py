@@ -0,0 +1,95 @@
+import os
+import sys
+import logging
+import unittest
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from log_setup import RateLimitFilter, StreamToLogger, parse_levels
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def make_record(lineno, level=logging.INFO, msg="hello"):
+    return logging.LogRecord('FileManager', level, '/app/transfer.py', lineno, msg, None, None)
+
+
+class RateLimitFilterTest(unittest.TestCase):
+    def test_limits_per_call_site(self):
+        limiter = RateLimitFilter(rate=0, burst=3)
+        passed = [limiter.filter(make_record(10)) for _ in range(5)]
+        self.assertEqual(passed, [True, True, True, False, False])
+        # 其他调用位置有自己的桶，WARNING 从不丢弃
+        self.assertTrue(limiter.filter(make_record(11)))
+        self.assertTrue(limiter.filter(make_record(10, logging.WARNING)))
+
+    def test_dropped_count_is_reported(self):
+        limiter = RateLimitFilter(rate=0, burst=1)
+        limiter.filter(make_record(10))
+        limiter.filter(make_record(10))
+        limiter._buckets[('/app/transfer.py', 10)][0] = 1
+        record = make_record(10)
+        self.assertTrue(limiter.filter(record))
+        self.assertIn("省略 1 条", record.getMessage())
+
+
+class StreamToLoggerTest(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger('test_log_setup.stdout')
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.handler = ListHandler()
+        self.handler.addFilter(RateLimitFilter(rate=0, burst=2))
+        self.logger.addHandler(self.handler)
+        self.addCleanup(self.logger.removeHandler, self.handler)
+        self.stream = StreamToLogger(self.logger, logging.INFO)
+
+    def test_splits_lines(self):
+        self.stream.write("a\nb")
+        self.stream.write("c\n\n")
+        self.stream.write("tail")
+        self.stream.flush()
+        self.assertEqual(self.handler.messages, ["a", "bc", "tail"])
+
+    def test_prints_are_limited_by_their_own_call_site(self):
+        for i in range(5):
+            print(f"noisy {i}", file=self.stream)
+        print("other", file=self.stream)
+        # 同一处 print 超出突发上限后被丢弃，不影响另一处 print
+        self.assertEqual(self.handler.messages, ["noisy 0", "noisy 1", "other"])
+
+    def test_threads_do_not_mix_lines(self):
+        written, resume = threading.Event(), threading.Event()
+
+        def worker():
+            # print 先写正文再写换行，两次 write 之间另一个线程输出了完整的一行
+            self.stream.write("worker")
+            written.set()
+            resume.wait()
+            self.stream.write("\n")
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        written.wait()
+        self.stream.write("main\n")
+        resume.set()
+        thread.join()
+        self.assertEqual(self.handler.messages, ["main", "worker"])
+
+class ParseLevelsTest(unittest.TestCase):
+    def test_parse_levels(self):
+        self.assertEqual(parse_levels("FileManager=DEBUG, FileRules=info,bogus=NOPE,WARNING"),
+                         {'FileManager': logging.DEBUG, 'FileRules': logging.INFO, '': logging.WARNING})
+        self.assertEqual(parse_levels(None), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
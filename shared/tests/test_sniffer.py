@@ -0,0 +1,108 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import sniffer
+from sniffer import ContentSniffer, detect
+from file_rules import DEFAULT_RULES, FileClassifier
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\0" * 24
+
+
+class DetectTest(unittest.TestCase):
+    def test_signatures(self):
+        cases = {
+            PNG: "image/png",
+            b"\xff\xd8\xff\xe0": "image/jpeg",
+            b"%PDF-1.4": "application/pdf",
+            b"\0\0\0\x18ftypheic": "image/heic",
+            b"\0\0\0\x18ftypisom": "video/mp4",
+            b"RIFF\0\0\0\0WEBPVP8 ": "image/webp",
+            b"RIFF\0\0\0\0WAVEfmt ": "audio/wav",
+            b"PK\x03\x04" + b"\0" * 26 + b"mimetypeapplication/epub+zip": "application/epub+zip",
+            b"PK\x03\x04" + b"\0" * 40: "application/zip",
+            b"\xff\xfb\x90\x00": "audio/mpeg",
+            b"\xef\xbb\xbf  <!DOCTYPE HTML><html>": "text/html",
+            b"\0" * 60 + b"BOOKMOBI": "application/x-mobipocket-ebook",
+        }
+        for head, content_type in cases.items():
+            self.assertEqual(detect(head), content_type, head)
+
+    def test_unknown(self):
+        for head in (b"", b"plain text", b"\0\0\0\0"):
+            self.assertIsNone(detect(head))
+
+
+class ContentSnifferTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix='sniffer_')
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+
+    def write(self, name, data):
+        path = os.path.join(self.folder, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_results_are_cached_until_file_changes(self):
+        path = self.write("picture", PNG)
+        content_sniffer = ContentSniffer()
+        with mock.patch.object(sniffer, 'read_header', wraps=sniffer.read_header) as read_header:
+            self.assertEqual(content_sniffer.sniff(path), "image/png")
+            self.assertEqual(content_sniffer.sniff(path), "image/png")
+            self.assertEqual(read_header.call_count, 1)
+            # 内容和大小改变后缓存键不同，重新读取
+            self.write("picture", b"%PDF-1.7 with more bytes")
+            self.assertEqual(content_sniffer.sniff(path), "application/pdf")
+            self.assertEqual(read_header.call_count, 2)
+
+    def test_missing_and_empty_files(self):
+        content_sniffer = ContentSniffer()
+        self.assertIsNone(content_sniffer.sniff(os.path.join(self.folder, "missing")))
+        self.assertIsNone(content_sniffer.sniff(self.write("empty", b"")))
+
+    def test_cache_size(self):
+        content_sniffer = ContentSniffer(cache_size=2)
+        for i in range(4):
+            content_sniffer.sniff(self.write(f"f{i}", PNG + bytes([i])))
+        self.assertEqual(len(content_sniffer._cache), 2)
+
+    def test_sniff_many_in_parallel(self):
+        paths = [self.write(f"f{i}", PNG if i % 2 else b"%PDF-") for i in range(sniffer.PARALLEL_THRESHOLD + 5)]
+        self.assertEqual(ContentSniffer(max_workers=4).sniff_many(paths),
+                         ["image/png" if i % 2 else "application/pdf" for i in range(len(paths))])
+
+
+class ClassifyByContentTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix='sniffer_classify_')
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+
+    def write(self, name, data):
+        path = os.path.join(self.folder, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_unknown_names_fall_back_to_content(self):
+        classifier = FileClassifier(DEFAULT_RULES, ContentSniffer())
+        self.assertEqual(classifier.folder_of(self.write("download", PNG)), "images")
+        self.assertEqual(classifier.folder_of(self.write("file.unknown", b"%PDF-1.4")), "documents")
+        self.assertIsNone(classifier.folder_of(self.write("notes.unknown", b"hello")))
+        # 扩展名已能分类时不读取内容
+        self.assertEqual(classifier.folder_of(self.write("fake.mp4", PNG)), "videos")
+
+    def test_sniff_always_corrects_wrong_extensions(self):
+        rules = dict(DEFAULT_RULES, sniff="always")
+        classifier = FileClassifier(rules, ContentSniffer())
+        self.assertEqual(classifier.folder_of(self.write("fake.mp4", PNG)), "images")
+        self.assertEqual(classifier.folder_of(self.write("real.mp4", b"plain")), "videos")
+
+
+if __name__ == '__main__':
+    unittest.main()